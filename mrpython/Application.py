@@ -8,6 +8,8 @@ from translate import tr, set_translator_locale
 import multiprocessing as mp
 
 from RunReport import RunReport
+from PyInterpreter import InterpreterPool
+from ResourceLimits import ResourceLimits
 
 class Application:
     """
@@ -53,6 +55,13 @@ class Application:
         self.running_interpreter_proxy = None
         self.running_interpreter_callback = None
 
+        # the limits of the runs (CPU and wall-clock time, memory, recursion)
+        self.resource_limits = ResourceLimits()
+
+        # interpreters started in advance (once the GUI is up)
+        self.interpreter_pool = InterpreterPool(self.root)
+        self.root.after_idle(self.interpreter_pool.fill)
+
     def run(self):
         """ Run the application """
         self.main_view.show()
@@ -189,6 +198,8 @@ class Application:
             if self.running_interpreter_proxy and self.running_interpreter_proxy.process.is_alive():                
                 self.running_interpreter_proxy.process.terminate()
                 self.running_interpreter_proxy.process.join()
+            self.interpreter_pool.shutdown()
+            print(self.interpreter_pool.timings())
             sys.exit(0)
 
 
@@ -198,6 +209,8 @@ class Application:
         # already running
         if self.running_interpreter_callback:
             if self.running_interpreter_proxy and self.running_interpreter_proxy.process.is_alive():
+                # the program is stopped (its output no longer streamed)
+                self.running_interpreter_proxy.kill()
                 report = RunReport()
                 report.set_header("\n====== STOP ======\n")
                 report.add_execution_error('error', tr('User interruption'))
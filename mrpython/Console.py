@@ -294,6 +294,9 @@ class Console:
                 self.write("\n")
 
 
+            if report.has_output_overflow():
+                self.write(tr("[output too long: the first {} bytes ({} lines) were dropped]\n")
+                           .format(report.output_bytes_dropped, report.output_lines_dropped), tags=('warning'))
             self.write(str(report.output), tags=('stdout'))
             if report.result is not None:
                 self.write(repr(report.result), tags=('normal'))
@@ -315,7 +318,8 @@ class Console:
             return
         local_interpreter = False
         if self.interpreter is None:
-            self.interpreter = InterpreterProxy(self.app.root, self.app.mode, "<<console>>")
+            self.interpreter = InterpreterProxy(self.app.root, self.app.mode, "<<console>>", self.app.interpreter_pool
+                                               , limits=self.app.resource_limits)
             local_interpreter = True
             self.app.running_interpreter_proxy = self.interpreter
 
@@ -333,9 +337,11 @@ class Console:
                 self.input_history.record(expr)
 
             self.input_console.delete(0, END)
+            self.end_stream()
             self.write_report(ok, report, 'eval')
 
-            if local_interpreter:
+            if local_interpreter or not self.interpreter.process.is_alive():
+                # (a killed interpreter is replaced on the next evaluation)
                 self.interpreter.kill()
                 self.interpreter = None
                 self.app.running_interpreter_proxy = None
@@ -346,7 +352,8 @@ class Console:
         # non-blocking call
         self.app.icon_widget.enable_icon_running()
         self.app.running_interpreter_callback = callback
-        self.interpreter.run_evaluation(expr, callback)
+        self.begin_stream()
+        self.interpreter.run_evaluation(expr, callback, self.stream_output)
 
     def history_up_action(self, event=None):
         entry = self.input_history.move_past()
@@ -384,7 +391,8 @@ class Console:
             self.app.running_interpreter_proxy = None
 
             
-        self.interpreter = InterpreterProxy(self.app.root, self.app.mode, filename)
+        self.interpreter = InterpreterProxy(self.app.root, self.app.mode, filename, self.app.interpreter_pool
+                                            , limits=self.app.resource_limits)
         self.app.running_interpreter_proxy = self.interpreter
 
         callback_called = False
@@ -401,12 +409,13 @@ class Console:
                 callback_called = True
 
             #print("[console] CALLBACK: exec ok ? {}  report={}".format(ok, report))
+            self.end_stream()
             self.write_report(ok, report, 'exec')
             self.output_console.see('1.0')
 
             # Enable or disable the evaluation bar according to the execution status
-            if report.has_compilation_error(): # XXX: only for compilation ? , otherwise:  or report.has_execution_error():
-                # kill the interpreter
+            if report.has_compilation_error() or not self.interpreter.process.is_alive(): # XXX: only for compilation ? , otherwise:  or report.has_execution_error():
+                # kill the interpreter (or forget the stopped one)
                 self.interpreter.kill()
                 self.interpreter = None
                 self.app.running_interpreter_proxy = None            
@@ -420,7 +429,8 @@ class Console:
         # non-blocking call
         self.app.icon_widget.enable_icon_running()
         self.app.running_interpreter_callback = callback
-        self.interpreter.execute(callback)
+        self.begin_stream()
+        self.interpreter.execute(callback, self.stream_output)
 
     def no_file_to_run_message(self):
         self.reset_output()
@@ -456,6 +466,18 @@ class Console:
             raise KeyboardInterrupt
 
 
+    def begin_stream(self):
+        """ The output of the program is shown as it is produced """
+        self.output_console.mark_set("streammark", "iomark")
+        self.output_console.mark_gravity("streammark", "left")
+
+    def stream_output(self, output):
+        self.write(output, tags=('stdout'))
+
+    def end_stream(self):
+        """ Remove the streamed output (the report includes it) """
+        self.output_console.delete("streammark", "iomark")
+
     def begin(self):
         """ Display some informations in the output console at the beginning """
         self.output_console.mark_set("iomark", "insert")
@@ -5,16 +5,19 @@ import tokenize
 import sys
 import traceback
 
-import tempfile
+from OutputCapture import capture_stream, report_overflow, ERROR_BUFFER_SIZE
+from ResourceLimits import LimitExceeded, report_limit_error
 
 class FullRunner:
     """
     Runs a code under the full mode
     """
     
-    def __init__(self, filename, source):
+    def __init__(self, filename, source, limits=None):
         self.filename = filename
         self.source = source
+        # the resource limits of the run (ResourceLimits), if any
+        self.limits = limits
         self.report = RunReport()        
 
 
@@ -23,14 +26,26 @@ class FullRunner:
         return self.report
 
 
+    def run_code(self, interpreter, code, locals):
+        """ Run the code (as InteractiveInterpreter.runcode), but the
+        exceeded limits are not shown as tracebacks: they are reported,
+        or raised for LimitExceeded (cf. PyInterpreter.run_limited) """
+        try:
+            exec(code, locals)
+        except (SystemExit, LimitExceeded):
+            raise
+        except (MemoryError, RecursionError) as err:
+            report_limit_error(self.report, err, self.filename, self.limits)
+            return False
+        except:
+            interpreter.showtraceback()
+        return True
+
     def execute_or_eval(self, mode, locals):
         """ Run the code """
         basic_interpreter = InteractiveInterpreter(locals=locals)
 
-        with tempfile.TemporaryFile(mode='w+', prefix='interpreter_error') as error_output:
-        
-            original_error = sys.stderr
-            sys.stderr = error_output
+        with capture_stream('stderr', ERROR_BUFFER_SIZE):
             try:
                 if mode == 'exec':
                     code = compile(self.source, self.filename, 'exec')
@@ -44,7 +59,8 @@ class FullRunner:
                 return False
             else: # No compilation errors here
                 if mode == 'exec':
-                    result = basic_interpreter.runcode(code)
+                    if not self.run_code(basic_interpreter, code, locals):
+                        return False
 
                     sys.stderr.seek(0)
                     result = sys.stderr.read()
@@ -55,11 +71,15 @@ class FullRunner:
                         sys.stdout.seek(0)
                         result = sys.stdout.read()
                         self.report.set_result(result)
+                        report_overflow(self.report, sys.stdout)
                         return True
 
                 else: # mode eval
                     try:
                         result = eval(code, locals, locals)
+                    except (MemoryError, RecursionError) as err:
+                        report_limit_error(self.report, err, self.filename, self.limits)
+                        return False
                     except Exception as err:
                         a, b, tb = sys.exc_info() # Get the traceback object
                         # Extract the information for the traceback corresponding to the error
@@ -74,9 +94,6 @@ class FullRunner:
                     self.report.set_result(result)
                     return True
 
-            finally:
-                sys.stderr = original_error
-
     def execute(self, locals):
         """ Run the code """
         return self.execute_or_eval('exec', locals)
@@ -0,0 +1,152 @@
+"""
+In-memory capture of the outputs (stdout, stderr) of the programs.
+
+The captured text is kept in ring buffers of bounded size: beyond the
+capacity, the oldest text is dropped (and counted, for the report).
+"""
+
+import io
+import sys
+from collections import deque
+from contextlib import contextmanager
+
+# the (default) capacities of the buffers, in bytes (utf-8)
+OUTPUT_BUFFER_SIZE = 1024 * 1024
+ERROR_BUFFER_SIZE = 64 * 1024
+
+# the small writes are gathered in chunks of (about) this size
+RING_CHUNK_SIZE = 4096
+
+class RingBuffer(io.TextIOBase):
+    """
+    A text stream keeping (only) its last capacity bytes.
+    It can be read back from the start, like a (temporary) file.
+    """
+    encoding = 'utf-8'
+
+    def __init__(self, capacity=OUTPUT_BUFFER_SIZE):
+        super().__init__()
+        self.capacity = capacity
+        # the full chunks, and their sizes (in bytes)
+        self.chunks = deque()
+        self.chunk_sizes = deque()
+        # the last writes (not yet gathered in a chunk)
+        self.tail = []
+        self.tail_size = 0
+        self.size = 0
+        self.read_pos = 0
+        # the overflow
+        self.bytes_dropped = 0
+        self.lines_dropped = 0
+
+    def readable(self):
+        return True
+
+    def writable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def write(self, s):
+        if self.closed:
+            raise ValueError("write to closed buffer")
+        if not isinstance(s, str):
+            raise TypeError('must be str, not ' + type(s).__name__)
+        if not s:
+            return 0
+        size = len(s.encode('utf-8', 'replace'))
+        self.tail.append(s)
+        self.tail_size += size
+        self.size += size
+        if self.tail_size >= RING_CHUNK_SIZE:
+            self.gather()
+        while self.size > self.capacity:
+            self.drop()
+        return len(s)
+
+    def gather(self):
+        if self.tail:
+            self.chunks.append("".join(self.tail))
+            self.chunk_sizes.append(self.tail_size)
+            self.tail = []
+            self.tail_size = 0
+
+    def drop(self):
+        """ Drops (the start of) the oldest chunk """
+        if not self.chunks:
+            self.gather()
+        excess = self.size - self.capacity
+        chunk = self.chunks[0]
+        chunk_size = self.chunk_sizes[0]
+        if chunk_size <= excess:
+            self.chunks.popleft()
+            self.chunk_sizes.popleft()
+            dropped = chunk
+            dropped_size = chunk_size
+        else:
+            # (a character cut in the middle is dropped)
+            kept = chunk.encode('utf-8', 'replace')[excess:].decode('utf-8', 'ignore')
+            kept_size = len(kept.encode('utf-8', 'replace'))
+            dropped = chunk[:len(chunk) - len(kept)]
+            dropped_size = chunk_size - kept_size
+            self.chunks[0] = kept
+            self.chunk_sizes[0] = kept_size
+        self.size -= dropped_size
+        self.bytes_dropped += dropped_size
+        self.lines_dropped += dropped.count('\n')
+        self.read_pos = max(0, self.read_pos - len(dropped))
+
+    def getvalue(self):
+        self.gather()
+        if len(self.chunks) > 1:
+            text = "".join(self.chunks)
+            self.chunks = deque([text])
+            self.chunk_sizes = deque([self.size])
+        return self.chunks[0] if self.chunks else ""
+
+    def seek(self, offset, whence=0):
+        if whence == 0:
+            self.read_pos = offset
+        elif whence == 2:
+            self.read_pos = len(self.getvalue()) + offset
+        else:
+            raise io.UnsupportedOperation("can't do nonzero cur-relative seeks")
+        return self.read_pos
+
+    def tell(self):
+        return self.read_pos
+
+    def read(self, size=-1):
+        text = self.getvalue()
+        if size is None or size < 0:
+            end = len(text)
+        else:
+            end = self.read_pos + size
+        result = text[self.read_pos:end]
+        self.read_pos += len(result)
+        return result
+
+    def has_overflow(self):
+        return self.bytes_dropped > 0
+
+
+@contextmanager
+def capture_stream(name, capacity):
+    """
+    Redirects sys.stdout or sys.stderr (the name) to a ring buffer
+    (within the context).
+    """
+    buffer = RingBuffer(capacity)
+    original = getattr(sys, name)
+    setattr(sys, name, buffer)
+    try:
+        yield buffer
+    finally:
+        setattr(sys, name, original)
+        buffer.close()
+
+def report_overflow(report, stream):
+    """ Reports the overflow of the output (if captured in a ring buffer) """
+    if isinstance(stream, RingBuffer) and stream.has_overflow():
+        report.set_output_overflow(stream.bytes_dropped, stream.lines_dropped)
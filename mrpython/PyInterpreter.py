@@ -1,6 +1,9 @@
-from StudentRunner import StudentRunner
+from StudentRunner import StudentRunner, type_check_file
 from FullRunner import FullRunner
 from translate import tr
+from OutputCapture import RingBuffer, report_overflow, OUTPUT_BUFFER_SIZE
+from ResourceLimits import LimitExceeded, killed_by_limit
+from RunReport import RunReport
 
 import multiprocessing as mp
 
@@ -9,49 +12,284 @@ import tkinter as tk
 import tokenize
 
 import sys
+import time
+import threading
+from collections import deque
+
+from typechecking.type_parser import shared_type_parser
+
+# the delay (in ms) between two checks of the pipe, only where Tk has
+# no file handlers (Windows)
+RUN_POLL_DELAY=20
+
+# the number of interpreter processes kept ready in the background
+INTERPRETER_POOL_SIZE = 1
+
+# the output of the programs is sent to the IDE by chunks: when there are
+# OUTPUT_CHUNK_SIZE characters, or after OUTPUT_CHUNK_DELAY seconds
+OUTPUT_CHUNK_SIZE = 4096
+OUTPUT_CHUNK_DELAY = 0.05
+# the maximum number of chunks sent but not yet acknowledged by the IDE
+OUTPUT_WINDOW = 4
+# the (default) maximum size of the output, in characters
+OUTPUT_CAP = 1000000
+
+def has_file_handlers(root):
+    return hasattr(root.tk, 'createfilehandler')
+
+def watch_readable(root, comm, handler):
+    """
+    Calls handler() (from the Tk event loop) whenever the connection
+    is readable: a message or the end of the connection.
+    Returns the function that stops watching.
+    """
+    if has_file_handlers(root):
+        fd = comm.fileno()
+        root.tk.createfilehandler(fd, tk.READABLE, lambda fd, mask: handler())
+        return lambda: root.tk.deletefilehandler(fd)
+
+    # no file handlers: polling
+    timer = [None]
+    def poll():
+        timer[0] = root.after(RUN_POLL_DELAY, poll)
+        if comm.poll():
+            handler()
+    timer[0] = root.after(RUN_POLL_DELAY, poll)
+    return lambda: root.after_cancel(timer[0])
+
+
+class WarmInterpreter:
+    """
+    An interpreter process started in advance: it is initialized
+    (libraries, type-checker, tk root) but waits for its mode and file.
+    """
+    def __init__(self, ready_times=None, target=None):
+        self.comm, there = mp.Pipe()
+        # (the process function: run_process, unless another one is given)
+        self.process = mp.Process(target=target or run_process, args=(there,))
+        self.spawn_time = time.perf_counter()
+        # the spawn-to-ready time, and the initialization time in the child
+        self.ready_time = None
+        self.init_time = None
+        self.ready_times = ready_times
+        self.unwatch = None
+        self.process.start()
+        there.close()
+
+    def ready(self, message):
+        self.ready_time = time.perf_counter() - self.spawn_time
+        self.init_time = message[1]
+        if self.ready_times is not None:
+            self.ready_times.append(self.ready_time)
+
+    def check_ready(self):
+        """ Is the interpreter ready? (non-blocking) """
+        if self.ready_time is None:
+            try:
+                if self.comm.poll():
+                    self.ready(self.comm.recv())
+            except (EOFError, OSError):
+                # the process died
+                pass
+        return self.ready_time is not None
+
+    def watch(self, root):
+        """ Records the ready message as soon as it is sent """
+        def readable():
+            # (the only message before the start is the ready message)
+            self.stop_watching()
+            self.check_ready()
+        self.unwatch = watch_readable(root, self.comm, readable)
+
+    def stop_watching(self):
+        if self.unwatch is not None:
+            self.unwatch()
+            self.unwatch = None
+
+    def is_alive(self):
+        return self.process.is_alive()
+
+    def kill(self):
+        self.stop_watching()
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join()
+
+
+class InterpreterPool:
+    """
+    Interpreter processes started in advance, so that a run does not wait
+    for a new process to start (and to import the libraries and the
+    type-checker). An interpreter is handed out on each run, and the pool
+    is refilled in the background.
+    """
+    def __init__(self, root, size=INTERPRETER_POOL_SIZE):
+        self.root = root
+        self.size = size
+        self.interpreters = []
+        # statistics
+        self.nb_spawned = 0
+        self.nb_taken_ready = 0
+        self.nb_taken_cold = 0
+        self.ready_times = []
+
+    def spawn(self):
+        self.nb_spawned += 1
+        return WarmInterpreter(self.ready_times)
+
+    def discard_dead(self):
+        for interp in self.interpreters:
+            if not interp.is_alive():
+                interp.stop_watching()
+        self.interpreters = [interp for interp in self.interpreters if interp.is_alive()]
+
+    def fill(self):
+        """ Starts interpreters up to the size of the pool """
+        self.discard_dead()
+        while len(self.interpreters) < self.size:
+            interp = self.spawn()
+            interp.watch(self.root)
+            self.interpreters.append(interp)
+
+    def take(self):
+        """ Hands out an interpreter, a ready one if possible """
+        self.discard_dead()
+        ready = [interp for interp in self.interpreters if interp.check_ready()]
+        if ready:
+            interp = ready[0]
+            self.nb_taken_ready += 1
+        else:
+            interp = self.interpreters[0] if self.interpreters else self.spawn()
+            self.nb_taken_cold += 1
+        if interp in self.interpreters:
+            self.interpreters.remove(interp)
+        interp.stop_watching()
+        self.root.after_idle(self.fill)
+        return interp
+
+    def shutdown(self):
+        for interp in self.interpreters:
+            interp.kill()
+        self.interpreters = []
+
+    def timings(self):
+        """ A summary of the spawn-to-ready times """
+        msg = "interpreters: {} spawned, {} handed out ready, {} not (yet) ready".format(
+            self.nb_spawned, self.nb_taken_ready, self.nb_taken_cold)
+        if self.ready_times:
+            msg += ", spawn-to-ready: min={:.0f}ms avg={:.0f}ms max={:.0f}ms".format(
+                min(self.ready_times) * 1000
+                , sum(self.ready_times) * 1000 / len(self.ready_times)
+                , max(self.ready_times) * 1000)
+        return msg
 
-RUN_POLL_DELAY=250
 
 class InterpreterProxy:
     """
     This is a multiprocessing proxy for the underlying python interpreter.
+    The interpreter process is taken from the pool if any (or started
+    on the first command), then told its mode and file.
+    The results are delivered (to the callbacks) as soon as they are sent.
     """
-    def __init__(self, root, mode, filename):
-        self.comm, there = mp.Pipe()
-        self.process = mp.Process(target=run_process, args=(there, mode, filename))
+    def __init__(self, root, mode, filename, pool=None, output_cap=OUTPUT_CAP
+                 , output_buffer_size=OUTPUT_BUFFER_SIZE, limits=None):
         self.root = root
+        if pool is not None:
+            self.warm = pool.take()
+            self.comm = self.warm.comm
+            self.process = self.warm.process
+        else:
+            self.warm = None
+            self.comm, there = mp.Pipe()
+            self.process = mp.Process(target=run_process, args=(there,))
+        self.start_message = ('start', mode, filename, output_cap, output_buffer_size, limits)
+        self.mode = mode
+        self.filename = filename
+        self.limits = limits
+        self.started = False
+        self.unwatch = None
+        self.output_callback = None
 
-    def run_evaluation(self, expr, callback):
-        if not self.process.is_alive():
-            self.process.start()
+    def start(self):
+        if not self.started:
+            if self.warm is None and not self.process.is_alive():
+                self.process.start()
+            self.comm.send(self.start_message)
+            self.started = True
 
-        def timer_callback():
-            if self.comm.poll():
-                ok, report = self.comm.recv()
-                callback(ok, report)
+    def receive(self):
+        """ The result sent by the interpreter, or None if not (yet) available """
+        while self.comm.poll():
+            message = self.comm.recv()
+            if message[0] == 'ready':
+                if self.warm is not None:
+                    self.warm.ready(message)
+            elif message[0] == 'output':
+                self.comm.send('ack')
+                if self.output_callback is not None:
+                    self.output_callback(message[1])
             else:
-                self.root.after(RUN_POLL_DELAY, timer_callback)
-            
+                return message
+        return None
+
+    def wait_result(self, callback):
+        def readable():
+            try:
+                message = self.receive()
+            except (EOFError, OSError):
+                # the interpreter is gone (killed)
+                self.stop_waiting()
+                report = self.killed_report()
+                if report is not None:
+                    callback(False, report)
+                return
+            if message is not None:
+                self.stop_waiting()
+                ok, report = message
+                callback(ok, report)
+
+        self.stop_waiting()
+        self.unwatch = watch_readable(self.root, self.comm, readable)
+
+    def killed_report(self):
+        """ The report of an interpreter killed for exceeding a limit (or None) """
+        self.process.join(1)
+        limit = killed_by_limit(self.process.exitcode)
+        if limit is None or self.limits is None:
+            return None
+        report = RunReport()
+        report.set_header("\n====== STOP ======\n")
+        report.add_limit_error(limit, None, self.limits.details(limit))
+        report.set_footer("\n==================\n")
+        return report
+
+    def stop_waiting(self):
+        if self.unwatch is not None:
+            self.unwatch()
+            self.unwatch = None
+
+    def run_evaluation(self, expr, callback, output_callback=None):
+        """ The output of the evaluation is given to output_callback
+        as it is produced (if any), then the result to callback """
+        self.start()
+        self.output_callback = output_callback
         self.comm.send('eval')
         self.comm.send(expr)
-        timer_callback()
+        self.wait_result(callback)
 
-    def execute(self, callback):
-        if not self.process.is_alive():
-            self.process.start()
-
-        def timer_callback():
-            if self.comm.poll():
-                ok, report = self.comm.recv()
-                # print("[proxy] RECV: exec ok ? {}  report={}".format(ok, report))
-                callback(ok, report)
-            else:
-                self.root.after(RUN_POLL_DELAY, timer_callback)
-            
+    def execute(self, callback, output_callback=None):
+        self.start()
+        self.output_callback = output_callback
         self.comm.send('exec')
-        timer_callback()
+        # the type-checking (student mode) is made here: the incremental
+        # checker keeps the previous checks of the file in the IDE process
+        self.comm.send(type_check_file(self.filename) if self.mode == 'student' else None)
+        self.wait_result(callback)
             
     def kill(self):
+        # (the late output and result are dropped)
+        self.stop_waiting()
+        self.output_callback = None
         if self.process.is_alive():
             self.process.terminate()
             self.process.join()
@@ -59,61 +297,250 @@ class InterpreterProxy:
         else:
             return False
 
-def run_process(comm, mode, filename):
-    
-    root = tk.Tk()
-    
-    interp = PyInterpreter(root, mode, filename)
-    
-    def run_loop():
-        command = comm.recv()
-        if command == 'eval':
-            expr = comm.recv()
-            ok, report = interp.run_evaluation(expr)
-            comm.send((ok, report))
-        elif command == 'exec':
-            ok, report = interp.execute()
-            # print("[interp] exec ok ? {}  report={}".format(ok, report))
-            comm.send((ok, report))
-
-        root.after(10, run_loop)
+def run_process(comm):
+    start_time = time.perf_counter()
 
+    root = tk.Tk()
     root.title(tr("Interpretation."))
-    root.after(10, run_loop)
     root.withdraw()
-    root.mainloop()
+    serve_commands(comm, root, start_time)
+
+def serve_commands(comm, root, start_time):
+    """ Tells the IDE that the interpreter (with its tk root) is ready,
+    then runs the commands of the IDE until it is gone """
+    # load the type parser (its grammars) in advance
+    shared_type_parser()
+
+    # ready: wait for the mode and file to run
+    comm.send(('ready', time.perf_counter() - start_time))
+    try:
+        (_, mode, filename, output_cap, output_buffer_size, limits) = comm.recv()
+    except EOFError:
+        return
+
+    interp = PyInterpreter(root, mode, filename, comm=comm, output_cap=output_cap
+                           , output_buffer_size=output_buffer_size, limits=limits)
+    
+    def serve():
+        """ Runs the next command (and the commands received meanwhile),
+        returns False when the IDE is gone """
+        try:
+            while True:
+                command = interp.receive()
+                if command == 'ack':
+                    # (a late acknowledgement of the output)
+                    pass
+                elif command == 'eval':
+                    expr = interp.receive()
+                    ok, report = interp.run_evaluation(expr)
+                    comm.send((ok, report))
+                elif command == 'exec':
+                    type_checked = interp.receive()
+                    ok, report = interp.execute(type_checked)
+                    # print("[interp] exec ok ? {}  report={}".format(ok, report))
+                    comm.send((ok, report))
+                if not interp.deferred:
+                    return True
+        except (EOFError, BrokenPipeError):
+            return False
+
+    if has_file_handlers(root):
+        # the Tk event loop (for the student's windows) wakes up on commands
+        def readable(fd, mask):
+            if not serve():
+                root.tk.deletefilehandler(comm.fileno())
+                root.destroy()
+        root.tk.createfilehandler(comm.fileno(), tk.READABLE, readable)
+        root.mainloop()
+    else:
+        # blocking loop, with the Tk events processed between the commands
+        while serve():
+            root.update()
     
         
+class StreamedOutput(RingBuffer):
+    """
+    The standard output of the programs: its end is recorded (for the
+    report) and it is sent to the IDE, by chunks, as it is produced.  The
+    chunks are sent by a sender thread, at most OUTPUT_WINDOW of them not
+    yet acknowledged by the IDE: the writes block while a whole chunk
+    waits to be sent.  The output is truncated beyond cap characters.
+
+    Only the sender thread counts the acknowledgements: the signal handlers
+    (e.g. of the resource limits) interrupt the main thread, possibly
+    between the receipt of an acknowledgement and its count.
+    """
+    def __init__(self, comm, deferred, cap=OUTPUT_CAP, capacity=OUTPUT_BUFFER_SIZE):
+        super().__init__(capacity)
+        self.comm = comm
+        # the messages received while waiting for an acknowledgement
+        self.deferred = deferred
+        self.cap = cap
+        self.nb_chars = 0
+        self.truncated = False
+        self.pending = []
+        self.pending_size = 0
+        self.flush_requested = False
+        self.last_send = time.perf_counter()
+        self.unacked = 0
+        self.stopped = False
+        # the IDE is gone (the output is only recorded)
+        self.disconnected = False
+        self.cond = threading.Condition()
+        self.sender = threading.Thread(target=self.send_loop, daemon=True)
+        self.sender.start()
+
+    def write(self, s):
+        with self.cond:
+            if self.truncated:
+                return len(s)
+            text = s
+            if self.nb_chars + len(text) > self.cap:
+                text = text[:self.cap - self.nb_chars]
+                self.truncated = True
+            super().write(text)
+            self.nb_chars += len(text)
+            self.pending.append(text)
+            self.pending_size += len(text)
+            if self.truncated:
+                note = tr("\n[output truncated after {} characters]\n").format(self.cap)
+                super().write(note)
+                self.pending.append(note)
+                self.flush_requested = True
+            self.cond.notify_all()
+            # (the program waits for the IDE)
+            while self.pending_size >= OUTPUT_CHUNK_SIZE and not self.disconnected:
+                self.cond.wait()
+        return len(s)
+
+    def flush(self):
+        with self.cond:
+            if self.pending:
+                self.flush_requested = True
+                self.cond.notify_all()
+
+    def send_pending(self):
+        """ Sends the pending output (the lock must be held) """
+        self.comm.send(('output', "".join(self.pending)))
+        self.unacked += 1
+        self.pending = []
+        self.pending_size = 0
+        self.flush_requested = False
+        self.last_send = time.perf_counter()
+        self.cond.notify_all()
+
+    def send_loop(self):
+        """ Sends the chunks when they are full, flushed or OUTPUT_CHUNK_DELAY
+        old, and receives the acknowledgements when the window is full """
+        try:
+            while True:
+                with self.cond:
+                    while not self.pending or self.unacked < OUTPUT_WINDOW:
+                        if not self.pending:
+                            if self.stopped:
+                                return
+                            self.cond.wait()
+                            continue
+                        delay = self.last_send + OUTPUT_CHUNK_DELAY - time.perf_counter()
+                        if (self.stopped or self.flush_requested or delay <= 0
+                            or self.pending_size >= OUTPUT_CHUNK_SIZE):
+                            self.send_pending()
+                        else:
+                            self.cond.wait(delay)
+                # the window is full: waits for an acknowledgement (without the lock)
+                message = self.comm.recv()
+                with self.cond:
+                    if message == 'ack':
+                        self.unacked -= 1
+                    else:
+                        # (handled after the run)
+                        self.deferred.append(message)
+        except (EOFError, OSError):
+            with self.cond:
+                self.disconnected = True
+                self.pending = []
+                self.pending_size = 0
+                self.cond.notify_all()
+
+    def stop(self):
+        """ Sends the remaining output, the text is kept """
+        with self.cond:
+            self.stopped = True
+            self.cond.notify_all()
+        self.sender.join()
+
+
 class PyInterpreter:
     """
     This class aims at running the code and checking process, and builds
     a report that will be sent to the Console
     """
 
-    def __init__(self, root, mode, filename, source=None):
+    def __init__(self, root, mode, filename, source=None, comm=None, output_cap=OUTPUT_CAP
+                 , output_buffer_size=OUTPUT_BUFFER_SIZE, limits=None):
         self.root = root
         self.filename = filename
         self.source = source
         self.mode = mode
+        # the connection to the IDE (to stream the output), if any
+        self.comm = comm
+        # the commands received during a run (cf. StreamedOutput)
+        self.deferred = deque()
+        self.output_cap = output_cap
+        self.output_buffer_size = output_buffer_size
+        # the resource limits of the runs (ResourceLimits), if any
+        self.limits = limits
         # This dictionnary can keep the local declarations form the execution of code
         # Will be used for evaluation
         self.locals = dict()
 
 
+    def receive(self):
+        """ The next message from the IDE (the deferred ones first) """
+        if self.deferred:
+            return self.deferred.popleft()
+        return self.comm.recv()
+
+    def open_output(self):
+        if self.comm is not None:
+            return StreamedOutput(self.comm, self.deferred, self.output_cap, self.output_buffer_size)
+        return RingBuffer(self.output_buffer_size)
+
+    def close_output(self, output_file):
+        if isinstance(output_file, StreamedOutput):
+            output_file.stop()
+        output_file.close()
+
+    def run_limited(self, run, runner, output_file):
+        """ Call run() within the resource limits (if any) """
+        if self.limits is None:
+            return run()
+        ok = False
+        try:
+            with self.limits.applied(self.filename):
+                ok = run()
+        except LimitExceeded:
+            # the runner was interrupted (before recording the output)
+            report = runner.get_report()
+            report.set_output(output_file.getvalue())
+            report_overflow(report, output_file)
+        self.limits.report_breach(runner.get_report())
+        return ok
+
     def run_evaluation(self, expr):
         """ Run the evaluation of expr """
 
-        output_file = open('interpreter_output', 'w+')
+        output_file = self.open_output()
         original_stdout = sys.stdout
         sys.stdout = output_file
         
         runner = None
         if self.mode == "student":
-            runner = StudentRunner(self.root, self.filename, expr)
+            runner = StudentRunner(self.root, self.filename, expr, limits=self.limits)
         else:
-            runner = FullRunner(self.filename, expr)
+            runner = FullRunner(self.filename, expr, self.limits)
 
-        ok = runner.evaluate(expr, self.locals)
+        ok = self.run_limited(lambda: runner.evaluate(expr, self.locals), runner, output_file)
         report = runner.get_report()
         begin_report = "=== " + tr("Evaluating: ") + "'" + expr + "' ===\n"
         report.set_header(begin_report)
@@ -121,26 +548,27 @@ class PyInterpreter:
         report.set_footer(end_report)
 
         sys.stdout = original_stdout
-        output_file.close()
+        self.close_output(output_file)
         
         return (ok, report)
 
-    def execute(self):
-        """ Execute the runner corresponding to the chosen Python mode """
+    def execute(self, type_checked=None):
+        """ Execute the runner corresponding to the chosen Python mode
+        (type_checked: the type-checking made by the IDE, in student mode) """
         with tokenize.open(self.filename) as fp:
             source = fp.read()
 
-        output_file = open('interpreter_output', 'w+')
+        output_file = self.open_output()
         original_stdout = sys.stdout
         sys.stdout = output_file
             
         runner = None
         if self.mode == "student":
-            runner = StudentRunner(self.root, self.filename, source)
+            runner = StudentRunner(self.root, self.filename, source, limits=self.limits, type_checked=type_checked)
         else:
-            runner = FullRunner(self.filename, source)
+            runner = FullRunner(self.filename, source, self.limits)
 
-        ok = runner.execute(self.locals)
+        ok = self.run_limited(lambda: runner.execute(self.locals), runner, output_file)
 
         report = runner.get_report()
         import os
@@ -160,6 +588,6 @@ class PyInterpreter:
         report.set_footer(end_report)
 
         sys.stdout = original_stdout
-        output_file.close()
+        self.close_output(output_file)
 
         return (ok, report)
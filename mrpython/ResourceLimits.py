@@ -0,0 +1,250 @@
+"""
+Resource limits of the runs, applied in the interpreter process:
+CPU time (RLIMIT_CPU), memory (RLIMIT_AS), wall-clock time (a watchdog
+thread) and recursion depth.
+
+A program exceeding its CPU or wall-clock time is interrupted (with
+LimitExceeded) again and again, until it stops.  A program still running
+LIMIT_GRACE_TIME seconds later is killed: by the hard RLIMIT_CPU, or by
+the watchdog (with the exit code WALL_TIME_EXIT_CODE).
+
+The CPU and memory limits are only available where the resource module
+is (not on Windows).
+"""
+
+import os
+import sys
+import signal
+import threading
+import time
+import _thread
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# the default limits (None: no limit)
+DEFAULT_CPU_TIME = 60          # seconds
+DEFAULT_WALL_TIME = 120        # seconds
+DEFAULT_MEMORY = 1024          # megabytes (more than at the start of the run)
+DEFAULT_RECURSION_DEPTH = 1000 # nested calls
+
+# the delay (in seconds) between two interruptions of a program
+# exceeding its wall-clock time
+WATCHDOG_TICK = 1
+# the time (in seconds) left to a program exceeding its CPU or wall-clock
+# time to stop, before it is killed
+LIMIT_GRACE_TIME = 5
+# the exit code of an interpreter killed by the watchdog
+WALL_TIME_EXIT_CODE = 124
+
+class LimitExceeded(BaseException):
+    """
+    A limit is exceeded by the program.  This is not an Exception, so
+    that `except Exception` does not catch it; a program catching it anyway
+    (e.g. with a bare except) is interrupted again, then killed.
+    """
+    def __init__(self, limit, line=None):
+        super().__init__(limit, line)
+        self.limit = limit
+        self.line = line
+
+
+def program_line(frame, filename):
+    """ The line of the program executing in frame (or in its callers) """
+    while frame is not None:
+        if frame.f_code.co_filename == filename:
+            return frame.f_lineno
+        frame = frame.f_back
+    return None
+
+def stack_depth():
+    depth = 0
+    frame = sys._getframe()
+    while frame is not None:
+        depth += 1
+        frame = frame.f_back
+    return depth
+
+def address_space_size():
+    """ The current size of the address space (in bytes), or None if unknown """
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[0]) * resource.getpagesize()
+    except (OSError, ValueError, IndexError):
+        return None
+
+def report_limit_error(report, err, filename, limits=None):
+    """ Reports a MemoryError or RecursionError (err) raised by the program
+    (filename) as an exceeded limit """
+    limit = 'memory' if isinstance(err, MemoryError) else 'recursion'
+    tb = err.__traceback__
+    while tb is not None and tb.tb_next is not None:
+        tb = tb.tb_next
+    line = program_line(tb.tb_frame, filename) if tb is not None else None
+    report.add_limit_error(limit, line, limits.details(limit) if limits is not None else "")
+
+def killed_by_limit(exitcode):
+    """ The limit (if any) which killed an interpreter, given its exit code """
+    if exitcode == WALL_TIME_EXIT_CODE:
+        return 'wall'
+    if resource is not None and exitcode in (-signal.SIGKILL, -signal.SIGXCPU):
+        # (the hard RLIMIT_CPU)
+        return 'cpu'
+    return None
+
+
+class ResourceLimits:
+    """
+    The limits of a run (each one is None for no limit).
+    """
+    def __init__(self, cpu_time=DEFAULT_CPU_TIME, wall_time=DEFAULT_WALL_TIME
+                 , memory=DEFAULT_MEMORY, recursion_depth=DEFAULT_RECURSION_DEPTH):
+        self.cpu_time = cpu_time
+        self.wall_time = wall_time
+        self.memory = memory
+        self.recursion_depth = recursion_depth
+        # the limit exceeded during the last run: (limit, line) or None
+        self.breach = None
+
+    def details(self, limit):
+        if limit == 'cpu':
+            (value, unit) = (self.cpu_time, " s")
+        elif limit == 'wall':
+            (value, unit) = (self.wall_time, " s")
+        elif limit == 'memory':
+            (value, unit) = (self.memory, " MB")
+        else:
+            (value, unit) = (self.recursion_depth, "")
+        # (the default limits of python, e.g. its recursion limit, have no details)
+        return "{}{}".format(value, unit) if value is not None else ""
+
+    def exceeded(self, limit, line):
+        if self.breach is None:
+            self.breach = (limit, line)
+        return LimitExceeded(limit, line)
+
+    @contextmanager
+    def applied(self, filename):
+        """
+        Applies the limits to the run of the program (filename) within
+        the context: LimitExceeded is raised when the CPU or wall-clock
+        time is exceeded, MemoryError and RecursionError for the others.
+
+        The hard RLIMIT_CPU can only be lowered: in an interpreter process
+        running several programs (e.g. the evaluations after a run), the
+        CPU time of the later runs is bounded by the first one's.
+        """
+        self.breach = None
+        # the signal handlers run in the main thread, between any two
+        # instructions: they must not take the lock, and only interrupt
+        # the program itself (not the runner, e.g. in its error handling)
+        lock = threading.Lock()
+        active = threading.Event()
+        active.set()
+        stopped = threading.Event()
+        # (set once the wall-clock time is exceeded, even after another breach)
+        overdue = threading.Event()
+        restore = []
+
+        def on_interrupt(signum, frame):
+            # (from the watchdog, or the user)
+            if not active.is_set():
+                return
+            if overdue.is_set():
+                line = program_line(frame, filename)
+                if line is not None:
+                    raise self.exceeded('wall', line)
+                return
+            raise KeyboardInterrupt
+
+        def interrupt(main_thread):
+            if hasattr(signal, 'pthread_kill'):
+                # (a signal also interrupts the blocking calls, e.g. sleep)
+                signal.pthread_kill(main_thread, signal.SIGINT)
+            else:
+                _thread.interrupt_main()
+
+        def watch(main_thread, deadline):
+            # interrupts the program every tick after the deadline,
+            # and kills it after the grace time
+            delay = deadline - time.perf_counter()
+            while not stopped.wait(max(delay, 0)):
+                with lock:
+                    if not active.is_set():
+                        return
+                    if time.perf_counter() >= deadline + LIMIT_GRACE_TIME:
+                        os._exit(WALL_TIME_EXIT_CODE)
+                    if self.breach is None:
+                        frame = sys._current_frames().get(main_thread)
+                        self.exceeded('wall', program_line(frame, filename))
+                    overdue.set()
+                    interrupt(main_thread)
+                delay = WATCHDOG_TICK
+
+        def on_cpu_time(signum, frame):
+            # (the signal is sent again every second, up to the hard limit)
+            if not active.is_set():
+                return
+            line = program_line(frame, filename)
+            if line is not None:
+                raise self.exceeded('cpu', line)
+
+        watchdog = None
+        if self.wall_time is not None:
+            restore.append(lambda handler=signal.signal(signal.SIGINT, on_interrupt):
+                           signal.signal(signal.SIGINT, handler))
+            watchdog = threading.Thread(target=watch, daemon=True
+                                        , args=(threading.get_ident(), time.perf_counter() + self.wall_time))
+            watchdog.start()
+
+        if resource is not None and self.cpu_time is not None:
+            usage = resource.getrusage(resource.RUSAGE_SELF)
+            (soft, hard) = resource.getrlimit(resource.RLIMIT_CPU)
+            limit = int(usage.ru_utime + usage.ru_stime + self.cpu_time) + 1
+            # the backstop: the kernel kills the process at the hard limit
+            hard_limit = limit + LIMIT_GRACE_TIME
+            if hard != resource.RLIM_INFINITY:
+                hard_limit = min(hard_limit, hard)
+                limit = min(limit, hard)
+            restore.append(lambda handler=signal.signal(signal.SIGXCPU, on_cpu_time):
+                           signal.signal(signal.SIGXCPU, handler))
+            resource.setrlimit(resource.RLIMIT_CPU, (limit, hard_limit))
+            # (the soft limit is restored, the hard one cannot be raised again)
+            if soft == resource.RLIM_INFINITY or soft > hard_limit:
+                soft = hard_limit
+            restore.append(lambda limits=(soft, hard_limit): resource.setrlimit(resource.RLIMIT_CPU, limits))
+
+        if resource is not None and self.memory is not None:
+            size = address_space_size()
+            if size is not None:
+                (soft, hard) = resource.getrlimit(resource.RLIMIT_AS)
+                limit = size + self.memory * 1024 * 1024
+                if hard != resource.RLIM_INFINITY:
+                    limit = min(limit, hard)
+                resource.setrlimit(resource.RLIMIT_AS, (limit, hard))
+                restore.append(lambda limits=(soft, hard): resource.setrlimit(resource.RLIMIT_AS, limits))
+
+        if self.recursion_depth is not None:
+            recursion_limit = sys.getrecursionlimit()
+            sys.setrecursionlimit(stack_depth() + self.recursion_depth)
+            restore.append(lambda: sys.setrecursionlimit(recursion_limit))
+
+        try:
+            yield self
+        finally:
+            with lock:
+                active.clear()
+            stopped.set()
+            if watchdog is not None:
+                watchdog.join()
+            for undo in reversed(restore):
+                undo()
+
+    def report_breach(self, report):
+        """ Reports the limit exceeded during the last run (if any) """
+        if self.breach is not None and report.limit_exceeded is None:
+            (limit, line) = self.breach
+            report.add_limit_error(limit, line, self.details(limit))
@@ -33,6 +33,12 @@ class ErrorReport:
         return str(self)
 
 
+# the resource limits of the runs
+LIMIT_ERRORS = { 'cpu' : "CPU time limit exceeded"
+                 , 'wall' : "Time limit exceeded"
+                 , 'memory' : "Memory limit exceeded"
+                 , 'recursion' : "Recursion limit exceeded (too many nested calls)" }
+
 class RunReport:
     """
     Handles the result of the execution of the source code
@@ -46,6 +52,11 @@ class RunReport:
 
         self.result = None
         self.output = ""
+        # the start of the output dropped (by the capture buffer)
+        self.output_bytes_dropped = 0
+        self.output_lines_dropped = 0
+        # the resource limit exceeded, if any ('cpu', 'wall', 'memory' or 'recursion')
+        self.limit_exceeded = None
 
         self.header = ""
         self.footer = ""
@@ -70,11 +81,24 @@ class RunReport:
 
     def has_execution_error(self):
         return bool(self.execution_errors)
+
+    def add_limit_error(self, limit, line=None, details=""):
+        """A resource limit is exceeded (an execution error)."""
+        self.limit_exceeded = limit
+        self.add_execution_error('error', tr(LIMIT_ERRORS[limit]), line, details=details)
         
     def set_output(self, output):
         """Set the (standard) output of an execution."""
         self.output = output
 
+    def set_output_overflow(self, bytes_dropped, lines_dropped):
+        """Set the size of the output dropped (the output is only its end)."""
+        self.output_bytes_dropped = bytes_dropped
+        self.output_lines_dropped = lines_dropped
+
+    def has_output_overflow(self):
+        return self.output_bytes_dropped > 0
+
     def set_result(self, result):
         """ Set the result of the execution : no error occured """
         self.result = result
@@ -92,8 +116,11 @@ Report:
  ==> compilation errors = {}
  ==> execution errors = {}
  ==> output = {}
+ ==> output dropped = {} bytes, {} lines
 """.format(self.convention_errors,
            self.compilation_errors,
            self.execution_errors,
-           self.output)
+           self.output,
+           self.output_bytes_dropped,
+           self.output_lines_dropped)
 
@@ -6,11 +6,15 @@ import sys
 import traceback
 
 from translate import tr
+from OutputCapture import report_overflow
+from ResourceLimits import report_limit_error
 
 import studentlib.gfx.image
 import studentlib.gfx.img_canvas
 
-from typechecking.typechecker import typecheck_from_ast
+from typechecking.typechecker import type_errors_diagnostics, report_diagnostic
+from typechecking.typecache import default_cache
+from typechecking.incremental import default_checker
 
 def install_locals(locals):
     #locals = { k:v for (k,v) in locs.items() }
@@ -30,14 +34,44 @@ def install_locals(locals):
     locals['show_image'] = studentlib.gfx.img_canvas.show_image
     return locals
 
+def type_check_source(filename, source, AST, collect_all=False):
+    """ The type errors (diagnostics) of the program, from the cache or
+    from the incremental checker (which reuses its previous check of the file) """
+    cache = default_cache()
+    diagnostics = cache.get(source, collect_all=collect_all)
+    if diagnostics is None:
+        type_ctx = default_checker().typecheck_from_ast(AST, filename, source, collect_all=collect_all)
+        diagnostics = type_errors_diagnostics(type_ctx)
+        cache.put(source, diagnostics, collect_all=collect_all)
+    return diagnostics
+
+def type_check_file(filename, collect_all=False):
+    """ Type-checks the program file in the IDE process: the incremental
+    checker lives there across the runs (the interpreter processes do not).
+    Returns (source, collect_all, diagnostics) for the StudentRunner, or None
+    if the file cannot be parsed (the run reports the error). """
+    try:
+        with tokenize.open(filename) as f:
+            source = f.read()
+        AST = ast.parse(source, filename)
+    except (OSError, SyntaxError, ValueError):
+        return None
+    return (source, collect_all, type_check_source(filename, source, AST, collect_all))
+
 class StudentRunner:
     """
     Runs a code under the student mode
     """
 
-    def __init__(self, tk_root, filename, source):
+    def __init__(self, tk_root, filename, source, all_type_errors=False, limits=None, type_checked=None):
         self.filename = filename
         self.source = source
+        # report all the type errors, not only the first fatal one
+        self.all_type_errors = all_type_errors
+        # the type-checking made by the IDE (cf. type_check_file), if any
+        self.type_checked = type_checked
+        # the resource limits of the run (ResourceLimits), if any
+        self.limits = limits
         self.report = RunReport()
         self.tk_root = tk_root
         self.running = True
@@ -131,6 +165,9 @@ class StudentRunner:
                 filename, lineno, file_type, line = traceb[-1]
             self.report.add_execution_error('error', tr("Assertion error (failed test?)"), lineno)
             return (True, None)
+        except (MemoryError, RecursionError) as err:
+            report_limit_error(self.report, err, self.filename, self.limits)
+            return (False, None)
         except Exception as err:
             a, b, tb = sys.exc_info() # Get the traceback object
             # Extract the information for the traceback corresponding to the error
@@ -171,6 +208,7 @@ class StudentRunner:
         sys.stdout.seek(0)
         result = sys.stdout.read()
         self.report.set_output(result)
+        report_overflow(self.report, sys.stdout)
 
         return ok
 
@@ -185,6 +223,7 @@ class StudentRunner:
             sys.stdout.seek(0)
             outp = sys.stdout.read()
             self.report.set_output(outp)
+            report_overflow(self.report, sys.stdout)
             self.report.set_result(result)
             return True
 
@@ -240,17 +279,22 @@ class StudentRunner:
         return True
 
     def check_types(self):
-        type_ctx = typecheck_from_ast(self.AST, self.filename, self.source)
+        if self.type_checked is not None and self.type_checked[:2] == (self.source, self.all_type_errors):
+            diagnostics = self.type_checked[2]
+        else:
+            # (the file changed since, or no check by the IDE)
+            diagnostics = type_check_source(self.filename, self.source, self.AST, self.all_type_errors)
+
         fatal_error = False
-        if len(type_ctx.type_errors) == 0:
+        if len(diagnostics) == 0:
             # no type error
             self.report.add_convention_error('run', tr('Program type-checked'), details=tr('==> the program is type-checked (very good)\n'))
             return True
 
         # convert type errors to report messages
-        for type_error in type_ctx.type_errors:
-            type_error.report(self.report)
-            if type_error.is_fatal():
+        for diag in diagnostics:
+            report_diagnostic(diag, self.report)
+            if diag['fatal']:
                 fatal_error = True
 
         #print("fatal_error = ", str(fatal_error))
@@ -7,5 +7,26 @@ Created on 7 august 2012
 
 
 class ParseDebug:
-    pass
+    def __init__(self):
+        # packrat memoization statistics (cf. PackratMemo)
+        self.memo_hits = 0
+        self.memo_misses = 0
+        self.memo_flushes = 0
+
+    def memo_stats(self, memo):
+        self.memo_hits += memo.hits
+        self.memo_misses += memo.misses
+        self.memo_flushes += memo.flushes
+
+    @property
+    def memo_hit_rate(self):
+        nb_lookups = self.memo_hits + self.memo_misses
+        if nb_lookups == 0:
+            return 0.0
+        return self.memo_hits / nb_lookups
+
+    def memo_report(self):
+        return "memo: {0} hits, {1} misses ({2:.1%} hit rate), {3} flushes"\
+            .format(self.memo_hits, self.memo_misses,
+                    self.memo_hit_rate, self.memo_flushes)
 
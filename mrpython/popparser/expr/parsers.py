@@ -28,6 +28,11 @@ class Expression:
     def isinfix(self):
         return False
 
+    def operand_binding_power(self):
+        """The binding power of the right operand of an infix expression
+        (None if the expression parses its operand itself)."""
+        return None
+
 
 #==============================================================================
 # PARSERS IN PREFIX POSITION
@@ -132,6 +137,14 @@ class InfixGen(Expression):
     def isinfix(self):
         return True
 
+    def operand_binding_power(self):
+        if type(self).parse_infix is not InfixGen.parse_infix:
+            return None
+        if self.assoc == 'RIGHT':
+            return self.left_binding_power - 1
+        else:  # LEFT or NONASSOC
+            return self.right_binding_power
+
     def parse_infix(self, pop_parser, left, token):
         if self.assoc == 'RIGHT':
             precedence = self.left_binding_power - 1
@@ -189,6 +202,14 @@ class MixfixGen(Expression):
     def on_prefix(self, token, argument):
         raise NotImplementedError("Abstract method")
 
+    def operand_binding_power(self):
+        if type(self).parse_infix is not MixfixGen.parse_infix:
+            return None
+        if self.infix_assoc == 'RIGHT':
+            return self.infix_lbp - 1
+        else:  # LEFT or NONASSOC
+            return self.infix_rbp
+
     def parse_infix(self, pop_parser, left, token):
         if self.infix_assoc == 'RIGHT':
             precedence = self.infix_lbp - 1
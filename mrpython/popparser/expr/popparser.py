@@ -7,14 +7,27 @@ Created on 25 august 2012
 
 from popparser import Parser, ParseError
 
+from .parsers import Atom
+
 
 class ExprParser(Parser):
+    """The expressions are registered by token type, and compiled (cf.
+    compile) in a prefix and an infix dispatch table.
+
+    An expression is parsed by the binding power loop: the operand (a prefix
+    expression) is extended by the infix operators that bind more than the
+    current (right) binding power.  A chain of left-associative operators
+    (e.g. int * int * int) is thus parsed iteratively, not recursively."""
     def __init__(self):
         Parser.__init__(self)
         self.expressions = {}
         self.token = None
         self.llparser = None
         self.skip_tokens = set()
+        # the compiled tables (None if not compiled)
+        self.prefix_table = None
+        self.infix_table = None
+        self.skip_mask = frozenset()
 
     @property
     def token_type(self):
@@ -22,6 +35,7 @@ class ExprParser(Parser):
 
     def register(self, token_type, expression):
         self.expressions[token_type] = expression
+        self.prefix_table = None
         return self
 
     def unregister(self, expr_type):
@@ -33,20 +47,37 @@ class ExprParser(Parser):
 
         if del_tok_type:
             del self.expressions[del_tok_type]
+            self.prefix_table = None
 
     def skip_token(self, token_type):
         self.skip_tokens.add(token_type)
+        self.prefix_table = None
         return self
 
+    def compile(self):
+        """Freezes the registered expressions in the dispatch tables:
+          - prefix_table: token type -> (expression, atom), with atom True
+            if the expression is an atom (parsed without a sub-expression),
+          - infix_table: token type -> (expression, left binding power,
+            binding power of the right operand), the latter being None
+            if the expression parses its right operand itself."""
+        self.prefix_table = {}
+        self.infix_table = {}
+        for (token_type, expression) in self.expressions.items():
+            if expression.isprefix:
+                atom = type(expression).parse_prefix is Atom.parse_prefix
+                self.prefix_table[token_type] = (expression, atom)
+            if expression.isinfix:
+                self.infix_table[token_type] = (expression,
+                                                expression.left_binding_power,
+                                                expression.operand_binding_power())
+        self.skip_mask = frozenset(self.skip_tokens)
+
     def _tokens_skip(self, llparser):
-        if not self.skip_tokens:
+        if not self.skip_mask:
             return
-        while True:
-            next_token = llparser.peek_token()
-            if next_token.token_type in self.skip_tokens:
-                llparser.next_token()
-            else:
-                return
+        while llparser.peek_token().token_type in self.skip_mask:
+            llparser.next_token()
 
     def consume_token(self, token_type):
         if self.token.token_type != token_type:
@@ -72,67 +103,61 @@ class ExprParser(Parser):
     def do_parse(self, llparser):
         assert llparser is not None
 
+        if self.prefix_table is None:
+            self.compile()
+
         self.llparser = llparser
 
         return self.pop_parse(rbp=0)
 
     def pop_parse(self, rbp):
-        err = self._next_token(self.llparser)
+        llparser = self.llparser
+        err = self._next_token(llparser)
         if err is not None:
             return err
 
-        if self.token.token_type not in self.expressions:
+        token = self.token
+        if token.token_type not in self.prefix_table:
+            if token.token_type in self.infix_table:
+                return ParseError("No left operand in expression",
+                                  token.start_pos, llparser.position)
             return ParseError("Unexpected token type: "\
-                              + self.token.token_type,
-                              self.token.start_pos, self.token.end_pos)
-
-        expr = self.expressions[self.token.token_type]
-
-        # advance
-        prev_token = self.token
-
-        if expr.isprefix:
-            left = expr.parse_prefix(self, prev_token)
-            if left.iserror or self.llparser.peek_token().iseof:
-                return left
-        elif expr.isinfix:
-            return ParseError("No left operand in expression",
-                              prev_token.start_pos, self.llparser.position)
-
-        # continue, from here we know there is a left operand
-        self._tokens_skip(self.llparser)
-        self.token = self.llparser.next_token()
-        if self.token.iserror:
-            return ParseError(str(self.token.content),
-                              self.llparser.position, self.llparser.position)
-
-        if self.token.token_type not in self.expressions:
-            self.llparser.put_back_token(self.token)
-            return left  # end of expression at left
-
-        next_expr = self.expressions[self.token.token_type]
-
-        right_binding_power = rbp
+                              + token.token_type,
+                              token.start_pos, token.end_pos)
+
+        (expr, atom) = self.prefix_table[token.token_type]
+        if atom:
+            left = expr.on_atom(token)
+        else:
+            left = expr.parse_prefix(self, token)
+        if left.iserror:
+            return left
+
+        # the binding power loop
+        infix_table = self.infix_table
         while True:
-            prev_token = self.token
-
-            left = next_expr.parse_infix(self, left, prev_token)
-            if self.llparser.peek_token().iseof:
-                return left
-
-            err = self._next_token(self.llparser)
-            if err is not None:
-                return err
-
-            if self.token.token_type not in self.expressions:
-                self.llparser.put_back_token(self.token)
+            self._tokens_skip(llparser)
+            self.token = llparser.peek_token()
+            if self.token.token_type not in infix_table:
+                return left  # end of expression at left
+            (expr, lbp, operand_bp) = infix_table[self.token.token_type]
+            if lbp <= rbp:
+                return left  # the operator binds to an enclosing expression
+            token = llparser.next_token()
+            if operand_bp is None:
+                left = expr.parse_infix(self, left, token)
+            else:
+                right = self.pop_parse(rbp=operand_bp)
+                if right.iserror:
+                    return right
+                left = expr.on_infix(left, token, right)
+            if left.iserror:
                 return left
 
-            next_expr = self.expressions[self.token.token_type]
-
-            if (not next_expr.isinfix)\
-               or right_binding_power >= next_expr.left_binding_power:
-                self.llparser.put_back_token(self.token)
-                return left
+    def ll1_first(self, analysis):
+        if self.prefix_table is None:
+            self.compile()
+        return (False, set(self.prefix_table))
 
-        # (never) ending while
+    def ll1_compile(self, analysis):
+        self.compile()
@@ -0,0 +1,135 @@
+'''Frozen grammars.
+
+A grammar (with its tokenizer) is a graph of objects built by code, which
+has to be rebuilt by every process.  Once built (and compiled) it can be
+frozen in a cache file: a pickle, versioned by a hash of the sources that
+define it.  Loading the file is much faster than building the grammar, and
+an outdated (or unreadable) file is simply rebuilt.
+
+Remark: the transformations of the parse results must be module-level
+functions (closures cannot be pickled).  They are frozen by name (the
+functions argument), so that a frozen file does not depend on the name
+of the module that defines them.
+
+The cache files are loaded only if they belong to the user (and are not
+writable by others), and a frozen file can only refer to the parser
+framework (and to the given functions).
+'''
+
+import os.path
+import glob
+import hashlib
+import io
+import pickle
+import sys
+import tempfile
+
+# bump this whenever the format of the frozen files changes
+FROZEN_FORMAT_VERSION = 2
+
+POPPARSER_DIR = os.path.dirname(os.path.realpath(__file__))
+
+
+def sources_version(*filenames):
+    """A hash of the given source files and of the parser framework
+    (the frozen objects depend on both), and of the Python version."""
+    h = hashlib.sha256("{0}:{1}".format(FROZEN_FORMAT_VERSION, sys.version_info[:2]).encode())
+    filenames = list(filenames) \
+        + sorted(glob.glob(os.path.join(POPPARSER_DIR, '**', '*.py'), recursive=True))
+    for filename in filenames:
+        h.update(os.path.basename(filename).encode())
+        with open(filename, 'rb') as f:
+            h.update(f.read())
+    return h.hexdigest()
+
+
+# the (other) globals that a frozen file may refer to
+ALLOWED_GLOBALS = { ('re', '_compile'), ('collections', 'defaultdict') }
+
+class FrozenPickler(pickle.Pickler):
+    def __init__(self, file, functions):
+        super().__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.function_names = { id(function) : name for (name, function) in functions.items() }
+
+    def persistent_id(self, obj):
+        if callable(obj):
+            return self.function_names.get(id(obj))
+        return None
+
+class FrozenUnpickler(pickle.Unpickler):
+    def __init__(self, file, functions):
+        super().__init__(file)
+        self.functions = functions
+
+    def persistent_load(self, name):
+        try:
+            return self.functions[name]
+        except KeyError:
+            raise pickle.UnpicklingError("unknown function: {}".format(name))
+
+    def find_class(self, module, name):
+        if module == 'popparser' or module.startswith('popparser.') \
+           or (module, name) in ALLOWED_GLOBALS:
+            return super().find_class(module, name)
+        raise pickle.UnpicklingError("forbidden global: {}.{}".format(module, name))
+
+
+def trusted_file(f):
+    """True if the (open) file belongs to the user and is not writable
+    by others."""
+    if not hasattr(os, 'getuid'):
+        return True
+    st = os.fstat(f.fileno())
+    return st.st_uid == os.getuid() and not st.st_mode & 0o022
+
+
+def load_frozen(filename, version, functions=None):
+    """Returns the object frozen in the file, or None if the file is
+    missing, untrusted, unreadable or of another version."""
+    try:
+        with open(filename, 'rb') as f:
+            if not trusted_file(f):
+                return None
+            (frozen_version, obj) = FrozenUnpickler(f, functions or {}).load()
+    except Exception:
+        # (a corrupted pickle can raise almost anything)
+        return None
+    if frozen_version != version:
+        return None
+    return obj
+
+
+def save_frozen(filename, version, obj, functions=None):
+    """Freezes the object in the file.  Failing to write the file is not
+    an error (it is only a cache)."""
+    try:
+        buffer = io.BytesIO()
+        FrozenPickler(buffer, functions or {}).dump((version, obj))
+        data = buffer.getvalue()
+    except (pickle.PicklingError, TypeError, AttributeError, RecursionError):
+        return False
+    try:
+        os.makedirs(os.path.dirname(filename), mode=0o700, exist_ok=True)
+        # write-then-rename so that concurrent readers never see partial files
+        (fd, tmp_path) = tempfile.mkstemp(dir=os.path.dirname(filename), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, filename)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+    except OSError:
+        return False
+    return True
+
+
+def frozen(filename, version, build, functions=None):
+    """Loads the object frozen in the file, or builds it (with build())
+    and freezes it if the file is outdated.  The functions (by name) are
+    frozen by reference."""
+    obj = load_frozen(filename, version, functions)
+    if obj is None:
+        obj = build()
+        save_frozen(filename, version, obj, functions)
+    return obj
@@ -6,6 +6,11 @@ Created on 24 août 2012
 '''
 
 from popparser import ParseException, Parser
+from popparser.tokenizer import EOF_TOKEN_TYPE
+
+
+class GrammarError(ParseException):
+    pass
 
 
 class Grammar:
@@ -15,6 +20,8 @@ class Grammar:
     def register(self, rule_name, parser):
         assert isinstance(parser, Parser)
         self.__rules[rule_name] = parser
+        if parser.grammar_rule is None:
+            parser.grammar_rule = rule_name
 
     def fetch(self, rule_name):
         if rule_name not in self.__rules:
@@ -24,6 +31,10 @@ class Grammar:
     def ref(self, rule_name):
         return RefParser(self, rule_name)
 
+    @property
+    def rules(self):
+        return self.__rules
+
     @property
     def entry(self):
         return self.fetch("init")
@@ -32,6 +43,18 @@ class Grammar:
     def entry(self, parser):
         self.__rules['init'] = parser
 
+    def compile(self):
+        """Analyses the grammar (FIRST and FOLLOW sets) and installs the
+        LL(1) lookup tables in its parsers.  Raises a GrammarError if the
+        grammar is not LL(1), the conflicts of the greedy parsers (repetitions,
+        optionals and lists) are only reported as warnings of the analysis."""
+        analysis = GrammarAnalysis(self)
+        analysis.run()
+        if analysis.errors:
+            raise GrammarError("Grammar is not LL(1):\n  " + "\n  ".join(analysis.errors))
+        analysis.install()
+        return analysis
+
     def __str(self):
         msg = 'Grammar:\n'
         for name, parser in self.__rules.items():
@@ -59,5 +82,154 @@ class RefParser(Parser):
             raise ParseException("No such rule in grammar: " + self.rule_name)
         return parser.parse(llparser)
 
+    def sub_parsers(self):
+        parser = self.grammar.fetch(self.rule_name)
+        if parser is None:
+            raise GrammarError("No such rule in grammar: " + self.rule_name)
+        return [parser]
+
+    def ll1_first(self, analysis):
+        return analysis.nullable_first(self.grammar.fetch(self.rule_name))
+
+    def ll1_follow(self, analysis):
+        analysis.add_follow(self.grammar.fetch(self.rule_name), analysis.follow(self))
+
     def __str__(self):
         return "<{0}>".format(self.rule_name)
+
+
+class GrammarAnalysis:
+    """The LL(1) analysis of a grammar.
+
+    The FIRST sets (and nullability) of the parsers are computed as a fixed
+    point, then their FOLLOW sets (the entry is followed by the end of file).
+    The parsers themselves tell how the sets are computed and checked
+    (the ll1_xxx methods of the parsers).  The forgotten tokens (e.g. spaces)
+    are not part of the FIRST and FOLLOW sets, but the lookahead sets
+    (used to skip the optional parsers without trying them) include them.
+    """
+    def __init__(self, grammar):
+        self.grammar = grammar
+        # all the parsers of the grammar (in discovery order)
+        self.parsers = []
+        self.nullables = {}  # dict[Parser,bool]
+        self.firsts = {}     # dict[Parser,set[str]] (None if unknown)
+        self.leads = {}      # the FIRST sets including the forgotten tokens
+        self.follows = {}    # dict[Parser,set[str]]
+        self.errors = []
+        self.warnings = []
+        # set when a set is updated (fixed point iterations)
+        self.changed = False
+        # dict[int,str]: the rule names of the (registered) parsers
+        self.rule_names = { id(parser) : rule_name for (rule_name, parser) in grammar.rules.items() }
+
+    def collect(self):
+        roots = list(self.grammar.rules.values())
+        seen = set()
+        while roots:
+            parser = roots.pop()
+            if id(parser) in seen:
+                continue
+            seen.add(id(parser))
+            self.parsers.append(parser)
+            roots.extend(parser.sub_parsers())
+            roots.extend(parser.forget_parsers.values())
+
+    def nullable_first(self, parser):
+        return (self.nullables.get(parser, False), self.firsts.get(parser, set()))
+
+    def first(self, parser):
+        return self.firsts.get(parser, set())
+
+    def follow(self, parser):
+        return self.follows.get(parser, set())
+
+    def sequence_first(self, parsers):
+        """The nullability and FIRST set of a sequence of parsers."""
+        first = set()
+        for parser in parsers:
+            (nullable, parser_first) = self.nullable_first(parser)
+            if parser_first is None:
+                return (False, None)
+            first |= parser_first
+            if not nullable:
+                return (False, first)
+        return (True, first)
+
+    def add_follow(self, parser, token_types):
+        if not token_types:
+            return
+        follow = self.follows.setdefault(parser, set())
+        if not token_types <= follow:
+            follow |= token_types
+            self.changed = True
+
+    def compute_firsts(self, with_forgets):
+        self.changed = True
+        while self.changed:
+            self.changed = False
+            for parser in self.parsers:
+                (nullable, first) = parser.ll1_first(self)
+                if with_forgets and first is not None:
+                    first = first | { token_type for token_type in parser.forget_parsers
+                                      if isinstance(token_type, str) }
+                if nullable != self.nullables.get(parser) or first != self.firsts.get(parser, set()):
+                    self.nullables[parser] = nullable
+                    self.firsts[parser] = first
+                    self.changed = True
+
+    def compute_follows(self):
+        entry = self.grammar.entry
+        if entry is not None:
+            self.add_follow(entry, { EOF_TOKEN_TYPE })
+        self.changed = True
+        while self.changed:
+            self.changed = False
+            for parser in self.parsers:
+                parser.ll1_follow(self)
+
+    def run(self):
+        self.collect()
+        # the lookahead sets
+        self.compute_firsts(with_forgets=True)
+        self.leads = self.firsts
+        self.nullables = {}
+        self.firsts = {}
+        self.compute_firsts(with_forgets=False)
+        self.compute_follows()
+        for parser in self.parsers:
+            parser.ll1_check(self)
+
+    def install(self):
+        for parser in self.parsers:
+            parser.ll1_compile(self)
+
+    def lookahead(self, parser):
+        """The token types that can start the parser (None if it also
+        accepts no input, or if unknown)."""
+        if self.nullables.get(parser, False):
+            return None
+        return self.leads.get(parser)
+
+    def name(self, parser):
+        if id(parser) in self.rule_names:
+            return "<{0}>".format(self.rule_names[id(parser)])
+        if isinstance(parser, RefParser):
+            return str(parser)
+        return parser.__class__.__name__
+
+    def conflict(self, parser, msg):
+        self.errors.append("{0}: {1}".format(self.name(parser), msg))
+
+    def check_greedy(self, parser, sub_parser, continuations=None):
+        """A greedy parser (e.g. a repetition) always continues with the
+        sub-parser (or the continuation tokens, e.g. a separator) if possible:
+        a conflict with what follows is only a warning."""
+        if continuations is None:
+            continuations = self.first(sub_parser)
+            if continuations is None:
+                return
+        ambiguous = continuations & self.follow(parser)
+        if ambiguous:
+            self.warnings.append("{0}: greedy on {1}".format(
+                self.name(parser), ", ".join("'{0}'".format(token_type) for token_type in sorted(ambiguous))))
@@ -5,15 +5,33 @@ Created on 7 august 2012
 @author: F. Peschanski
 '''
 
+from bisect import bisect_right
+
 from popparser.debug import ParseDebug
 
 
+# default maximum number of entries of the packrat memo table
+PACKRAT_MEMO_SIZE = 65536
+
 class LLParsing:
-    def __init__(self, grammar, debug_mode=False):
+    """In token array mode, the input is tokenized (once) in a TokenArray
+    and the parser moves a cursor (an index) over the tokens: peeking is
+    an array access, and putting back (backtracking) a cursor assignment.
+
+    The packrat mode (which implies the token array mode) memoizes the
+    results of the parsers at each cursor, cf. PackratMemo."""
+    def __init__(self, grammar, debug_mode=False, token_array=False, packrat=False,
+                 memo_size=PACKRAT_MEMO_SIZE):
         self.__grammar = grammar
         self.__debug_mode = debug_mode
         self.__debug = None
         self.__tokenizer = None
+        self.__token_array_mode = token_array or packrat
+        self.__tokens = None
+        self.__cursor = 0
+        self.__packrat_mode = packrat
+        self.__memo_size = memo_size
+        self.memo = None
 
     @property
     def debug_mode(self):
@@ -39,26 +57,53 @@ class LLParsing:
     def grammar(self):
         return self.__grammar
 
+    @property
+    def token_array_mode(self):
+        return self.__token_array_mode
+
+    @property
+    def packrat_mode(self):
+        return self.__packrat_mode
+
+    @property
+    def cursor(self):
+        """The index of the next token (in token array mode)."""
+        return self.__cursor
+
+    @cursor.setter
+    def cursor(self, ncursor):
+        self.__cursor = ncursor
+
     @property
     def position(self):
+        if self.__tokens is not None:
+            return self.__tokens.position(self.__cursor)
         return self.__tokenizer.position
 
     def peek_token(self):
-        assert(self.__tokenizer)
-        token = self.__tokenizer.peek()
-        if self.__debug_mode:
-            self.__debug.peek_token(self, token)
+        if self.__tokens is not None:
+            token = self.__tokens.token(self.__cursor)
+        else:
+            assert(self.__tokenizer)
+            token = self.__tokenizer.peek()
         return token
 
     def next_token(self):
-        assert(self.__tokenizer)
-        token = self.__tokenizer.next()
-        if self.__debug_mode:
-            self.__debug.next_token(self, token)
+        if self.__tokens is not None:
+            token = self.__tokens.token(self.__cursor)
+            # the cursor stays on the final (EOF or error) token
+            if not self.__tokens.is_last(self.__cursor):
+                self.__cursor += 1
+        else:
+            assert(self.__tokenizer)
+            token = self.__tokenizer.next()
         return token
 
     def put_back_token(self, token):
-        self.__tokenizer.put_back(token)
+        if self.__tokens is not None:
+            self.__cursor = token.index
+        else:
+            self.__tokenizer.put_back(token)
 
     def parse(self):
         if not self.__tokenizer:
@@ -70,9 +115,23 @@ class LLParsing:
         if not start_parser:
             raise AttributeError("No start parser in grammar")
 
-        self.__debug = ParseDebug()
+        # (the debug informations are the packrat memo statistics)
+        self.__debug = ParseDebug() if self.__debug_mode or self.__packrat_mode else None
+
+        if self.__token_array_mode:
+            from popparser.tokenizer import TokenArray
+            self.__tokens = TokenArray(self.__tokenizer)
+            self.__cursor = 0
+
+        if self.__packrat_mode:
+            self.memo = PackratMemo(self.__memo_size)
 
-        result = start_parser.parse(self)
+        try:
+            result = start_parser.parse(self)
+        finally:
+            if self.memo is not None:
+                self.__debug.memo_stats(self.memo)
+                self.memo = None
 
         return result
 
@@ -80,7 +139,43 @@ class LLParsing:
         return "<LLParsing:" + str(self.__tokenizer)
 
 
+class PackratMemo:
+    """The memo table of the packrat mode: the result of a parser at
+    a cursor, and the cursor after it, keyed by (parser id, cursor).
+    A parser is thus invoked at most once at a given position (the
+    parse time is linear in the number of tokens), failures included.
+
+    The table is bounded: it is cleared when full (a flush).
+    Remark: a memoized result is shared, the transformations of the
+    parse results should not modify the results of the sub-parsers."""
+    def __init__(self, size=PACKRAT_MEMO_SIZE):
+        self.size = size
+        self.table = {}  # dict[(int,int),(ParseResult,int)]
+        self.hits = 0
+        self.misses = 0
+        self.flushes = 0
+
+    def parse(self, parser, llparsing):
+        key = (id(parser), llparsing.cursor)
+        entry = self.table.get(key)
+        if entry is not None:
+            self.hits += 1
+            (result, end_cursor) = entry
+            llparsing.cursor = end_cursor
+            return result
+
+        self.misses += 1
+        result = parser.parse_here(llparsing)
+        if len(self.table) >= self.size:
+            self.table.clear()
+            self.flushes += 1
+        self.table[key] = (result, llparsing.cursor)
+        return result
+
+
 class ParseResult:
+    __slots__ = ('content', 'start_pos', 'end_pos')
+
     def __init__(self, content, start_pos, end_pos):
         self.content = content
         self.start_pos = start_pos
@@ -101,6 +196,8 @@ class ParseResult:
 
 
 class ParseError(ParseResult):
+    __slots__ = ()
+
     def __init__(self, msg, start_pos, end_pos):
         ParseResult.__init__(self, msg, start_pos, end_pos)
 
@@ -119,10 +216,38 @@ class ParseError(ParseResult):
 
 
 class ParsePosition:
-    def __init__(self, offset=0, line_pos=1, char_pos=1):
+    """A position in the input.  A position is an offset, its line and
+    char are either given or, if the position is built with the line start
+    offsets of the input, only resolved (by a binary search) when requested,
+    e.g. for an error message."""
+    __slots__ = ('offset', 'line_starts', '__line_pos', '__char_pos')
+
+    def __init__(self, offset=0, line_pos=1, char_pos=1, line_starts=None):
         self.offset = offset
-        self.line_pos = line_pos
-        self.char_pos = char_pos
+        self.line_starts = line_starts
+        if line_starts is None:
+            self.__line_pos = line_pos
+            self.__char_pos = char_pos
+        else:
+            self.__line_pos = None
+            self.__char_pos = None
+
+    def resolve(self):
+        line_index = bisect_right(self.line_starts, self.offset) - 1
+        self.__line_pos = line_index + 1
+        self.__char_pos = self.offset - self.line_starts[line_index] + 1
+
+    @property
+    def line_pos(self):
+        if self.__line_pos is None:
+            self.resolve()
+        return self.__line_pos
+
+    @property
+    def char_pos(self):
+        if self.__char_pos is None:
+            self.resolve()
+        return self.__char_pos
 
     def next_line(self):
         return ParsePosition(self.offset + 1, self.line_pos + 1, 1)
@@ -26,11 +26,17 @@ class Parser:
       2) xform_content: ParseResult -> Content
 
     Transforming result has priority over transforming content
+
+    The ll1_xxx methods are the LL(1) analysis of the parsers
+    (cf. GrammarAnalysis in grammar.py).  The parsing is traced by swapping
+    the class of the parsers (cf. trace.py), so parse has no tracing hook.
     '''
     def __init__(self):
         self.xform_result = None
         self.xform_content = None
         self.forget_parsers = {}
+        # the name of the grammar rule of the parser (if registered)
+        self.grammar_rule = None
 
     def forget(self, parser):
         self.forget_parsers[parser.token_type] = parser
@@ -52,9 +58,12 @@ class Parser:
         raise NotImplementedError("Abstract method")
 
     def parse(self, llparsing):
-        if llparsing.debug_mode:
-            llparsing.debug.enter(llparsing, self)
+        memo = llparsing.memo
+        if memo is not None:
+            return memo.parse(self, llparsing)
+        return self.parse_here(llparsing)
 
+    def parse_here(self, llparsing):
         result = self.forget_parse(llparsing)
         if result is not None and result.iserror:
             return result
@@ -65,9 +74,6 @@ class Parser:
         if fresult is not None and fresult.iserror:
             return fresult
 
-        if llparsing.debug_mode:
-            llparsing.debug.leave(llparsing, self)
-
         if not result.iserror:
             if self.xform_result:
                 result = self.xform_result(result)
@@ -79,6 +85,32 @@ class Parser:
     def do_parse(self, llparsing):
         raise NotImplementedError("Abstract method")
 
+    def sub_parsers(self):
+        return []
+
+    def ll1_first(self, analysis):
+        """The pair (nullable, FIRST set) of the parser, from the current
+        sets of its sub-parsers.  A FIRST set is None if unknown."""
+        try:
+            token_type = self.token_type
+        except NotImplementedError:
+            token_type = None
+        if isinstance(token_type, str):
+            return (False, { token_type })
+        return (False, None)
+
+    def ll1_follow(self, analysis):
+        """Propagates the FOLLOW set of the parser to its sub-parsers."""
+        pass
+
+    def ll1_check(self, analysis):
+        """Reports the LL(1) conflicts of the parser."""
+        pass
+
+    def ll1_compile(self, analysis):
+        """Installs the lookup tables computed by the analysis."""
+        pass
+
 
 #==============================================================================
 # TOKEN PARSING
@@ -107,6 +139,9 @@ class Token(Parser):
                               .format(self.__token_type),
                               start_pos, llparsing.position)
 
+    def ll1_first(self, analysis):
+        return (False, { self.__token_type })
+
 
 class EOF(Token):
     '''Parse End of file (EOF).
@@ -189,6 +224,30 @@ class Tuple(Parser):
             results = results[0]
         return ParseResult(results, start_pos, end_pos)
 
+    def sequence(self):
+        """The skip and element parsers, in parsing order."""
+        parsers = []
+        for i in range(len(self.__parsers) + 1):
+            if i in self.__skips:
+                parsers.extend(self.__skips[i])
+            if i < len(self.__parsers):
+                parsers.append(self.__parsers[i])
+        return parsers
+
+    def sub_parsers(self):
+        return self.sequence()
+
+    def ll1_first(self, analysis):
+        return analysis.sequence_first(self.sequence())
+
+    def ll1_follow(self, analysis):
+        sequence = self.sequence()
+        for i in range(len(sequence)):
+            (nullable, first) = analysis.sequence_first(sequence[i+1:])
+            analysis.add_follow(sequence[i], first)
+            if nullable:
+                analysis.add_follow(sequence[i], analysis.follow(self))
+
 
 #==============================================================================
 # REPEAT PARSER
@@ -201,6 +260,8 @@ class Repeat(Parser):
         Parser.__init__(self)
         self.minimum = minimum
         self.parser = parser
+        # the token types that can start a repetition (None if unknown)
+        self.lookahead = None
 
     @property
     def token_type(self):
@@ -216,8 +277,13 @@ class Repeat(Parser):
             if result is not None and result.iserror:
                 return result
 
-            result = self.parser.parse(llparser)
-            if result.iserror:
+            if self.lookahead is not None \
+               and llparser.peek_token().token_type not in self.lookahead:
+                # no repetition can start here
+                result = None
+            else:
+                result = self.parser.parse(llparser)
+            if result is None or result.iserror:
                 if count == 0 and self.minimum == 0:
                     return ParseResult(None, start_pos, llparser.position)
                 elif 0 < count < self.minimum:
@@ -231,6 +297,23 @@ class Repeat(Parser):
                     return ParseResult(results, start_pos, llparser.position)
             results.append(result)
 
+    def sub_parsers(self):
+        return [self.parser]
+
+    def ll1_first(self, analysis):
+        # (the minimum is not enforced: no repetition at all is accepted)
+        return (True, analysis.first(self.parser))
+
+    def ll1_follow(self, analysis):
+        analysis.add_follow(self.parser, analysis.first(self.parser))
+        analysis.add_follow(self.parser, analysis.follow(self))
+
+    def ll1_check(self, analysis):
+        analysis.check_greedy(self, self.parser)
+
+    def ll1_compile(self, analysis):
+        self.lookahead = analysis.lookahead(self.parser)
+
 
 #==============================================================================
 # LIST PARSER
@@ -246,6 +329,8 @@ class List(Parser):
         self.close_token = close
         self.sep_token = sep
         self.parser = of
+        # the token types that can start an element (None if unknown)
+        self.lookahead = None
 
     @property
     def token_type(self):
@@ -272,6 +357,10 @@ class List(Parser):
             if result is not None and result.iserror:
                 return result
 
+            if self.lookahead is not None \
+               and llparser.peek_token().token_type not in self.lookahead:
+                # no element can start here
+                break
             result = self.parser.parse(llparser)
             if result.iserror:
                 break
@@ -313,6 +402,35 @@ class List(Parser):
 
         return ParseResult(results, start_pos, llparser.position)
 
+    def sub_parsers(self):
+        return [self.parser]
+
+    def ll1_first(self, analysis):
+        if self.open_token is not None:
+            return (False, { self.open_token })
+        # (the minimum is not enforced: an empty list is accepted)
+        return (True, analysis.first(self.parser))
+
+    def ll1_follow(self, analysis):
+        if self.sep_token is not None:
+            analysis.add_follow(self.parser, { self.sep_token })
+        else:
+            analysis.add_follow(self.parser, analysis.first(self.parser))
+        if self.close_token is not None:
+            analysis.add_follow(self.parser, { self.close_token })
+        else:
+            analysis.add_follow(self.parser, analysis.follow(self))
+
+    def ll1_check(self, analysis):
+        if self.close_token is None:
+            if self.sep_token is not None:
+                analysis.check_greedy(self, self.parser, { self.sep_token })
+            else:
+                analysis.check_greedy(self, self.parser)
+
+    def ll1_compile(self, analysis):
+        self.lookahead = analysis.lookahead(self.parser)
+
 #==============================================================================
 # OPTIONAL PARSER
 #==============================================================================
@@ -323,6 +441,8 @@ class Optional(Parser):
     def __init__(self, parser):
         Parser.__init__(self)
         self.parser = parser
+        # the token types that can start the parser (None if unknown)
+        self.lookahead = None
 
     @property
     def token_type(self):
@@ -330,12 +450,30 @@ class Optional(Parser):
 
     def do_parse(self, llparser):
         start_pos = llparser.position
+        if self.lookahead is not None \
+           and llparser.peek_token().token_type not in self.lookahead:
+            return ParseResult(None, start_pos, start_pos)
         result = self.parser.parse(llparser)
         if result.iserror:
             return ParseResult(None, start_pos, llparser.position)
         # ok, parsed
         return result
 
+    def sub_parsers(self):
+        return [self.parser]
+
+    def ll1_first(self, analysis):
+        return (True, analysis.first(self.parser))
+
+    def ll1_follow(self, analysis):
+        analysis.add_follow(self.parser, analysis.follow(self))
+
+    def ll1_check(self, analysis):
+        analysis.check_greedy(self, self.parser)
+
+    def ll1_compile(self, analysis):
+        self.lookahead = analysis.lookahead(self.parser)
+
 
 #==============================================================================
 # CHOICE PARSER
@@ -346,6 +484,8 @@ class Choice(Parser):
         Parser.__init__(self)
         self.__branches = []
         self.__dispatch = None
+        # the branch parsing the tokens of no other branch (a nullable branch)
+        self.__default = None
         self.__static_token_types = set()
 
     class StateError(Exception):
@@ -378,6 +518,60 @@ class Choice(Parser):
                                         + "' ambigous")
             self.__dispatch[token_type] = branch
 
+    def sub_parsers(self):
+        return list(self.__branches)
+
+    def ll1_first(self, analysis):
+        nullable = False
+        first = set()
+        for branch in self.__branches:
+            (branch_nullable, branch_first) = analysis.nullable_first(branch)
+            nullable = nullable or branch_nullable
+            if first is not None:
+                first = None if branch_first is None else first | branch_first
+        return (nullable, first)
+
+    def ll1_follow(self, analysis):
+        for branch in self.__branches:
+            analysis.add_follow(branch, analysis.follow(self))
+
+    def ll1_check(self, analysis):
+        owners = {}
+        nullable_branch = None
+        for branch in self.__branches:
+            (nullable, first) = analysis.nullable_first(branch)
+            if first is None:
+                continue
+            for token_type in first:
+                if token_type in owners:
+                    analysis.conflict(self, "branches {0} and {1} both start with '{2}'"\
+                                      .format(analysis.name(owners[token_type]), analysis.name(branch), token_type))
+                else:
+                    owners[token_type] = branch
+            if nullable:
+                if nullable_branch is not None:
+                    analysis.conflict(self, "branches {0} and {1} both accept no input"\
+                                      .format(analysis.name(nullable_branch), analysis.name(branch)))
+                nullable_branch = branch
+        if nullable_branch is not None:
+            for token_type in analysis.follow(self) & set(owners):
+                if owners[token_type] is not nullable_branch:
+                    analysis.conflict(self, "'{0}' may start branch {1} or follow the empty branch {2}"\
+                                      .format(token_type, analysis.name(owners[token_type]), analysis.name(nullable_branch)))
+
+    def ll1_compile(self, analysis):
+        dispatch = {}
+        for branch in self.__branches:
+            (nullable, first) = analysis.nullable_first(branch)
+            if first is None:
+                # unknown branch: keep the dispatch on the static token types
+                return
+            for token_type in first:
+                dispatch[token_type] = branch
+            if nullable:
+                self.__default = branch
+        self.__dispatch = dispatch
+
     def explain_token_types(self):
         msg = ""
         count = 0
@@ -396,6 +590,8 @@ class Choice(Parser):
         token = llparser.peek_token()
 
         if token.token_type not in self.__dispatch:
+            if self.__default is not None:
+                return self.__default.parse(llparser)
             return ParseError("Unexpected token type '"\
                               + str(token.token_type) + "' expecting: "\
                               + self.explain_token_types(), token.start_pos, token.end_pos)
@@ -5,18 +5,37 @@ Created on 24 august 2012
 @author: F. Peschanski
 '''
 
-from copy import deepcopy
-from collections import defaultdict
+
+import os
+import mmap
+from bisect import bisect_right
+from collections import OrderedDict
 
 from popparser.llparser import ParsePosition
 
 
+EOF_TOKEN_TYPE = '<<EOF>>'
+ERROR_TOKEN_TYPE = '<<ERROR>>'
+
+# the (minimal) size in bytes of the chunks of a FileTokenizer
+FILE_CHUNK_SIZE = 64 * 1024
+# the number of decoded chunks kept by a FileTokenizer
+FILE_CACHED_CHUNKS = 8
+
+# the UTF-8 continuation bytes (i.e. not starting a char)
+_UTF8_CONTINUATION_BYTES = bytes(range(0x80, 0xC0))
+
+
 class Token:
+    __slots__ = ('token_type', 'value', 'start_pos', 'end_pos', 'index')
+
     def __init__(self, token_type, value, start_pos, end_pos):
         self.token_type = token_type
         self.value = value
         self.start_pos = start_pos
         self.end_pos = end_pos
+        # the index of the token in a TokenArray
+        self.index = None
 
     @property
     def iseof(self):
@@ -37,8 +56,10 @@ class Token:
 
 
 class EOFToken(Token):
+    __slots__ = ()
+
     def __init__(self, pos):
-        Token.__init__(self, '<<EOF>>', '<<EOF>>', pos, pos)
+        Token.__init__(self, EOF_TOKEN_TYPE, '<<EOF>>', pos, pos)
 
     @property
     def iseof(self):
@@ -57,8 +78,10 @@ class EOFToken(Token):
 
 
 class ErrorToken(Token):
+    __slots__ = ()
+
     def __init__(self, message, pos):
-        Token.__init__(self, '<<ERROR>>', message, pos, pos)
+        Token.__init__(self, ERROR_TOKEN_TYPE, message, pos, pos)
 
     @property
     def message(self):
@@ -79,16 +102,37 @@ class ErrorToken(Token):
 
 
 class Tokenizer:
+    """The tokenizer state is the (integer) offset in the input, so that
+    saving and restoring a position (when peeking, backtracking or putting
+    back a token) is O(1).  The line and char of a position are only resolved
+    (from the line-start table of the backend) when requested.
+    The token peeked at the current offset is buffered.
+
+    The rules are compiled (cf. compile) so that a token is recognized by
+    a single regexp match, and not by trying the rules one at a time."""
     def __init__(self):
         self.__token_rules = {}  # dict[str,List[TokenRule]]
         self.__none_rules = []  # rules with no lookup available
         self.__backend = None
+        # compiled rules: dict[str,MasterRegexp] (None if not compiled)
+        self.__scanners = None
+        self.__none_scanner = None
 
         self.reset()
 
     def reset(self):
-        self.pos = ParsePosition()
-        self.lines = defaultdict()  # dict[int,ParsePosition]
+        self.offset = 0
+        # the last computed position (positions are requested repeatedly)
+        self.__pos = ParsePosition()
+        # lookahead buffer: (offset, token, end offset) of the peeked token
+        self.__peeked = None
+
+    def __getstate__(self):
+        # the input is not part of a (frozen) tokenizer
+        state = self.__dict__.copy()
+        state['_Tokenizer__backend'] = None
+        state['_Tokenizer__peeked'] = None
+        return state
 
     @property
     def backend(self):
@@ -96,17 +140,48 @@ class Tokenizer:
 
     @backend.setter
     def backend(self, backend_):
-        self.backend = backend_
+        self.__set_backend(backend_)
 
-    def from_string(self, string):
-        self.__backend = StrTokenizer(self, string)
+    def __set_backend(self, backend):
+        # the previous backend (e.g. an open file) is closed
+        if self.__backend is not None and self.__backend is not backend:
+            self.__backend.close()
+        self.__backend = backend
         self.reset()
 
+    def from_string(self, string):
+        self.__set_backend(StrTokenizer(self, string))
+
+    def from_file(self, filename, chunk_size=FILE_CHUNK_SIZE):
+        """Tokenizes a (UTF-8) file, cf. FileTokenizer.
+        Returns the backend, a context manager closing the file."""
+        self.__set_backend(FileTokenizer(self, filename, chunk_size))
+        return self.__backend
+
+    def close(self):
+        """Closes (and forgets) the backend."""
+        self.__set_backend(None)
+
+    def position_at(self, offset):
+        if offset == self.__pos.offset:
+            return self.__pos
+        self.__pos = ParsePosition(offset, line_starts=self.__backend.line_starts)
+        return self.__pos
+
     @property
     def position(self):
-        return self.pos
+        return self.position_at(self.offset)
+
+    @property
+    def line_starts(self):
+        return self.__backend.line_starts
+
+    @property
+    def pos(self):
+        return self.position
 
     def add_rule(self, token_rule):
+        self.__scanners = None
         if token_rule.lookups is None:
             self.__none_rules.append(token_rule)
         else:
@@ -118,56 +193,44 @@ class Tokenizer:
                     rules = self.__token_rules[lookup]
                 rules.append(token_rule)
 
+    def compile(self):
+        """Compiles the rules of each lookup char in a master regexp.
+        The rules of a lookup are still tried one at a time if they cannot
+        be compiled (e.g. a regexp with an anchor), and for the newline
+        (the master regexps, like the Regexp rules, only see the current line)."""
+        from popparser.tokens import compile_rules
+        self.__scanners = dict()
+        for (lookup, rules) in self.__token_rules.items():
+            if lookup != '\n':
+                self.__scanners[lookup] = compile_rules(rules + self.__none_rules)
+        self.__none_scanner = compile_rules(self.__none_rules) if self.__none_rules else None
+
     def forward(self):
-        char = self.peek_char()
-        if char is None:
+        if self.offset >= self.__backend.length:
             return False  # cannot advance forward
-        if char == '\n':
-            self.lines[self.pos.offset] = self.pos
-            self.pos = self.pos.next_line()
-        else:
-            self.pos = self.pos.next_char()
+        self.offset += 1
         return True
 
     def forwards(self, nb):
         if nb < 0:
             return self.backwards(-nb)
-        saved_pos = self.pos
-        saved_lines = deepcopy(self.lines)
-        for _ in range(nb):
-            moved = self.forward()
-            if not moved:
-                self.pos = saved_pos
-                self.lines = saved_lines
-                return False
-        # end of for
+        if self.offset + nb > self.__backend.length:
+            return False
+        self.offset += nb
         return True
 
     def backward(self):
-        if self.pos.offset == 0:
+        if self.offset == 0:
             return False
-        try:
-            prev = self.lines[self.pos.offset - 1]
-            self.pos = prev
-            del self.lines[self.pos.offset]
-            return True
-        except KeyError:
-            # not an end of line
-            self.pos = self.pos.prev_char()
-            return True
+        self.offset -= 1
+        return True
 
     def backwards(self, nb):
         if nb < 0:
             return self.forwards(-nb)
-        saved_pos = self.pos
-        saved_lines = deepcopy(self.lines)
-        for _ in range(nb):
-            moved = self.backward()
-            if not moved:
-                self.pos = saved_pos
-                self.lines = saved_lines
-                return False
-        # end of for
+        if self.offset - nb < 0:
+            return False
+        self.offset -= nb
         return True
 
     def peek_char(self):
@@ -194,21 +257,13 @@ class Tokenizer:
         return char
 
     def consume(self, string):
-        saved_pos = self.pos
-        saved_lines = deepcopy(self.lines)
-        for char in string:
-            next_char = self.peek_char()
-            if (next_char is None) or (next_char != char):
-                self.pos = saved_pos
-                self.lines = saved_lines
-                return False
-            # ok, same char
-            self.forward()
-        # end of for, the string has been consumed
+        if not self.__backend.startswith(string, self.offset):
+            return False
+        self.offset += len(string)
         return True
 
     def put_back(self, token):
-        self.backwards(token.end_pos.offset - token.start_pos.offset)
+        self.offset = token.start_pos.offset
         #XXX: check needed ?
         #if self.peek() != token:
         #    raise ValueError("Wrong token to put back")
@@ -216,9 +271,44 @@ class Tokenizer:
     def next(self):
         '''Return the next token.
         '''
+        if self.__peeked is not None and self.__peeked[0] == self.offset:
+            (_, token, self.offset) = self.__peeked
+            return token
+
+        start_offset = self.offset
+        (token_type, value) = self.scan()
+        if token_type == EOF_TOKEN_TYPE:
+            return EOFToken(self.position)
+        elif token_type == ERROR_TOKEN_TYPE:
+            return ErrorToken(value, self.position)
+        return Token(token_type, value, self.position_at(start_offset), self.position)
+
+    def scan(self):
+        '''Recognize the next token without building it: returns its
+        type and value (and moves after the token). At the end of input the
+        type is EOF_TOKEN_TYPE, and ERROR_TOKEN_TYPE if no rule applies
+        (the value is then the error message), in both cases the offset
+        does not change.
+        '''
         lookup = self.peek_char()
         if lookup is None:
-            return EOFToken(self.pos)
+            return (EOF_TOKEN_TYPE, None)
+
+        if self.__scanners is None:
+            self.compile()
+        if lookup in self.__token_rules:
+            scanner = self.__scanners.get(lookup)
+        else:
+            scanner = self.__none_scanner
+        if scanner is not None:
+            found = self.__backend.scan(scanner, self.offset)
+            if found is None:
+                return (ERROR_TOKEN_TYPE, repr(lookup))
+            (rule, parsed_str) = found
+            self.offset += len(parsed_str)
+            return (rule.token_type, parsed_str)
+
+        # the rules are tried in order
         if lookup in self.__token_rules:
             rules = self.__token_rules[lookup] + self.__none_rules
         else:
@@ -227,70 +317,278 @@ class Tokenizer:
         for rule in rules:
             token = rule.recognize(self)
             if token is not None:
-                return token
+                return (token.token_type, token.value)
 
-        return ErrorToken(repr(lookup), self.pos)
+        return (ERROR_TOKEN_TYPE, repr(lookup))
 
     def peek(self):
-        saved_pos = self.pos
-        saved_lines = deepcopy(self.lines)
+        if self.__peeked is not None and self.__peeked[0] == self.offset:
+            return self.__peeked[1]
+        saved_offset = self.offset
         token = self.next()
-        self.pos = saved_pos
-        self.lines = saved_lines
+        self.__peeked = (saved_offset, token, self.offset)
+        self.offset = saved_offset
         return token
 
     def substring(self, start_offset, end_offset):
         return self.__backend.substring(start_offset, end_offset)
 
     def __str__(self):
+        pos = self.position
         msg = ""
-        msg += str(self.pos.line_pos)
+        msg += str(pos.line_pos)
         msg += ": "
-        if self.pos.line_pos in self.lines:
-            start_offset = self.lines[self.pos.line_pos]
-        else:
-            start_offset = 0
-
-        end_offset = self.pos.offset
+        start_offset = pos.offset - pos.char_pos + 1
+        end_offset = pos.offset
         msg += self.substring(start_offset, end_offset)
         msg += "_"
-        msg += self.peek_line()
+        msg += self.peek_line() or ""
         return msg
 
     def __repr__(self):
         return "<Tokenizer: " + str(self) + ">"
 
 
+class TokenArray:
+    """The tokens of an input, as parallel lists of token types, values and
+    start offsets.  The input is tokenized on demand (up to the requested
+    token), the last token being the EOF (or an error) token.
+    The Token objects and positions are only built when requested."""
+    def __init__(self, tokenizer):
+        self.tokenizer = tokenizer
+        self.line_starts = tokenizer.line_starts
+        tokenizer.reset()
+        self.token_types = []
+        self.values = []
+        # the start offsets, and the end offset of the last token
+        self.offsets = [0]
+        self.complete = False
+        self.tokens = []
+        self.positions = [None]
+
+    def __len__(self):
+        return len(self.token_types)
+
+    def fill(self, index):
+        """Tokenizes the input up to the token at index (if possible)."""
+        tokenizer = self.tokenizer
+        while len(self.token_types) <= index and not self.complete:
+            (token_type, value) = tokenizer.scan()
+            self.token_types.append(token_type)
+            self.values.append(value)
+            self.offsets.append(tokenizer.offset)
+            self.tokens.append(None)
+            self.positions.append(None)
+            if token_type == EOF_TOKEN_TYPE or token_type == ERROR_TOKEN_TYPE:
+                self.complete = True
+
+    def is_last(self, index):
+        # the input is tokenized up to its last (EOF or error) token
+        return self.complete and index >= len(self.token_types) - 1
+
+    def position(self, index):
+        """The (start) position of the token at index."""
+        if index >= len(self.token_types):
+            self.fill(index)
+        position = self.positions[index]
+        if position is None:
+            position = ParsePosition(self.offsets[index], line_starts=self.line_starts)
+            self.positions[index] = position
+        return position
+
+    def token(self, index):
+        if index >= len(self.token_types):
+            self.fill(index)
+        token = self.tokens[index]
+        if token is None:
+            token_type = self.token_types[index]
+            start_pos = self.position(index)
+            if token_type == EOF_TOKEN_TYPE:
+                token = EOFToken(start_pos)
+            elif token_type == ERROR_TOKEN_TYPE:
+                token = ErrorToken(self.values[index], start_pos)
+            else:
+                token = Token(token_type, self.values[index], start_pos, self.position(index + 1))
+            token.index = index
+            self.tokens[index] = token
+        return token
+
+
 class TokenizerBackend:
-    pass
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
 
 
 class StrTokenizer(TokenizerBackend):
     def __init__(self, tokenizer, string):
         self.tokenizer = tokenizer
         self.string = string
+        self.length = len(string)
+        # the offsets of the first char of each line
+        self.line_starts = [0]
+        offset = string.find('\n')
+        while offset >= 0:
+            self.line_starts.append(offset + 1)
+            offset = string.find('\n', offset + 1)
 
     def peek_char(self):
-        if self.tokenizer.pos.offset > len(self.string) - 1:
+        offset = self.tokenizer.offset
+        if offset >= self.length:
             return None
-        return self.string[self.tokenizer.pos.offset]
+        return self.string[offset]
 
     def peek_line(self):
-        line = None
-        offset = self.tokenizer.pos.offset
-        lenstr = len(self.string)
-        while True:
-            if offset >= lenstr:
-                break
-            if line is None:
-                line = ""
-            char = self.string[offset]
-            if char == '\n':
-                break
-            line += char
-            offset += 1
-        # at the end of the line
-        return line
+        offset = self.tokenizer.offset
+        if offset >= self.length:
+            return None
+        end = self.string.find('\n', offset)
+        if end < 0:
+            end = self.length
+        # up to the end of the line
+        return self.string[offset:end]
+
+    def scan(self, scanner, offset):
+        end = self.string.find('\n', offset)
+        if end < 0:
+            end = self.length
+        return scanner.match(self.string, offset, end)
+
+    def startswith(self, prefix, offset):
+        return self.string.startswith(prefix, offset)
 
     def substring(self, start_offset, end_offset):
         return self.string[start_offset:end_offset]
+
+
+class FileTokenizer(TokenizerBackend):
+    """A backend reading an UTF-8 file through a memory map, so that large
+    inputs are not decoded as a whole.  The file is cut in chunks of whole
+    lines (a chunk never splits a line, hence nor a char), decoded when
+    needed and kept in a small LRU cache.  The offsets are (as for a
+    StrTokenizer) char offsets: the chunks and the line starts are indexed
+    incrementally, as the tokenizer moves forward."""
+    def __init__(self, tokenizer, filename, chunk_size=FILE_CHUNK_SIZE,
+                 nb_cached_chunks=FILE_CACHED_CHUNKS):
+        self.tokenizer = tokenizer
+        self.filename = filename
+        self.chunk_size = chunk_size
+        self.nb_cached_chunks = nb_cached_chunks
+        self.file = open(filename, 'rb')
+        self.size = os.fstat(self.file.fileno()).st_size
+        if self.size > 0:
+            self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            # (an empty file cannot be mapped)
+            self.data = b''
+        self.length = self.count_chars()
+        # the start (byte and char) offsets of the indexed chunks,
+        # and the end offsets of the last one
+        self.chunk_byte_starts = [0]
+        self.chunk_char_starts = [0]
+        # the (char) offsets of the first char of each (indexed) line
+        self.line_starts = [0]
+        # index -> decoded chunk (least recently used first)
+        self.chunks = OrderedDict()
+
+    def close(self):
+        if self.size > 0:
+            self.data.close()
+        self.file.close()
+
+    def count_chars(self):
+        nb_continuations = 0
+        for start in range(0, self.size, 1024 * 1024):
+            block = self.data[start:start + 1024 * 1024]
+            nb_continuations += len(block) - len(block.translate(None, _UTF8_CONTINUATION_BYTES))
+        return self.size - nb_continuations
+
+    def index_chunk(self):
+        """Indexes the next chunk (returns False at the end of the file)."""
+        byte_start = self.chunk_byte_starts[-1]
+        if byte_start >= self.size:
+            return False
+        char_start = self.chunk_char_starts[-1]
+        newline = self.data.find(b'\n', byte_start + self.chunk_size - 1)
+        byte_end = newline + 1 if newline >= 0 else self.size
+        text = self.data[byte_start:byte_end].decode('utf-8')
+        offset = text.find('\n')
+        while offset >= 0:
+            self.line_starts.append(char_start + offset + 1)
+            offset = text.find('\n', offset + 1)
+        self.chunk_byte_starts.append(byte_end)
+        self.chunk_char_starts.append(char_start + len(text))
+        self.cache_chunk(len(self.chunk_byte_starts) - 2, text)
+        return True
+
+    def cache_chunk(self, index, text):
+        self.chunks[index] = text
+        if len(self.chunks) > self.nb_cached_chunks:
+            self.chunks.popitem(last=False)
+
+    def chunk_at(self, offset):
+        """The (decoded chunk, char start offset) of the chunk at offset,
+        or (None, offset) at the end of the file."""
+        while offset >= self.chunk_char_starts[-1]:
+            if not self.index_chunk():
+                return (None, offset)
+        index = bisect_right(self.chunk_char_starts, offset) - 1
+        text = self.chunks.get(index)
+        if text is None:
+            text = self.data[self.chunk_byte_starts[index]:self.chunk_byte_starts[index + 1]].decode('utf-8')
+            self.cache_chunk(index, text)
+        else:
+            self.chunks.move_to_end(index)
+        return (text, self.chunk_char_starts[index])
+
+    def peek_char(self):
+        (text, start) = self.chunk_at(self.tokenizer.offset)
+        if text is None:
+            return None
+        return text[self.tokenizer.offset - start]
+
+    def peek_line(self):
+        (text, start) = self.chunk_at(self.tokenizer.offset)
+        if text is None:
+            return None
+        offset = self.tokenizer.offset - start
+        end = text.find('\n', offset)
+        if end < 0:
+            end = len(text)
+        # up to the end of the line (a line is never split in chunks)
+        return text[offset:end]
+
+    def scan(self, scanner, offset):
+        (text, start) = self.chunk_at(offset)
+        if text is None:
+            return None
+        end = text.find('\n', offset - start)
+        if end < 0:
+            end = len(text)
+        return scanner.match(text, offset - start, end)
+
+    def startswith(self, prefix, offset):
+        (text, start) = self.chunk_at(offset)
+        if text is None:
+            return prefix == ''
+        if offset - start + len(prefix) <= len(text):
+            return text.startswith(prefix, offset - start)
+        # (the prefix spans several chunks)
+        return self.substring(offset, offset + len(prefix)) == prefix
+
+    def substring(self, start_offset, end_offset):
+        end_offset = min(end_offset, self.length)
+        parts = []
+        offset = start_offset
+        while offset < end_offset:
+            (text, start) = self.chunk_at(offset)
+            part = text[offset - start:end_offset - start]
+            parts.append(part)
+            offset += len(part)
+        return "".join(parts)
@@ -21,6 +21,12 @@ class TokenRule:
     def recognize(self, tokenizer):
         raise NotImplementedError("Abstract method")
 
+    @property
+    def pattern(self):
+        """The regular expression (source) recognized by the rule, when the
+        rule can be compiled in a master regexp (cf. compile_rules), or None."""
+        return None
+
 
 class CharPredicate(TokenRule):
     def __init__(self, token_type):
@@ -47,6 +53,10 @@ class Char(CharPredicate):
     def lookups(self):
         return {self.char}
 
+    @property
+    def pattern(self):
+        return re.escape(self.char)
+
     def predicate(self, char):
         return char == self.char
 
@@ -60,6 +70,10 @@ class CharSet(CharPredicate):
     def lookups(self):
         return self.charset
 
+    @property
+    def pattern(self):
+        return "[" + "".join(re.escape(char) for char in self.charset) + "]"
+
     def predicate(self, char):
         return char in self.charset
 
@@ -77,6 +91,10 @@ class CharInterval(CharPredicate):
                           in range(ord(self.min_char),
                                    ord(self.max_char) + 1)}
 
+    @property
+    def pattern(self):
+        return "[" + re.escape(self.min_char) + "-" + re.escape(self.max_char) + "]"
+
     def predicate(self, char):
         return ord(self.min_char) <= ord(char) <= ord(self.max_char)
 
@@ -92,6 +110,10 @@ class Literal(TokenRule):
     def lookups(self):
         return {self.literal[0]}
 
+    @property
+    def pattern(self):
+        return re.escape(self.literal)
+
     def recognize(self, tokenizer):
         start_pos = tokenizer.position
         if tokenizer.consume(self.literal):
@@ -115,6 +137,11 @@ class LiteralSet(TokenRule):
                 self.__lookups.add(literal[0])
         return self.__lookups
 
+    @property
+    def pattern(self):
+        # (the alternation is ordered, like the literals)
+        return "(?:" + "|".join(re.escape(literal) for literal in self.literals) + ")"
+
     def recognize(self, tokenizer):
         start_pos = tokenizer.position
         for literal in self.literals:
@@ -153,10 +180,70 @@ class RegexpRule(TokenRule):
                                 start_pos, tokenizer.position)
 
 
+# the regexps matching outside of the current line (at its start or before)
+# or with their own flags cannot be compiled in a master regexp
+UNCOMPILABLE_REGEXP = re.compile(r"(?<!\[)\^|\\[AbB0-9]|\(\?<[=!]|\(\?[aiLmsux]|\(\?P=")
+
 class Regexp(RegexpRule):
     def __init__(self, token_type, regexp, lookups=None):
         RegexpRule.__init__(self, token_type, regexp, lookups)
 
+    @property
+    def pattern(self):
+        if (self.regexp.flags & ~re.UNICODE) \
+           or UNCOMPILABLE_REGEXP.search(self.regexp.pattern):
+            return None
+        return self.regexp.pattern
+
     def build_token(self, _, parsed_str, start_pos, end_pos):
         return Token(self.token_type, parsed_str,
                      start_pos, end_pos)
+
+
+class MasterRegexp:
+    """A sequence of token rules compiled in a single regular expression.
+    The alternation tries the rules in order, hence the first rule that
+    matches wins, as with the rules tried one at a time."""
+    def __init__(self, rules, regexp, group_indices):
+        self.rules = rules
+        self.regexp = regexp
+        self.group_indices = group_indices
+
+    def match(self, string, offset, end_offset):
+        """Returns the (rule, matched string) at offset, or None.
+        The match does not go beyond end_offset (the end of the line)."""
+        match_obj = self.regexp.match(string, offset, end_offset)
+        if match_obj is None:
+            return None
+        for (rule, group_index) in zip(self.rules, self.group_indices):
+            if match_obj.start(group_index) >= 0:
+                return (rule, match_obj.group(group_index))
+        return None
+
+
+def compile_rules(rules):
+    """Compiles token rules in a master regexp, or returns None if one of
+    the rules cannot be compiled (then the rules must be tried one by one).
+
+    Remark: the literals with a newline are not compiled because the
+    master regexp, like the Regexp rules, only sees the current line."""
+    patterns = []
+    group_indices = []
+    group_index = 1
+    for rule in rules:
+        pattern = rule.pattern
+        if pattern is None:
+            return None
+        if isinstance(rule, (Literal, LiteralSet, CharPredicate)) and "\n" in pattern:
+            return None
+        patterns.append("(" + pattern + ")")
+        group_indices.append(group_index)
+        try:
+            group_index += 1 + re.compile(pattern).groups
+        except re.error:
+            return None
+    try:
+        regexp = re.compile("|".join(patterns))
+    except re.error: # e.g. the same group name in two rules
+        return None
+    return MasterRegexp(rules, regexp, group_indices)
@@ -0,0 +1,144 @@
+'''Parse tracing and profiling.
+
+Tracing costs nothing when it is off: the parsers are only given a traced
+class (a subclass of their class, with a traced parse method) while
+tracing, e.g.
+
+    tracer = ParseTracer()
+    with tracer.tracing(grammar):
+        ... parse ...
+    print(tracer.report())
+
+Only the rules of the grammars (the registered parsers) are traced.
+For each rule, the tracer records the number of calls, of failures and of
+backtracks (failures after consuming some input), and the time spent in
+the rule (total, i.e. including the sub-rules, and self).  The statistics
+can be exported (as a dictionary) and merged, e.g. to profile the parsing
+of many files (in many processes).
+
+The tracer is pluggable: a subclass can redefine enter and leave.
+'''
+
+import contextlib
+import time
+
+
+class RuleStats:
+    __slots__ = ('calls', 'failures', 'backtracks', 'total_time', 'self_time')
+
+    def __init__(self, calls=0, failures=0, backtracks=0, total_time=0.0, self_time=0.0):
+        self.calls = calls
+        self.failures = failures
+        self.backtracks = backtracks
+        self.total_time = total_time
+        self.self_time = self_time
+
+    def merge(self, other):
+        self.calls += other.calls
+        self.failures += other.failures
+        self.backtracks += other.backtracks
+        self.total_time += other.total_time
+        self.self_time += other.self_time
+
+    def export(self):
+        return { slot : getattr(self, slot) for slot in self.__slots__ }
+
+
+# the traced class of each parser class
+_TRACED_CLASSES = {}
+
+def traced_class(parser_class):
+    traced = _TRACED_CLASSES.get(parser_class)
+    if traced is None:
+        base_parse = parser_class.parse
+
+        def parse(self, llparsing):
+            tracer = self.tracer
+            tracer.enter(self, llparsing)
+            result = None
+            try:
+                result = base_parse(self, llparsing)
+            finally:
+                tracer.leave(self, llparsing, result)
+            return result
+
+        traced = type("Traced" + parser_class.__name__, (parser_class,),
+                      { 'parse' : parse, '__module__' : __name__ })
+        _TRACED_CLASSES[parser_class] = traced
+    return traced
+
+
+class ParseTracer:
+    def __init__(self):
+        self.stats = {}  # dict[str,RuleStats]
+        # the active rules: [rule, start time, start offset, time in the sub-rules]
+        self.stack = []
+        # the number of active calls of each rule (for the recursive rules)
+        self.active = {}
+
+    @contextlib.contextmanager
+    def tracing(self, *grammars):
+        """Traces the rules of the grammars (within the context)."""
+        traced = []
+        for grammar in grammars:
+            for parser in grammar.rules.values():
+                if parser.grammar_rule is not None and parser.__class__ not in _TRACED_CLASSES.values():
+                    parser.tracer = self
+                    original_class = parser.__class__
+                    parser.__class__ = traced_class(original_class)
+                    traced.append((parser, original_class))
+        try:
+            yield self
+        finally:
+            for (parser, original_class) in traced:
+                parser.__class__ = original_class
+                del parser.tracer
+
+    def enter(self, parser, llparsing):
+        rule = parser.grammar_rule
+        self.active[rule] = self.active.get(rule, 0) + 1
+        self.stack.append([rule, time.perf_counter(), llparsing.position.offset, 0.0])
+
+    def leave(self, parser, llparsing, result):
+        (rule, start_time, start_offset, sub_time) = self.stack.pop()
+        elapsed = time.perf_counter() - start_time
+        stats = self.stats.get(rule)
+        if stats is None:
+            stats = RuleStats()
+            self.stats[rule] = stats
+        stats.calls += 1
+        stats.self_time += elapsed - sub_time
+        self.active[rule] -= 1
+        if self.active[rule] == 0:
+            # (the time of a recursive call is already in the outermost call)
+            stats.total_time += elapsed
+        if result is None or result.iserror:
+            stats.failures += 1
+            if llparsing.position.offset != start_offset:
+                stats.backtracks += 1
+        if self.stack:
+            self.stack[-1][3] += elapsed
+
+    def export(self):
+        return { rule : stats.export() for (rule, stats) in self.stats.items() }
+
+    def merge(self, other):
+        """Adds the statistics of another tracer (or of an export)."""
+        if isinstance(other, ParseTracer):
+            other = other.export()
+        for (rule, exported) in other.items():
+            if rule not in self.stats:
+                self.stats[rule] = RuleStats()
+            self.stats[rule].merge(RuleStats(**exported))
+
+    def report(self, limit=None):
+        """The statistics of the rules as a text table, by decreasing total time."""
+        lines = [ "{:<24} {:>9} {:>9} {:>10} {:>11} {:>10}".format("rule", "calls", "failures", "backtracks"
+                                                                   , "total (ms)", "self (ms)") ]
+        rules = sorted(self.stats.items(), key=lambda item: item[1].total_time, reverse=True)
+        for (rule, stats) in rules[:limit]:
+            lines.append("{:<24} {:>9} {:>9} {:>10} {:>11.3f} {:>10.3f}".format(rule, stats.calls, stats.failures
+                                                                                , stats.backtracks
+                                                                                , stats.total_time * 1000
+                                                                                , stats.self_time * 1000))
+        return "\n".join(lines)
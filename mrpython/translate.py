@@ -34,6 +34,12 @@ TRANSLATOR_DICT = {
     ,"Division by zero" : { 'fr' : "Division par zéro" }
     ,"Assertion error (failed test?)" : { 'fr' : "Erreur d'assertion (test invalide ?)" }
     ,"User interruption" : { 'fr' : "Interruption par l'utilisateur"}
+    ,"CPU time limit exceeded" : { 'fr' : "Temps de calcul maximal dépassé" }
+    ,"Time limit exceeded" : { 'fr' : "Durée maximale dépassée" }
+    ,"Memory limit exceeded" : { 'fr' : "Mémoire maximale dépassée" }
+    ,"Recursion limit exceeded (too many nested calls)" : { 'fr' : "Profondeur de récursion maximale dépassée (trop d'appels imbriqués)" }
+    ,"\n[output truncated after {} characters]\n" : { 'fr' : "\n[sortie tronquée après {} caractères]\n" }
+    ,"[output too long: the first {} bytes ({} lines) were dropped]\n" : { 'fr' : "[sortie trop longue : les premiers {} octets ({} lignes) ont été supprimés]\n" }
     # Erreurs de conventions
     , ": line {}\n" : { 'fr' : ": ligne {}\n"}
     ,"Missing tests" : { 'fr' : "Tests manquants"}
@@ -0,0 +1,277 @@
+"""Batch type-checking of whole submission directories.
+
+The files (given directly, as directories or as glob patterns) are
+fanned out to a pool of worker processes, and one structured result
+per file is streamed as soon as it is available (as JSON lines by default).
+
+Usage example:
+
+    python3 mrpython/typechecking/batch.py -j 8 submissions/ 'extra/*.py'
+"""
+
+import os.path, sys
+import argparse
+import contextlib
+import glob
+import io
+import json
+import multiprocessing as mp
+import signal
+import time
+import tokenize
+import traceback
+
+main_path = os.path.join(os.path.dirname(os.path.realpath(__file__)), os.pardir)
+found_path = False
+for path in sys.path:
+    if path == main_path:
+        found_path = True
+        break
+if not found_path:
+    sys.path.append(main_path)
+
+import ast
+
+from typechecking.prog_ast import Program
+from typechecking.typechecker import type_errors_diagnostics
+from typechecking.typecache import TypeCheckCache, DEFAULT_CACHE_DIR, DEFAULT_MAX_SIZE
+from typechecking.type_parser import shared_type_parser
+from popparser.trace import ParseTracer
+
+# default per-file timeout (in seconds)
+DEFAULT_TIMEOUT = 30
+
+class CheckTimeout(Exception):
+    pass
+
+def _timeout_handler(signum, frame):
+    raise CheckTimeout()
+
+def expand_paths(paths):
+    """Expands files, directories (recursively) and glob patterns
+    into a sorted list of distinct python files."""
+    files = []
+    seen = set()
+    for path in paths:
+        if os.path.isdir(path):
+            found = glob.glob(os.path.join(path, '**', '*.py'), recursive=True)
+        elif os.path.isfile(path):
+            found = [path]
+        else:
+            found = [f for f in glob.glob(path, recursive=True) if os.path.isfile(f)]
+        for filename in sorted(found):
+            if filename not in seen:
+                seen.add(filename)
+                files.append(filename)
+    return files
+
+def check_file(filename, timeout=DEFAULT_TIMEOUT, cache=None, collect_all=False, trace=False):
+    """Type-checks a single file and returns its result as a dictionary.
+    This never raises: checker crashes and timeouts are part of the result.
+    The results are looked up in (and stored into) the cache, if given.
+    In collect_all mode, all the type errors are reported.
+    If trace is set, the parsing of the type signatures is profiled
+    (cf. popparser/trace.py) and exported in the result ('parse_trace')."""
+    result = { 'file' : filename
+               , 'status' : 'ok'
+               , 'cached' : False
+               , 'errors' : []
+               , 'timings' : { 'parse' : 0.0, 'check' : 0.0, 'total' : 0.0 } }
+
+    use_alarm = timeout and hasattr(signal, 'setitimer')
+    if use_alarm:
+        old_handler = signal.signal(signal.SIGALRM, _timeout_handler)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+
+    tracer = ParseTracer() if trace else None
+
+    start_time = time.perf_counter()
+    step_time = start_time
+    try:
+        with contextlib.ExitStack() as stack:
+            # the checker (sometimes) prints debugging informations
+            stack.enter_context(contextlib.redirect_stdout(io.StringIO()))
+            if tracer is not None:
+                stack.enter_context(tracer.tracing(*shared_type_parser().grammars))
+            with tokenize.open(filename) as f:
+                source = f.read()
+
+            diagnostics = cache.get(source, collect_all=collect_all) if cache is not None else None
+            if diagnostics is not None:
+                result['cached'] = True
+            else:
+                modast = ast.parse(source, filename=filename, mode="exec")
+                prog = Program()
+                prog.build_from_ast(modast, filename, source)
+                result['timings']['parse'] = time.perf_counter() - step_time
+
+                step_time = time.perf_counter()
+                ctx = prog.type_check(collect_all)
+                result['timings']['check'] = time.perf_counter() - step_time
+
+                diagnostics = type_errors_diagnostics(ctx)
+                if cache is not None:
+                    cache.put(source, diagnostics, collect_all=collect_all)
+
+            result['errors'] = diagnostics
+            if diagnostics:
+                result['status'] = 'errors'
+    except SyntaxError as err:
+        result['status'] = 'syntax-error'
+        result['errors'] = [{ 'fail_string' : "SyntaxError@{}:{}".format(err.lineno, err.offset)
+                              , 'fatal' : True
+                              , 'reported' : True
+                              , 'severity' : 'error'
+                              , 'type' : 'SyntaxError'
+                              , 'line' : err.lineno
+                              , 'column' : err.offset
+                              , 'details' : str(err.msg) }]
+    except CheckTimeout:
+        result['status'] = 'timeout'
+        result['crash'] = "type-checking took more than {} seconds".format(timeout)
+    except BaseException as err:
+        # includes RecursionError, MemoryError, ... but not the pool shutting down
+        if isinstance(err, (KeyboardInterrupt, SystemExit)):
+            raise
+        result['status'] = 'crash'
+        result['crash'] = "".join(traceback.format_exception_only(type(err), err)).strip()
+    finally:
+        if use_alarm:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, old_handler)
+
+    result['timings']['total'] = time.perf_counter() - start_time
+    if tracer is not None:
+        result['parse_trace'] = tracer.export()
+    return result
+
+# the cache of a worker process
+_WORKER_CACHE = None
+
+def _check_file_task(task):
+    filename, timeout, collect_all, trace = task
+    return check_file(filename, timeout, _WORKER_CACHE, collect_all, trace)
+
+def _init_worker(cache_dir, cache_max_size):
+    global _WORKER_CACHE
+    # the parent process handles Ctrl-C
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    if cache_dir is not None:
+        _WORKER_CACHE = TypeCheckCache(cache_dir, cache_max_size)
+
+def check_files(filenames, jobs=None, timeout=DEFAULT_TIMEOUT, ordered=False, cache=None, collect_all=False, trace=False):
+    """Generates the results of type-checking the files, using jobs worker
+    processes (all the cores by default). Results are yielded as soon as they
+    are available, unless ordered is set.  The (optional) cache is shared
+    by all the workers."""
+    if jobs is None:
+        jobs = os.cpu_count() or 1
+
+    if jobs <= 1 or len(filenames) <= 1:
+        for filename in filenames:
+            yield check_file(filename, timeout, cache, collect_all, trace)
+        return
+
+    tasks = [(filename, timeout, collect_all, trace) for filename in filenames]
+    # small chunks keep the stream responsive, larger ones reduce the IPC overhead
+    chunksize = max(1, min(32, len(tasks) // (jobs * 8)))
+    # workers are recycled from time to time so that a leaking (or crashed)
+    # checker cannot degrade the whole run
+    cache_args = (cache.cache_dir, cache.max_size) if cache is not None else (None, None)
+    pool = mp.Pool(jobs, initializer=_init_worker, initargs=cache_args, maxtasksperchild=500)
+    try:
+        if ordered:
+            results = pool.imap(_check_file_task, tasks, chunksize)
+        else:
+            results = pool.imap_unordered(_check_file_task, tasks, chunksize)
+        for result in results:
+            yield result
+        pool.close()
+    except BaseException:
+        pool.terminate()
+        raise
+    finally:
+        pool.join()
+
+def format_text(result):
+    lines = []
+    if result['status'] == 'ok':
+        lines.append("{}: ok".format(result['file']))
+    elif result['status'] in { 'crash', 'timeout' }:
+        lines.append("{}: {}: {}".format(result['file'], result['status'], result['crash']))
+    for error in result['errors']:
+        lines.append("{}:{}:{}: {}: {}".format(result['file'], error['line'], error['column']
+                                               , error['severity'], error['fail_string']))
+    return "\n".join(lines)
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description="Type-check (many) Python101 programs in parallel.")
+    arg_parser.add_argument('paths', nargs='+', metavar='PATH',
+                            help="a python file, a directory (searched recursively) or a glob pattern")
+    arg_parser.add_argument('-j', '--jobs', type=int, default=None,
+                            help="number of worker processes (default: number of cores)")
+    arg_parser.add_argument('--timeout', type=float, default=DEFAULT_TIMEOUT,
+                            help="per-file timeout in seconds, 0 to disable (default: %(default)s)")
+    arg_parser.add_argument('--format', choices=['json', 'text'], default='json',
+                            help="output format (default: one JSON object per line)")
+    arg_parser.add_argument('--ordered', action='store_true',
+                            help="output the results in the order of the files")
+    arg_parser.add_argument('--all-errors', action='store_true',
+                            help="report all the type errors (instead of stopping at the first fatal one)")
+    arg_parser.add_argument('--trace-parsing', action='store_true',
+                            help="profile the parsing of the type signatures, by grammar rule (report on stderr)")
+    arg_parser.add_argument('-o', '--output', default=None,
+                            help="output file (default: standard output)")
+    arg_parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR,
+                            help="directory of the result cache (default: %(default)s)")
+    arg_parser.add_argument('--cache-size', type=int, default=DEFAULT_MAX_SIZE,
+                            help="maximum size of the result cache in bytes (default: %(default)s)")
+    arg_parser.add_argument('--no-cache', action='store_true',
+                            help="do not use the result cache")
+    arg_parser.add_argument('--clear-cache', action='store_true',
+                            help="empty the result cache before checking")
+    args = arg_parser.parse_args(argv)
+
+    cache = None
+    if not args.no_cache:
+        cache = TypeCheckCache(args.cache_dir, args.cache_size)
+        if args.clear_cache:
+            cache.clear()
+
+    filenames = expand_paths(args.paths)
+    if not filenames:
+        arg_parser.error("no python file found")
+
+    out = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+    stats = { 'ok' : 0, 'errors' : 0, 'syntax-error' : 0, 'crash' : 0, 'timeout' : 0 }
+    nb_cached = 0
+    parse_tracer = ParseTracer() if args.trace_parsing else None
+    start_time = time.perf_counter()
+    try:
+        for result in check_files(filenames, args.jobs, args.timeout, args.ordered, cache, args.all_errors
+                                  , args.trace_parsing):
+            if 'parse_trace' in result:
+                parse_tracer.merge(result.pop('parse_trace'))
+            stats[result['status']] += 1
+            if result['cached']:
+                nb_cached += 1
+            if args.format == 'json':
+                out.write(json.dumps(result, ensure_ascii=False))
+            else:
+                out.write(format_text(result))
+            out.write("\n")
+            out.flush()
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    print("checked {} files in {:.2f}s ({} from cache): {}".format(len(filenames), time.perf_counter() - start_time, nb_cached
+                                                                  , ", ".join("{} {}".format(n, status) for (status, n) in stats.items())),
+          file=sys.stderr)
+    if parse_tracer is not None:
+        print(parse_tracer.report(), file=sys.stderr)
+
+    return 1 if (stats['crash'] or stats['timeout']) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
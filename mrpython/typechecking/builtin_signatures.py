@@ -0,0 +1,162 @@
+"""The signatures of the builtin functions and of the supported modules.
+
+The signature strings below are the reference, but they are not parsed
+when the type-checker is loaded: the prebuilt table builtin_table.py
+(generated from these strings) directly builds the FunctionType objects.
+The table is versioned by a hash of the strings, if it is outdated the
+strings are parsed instead (so regenerate the table after an edit):
+
+    python3 mrpython/typechecking/builtin_signatures.py
+"""
+
+import os.path, sys
+import hashlib
+
+# version of the generated table format (bump it when the generator changes)
+TABLE_FORMAT_VERSION = 1
+
+# module name ('' for the builtins) -> list of (function name, signature)
+BUILTIN_SIGNATURES = {
+    '' : [
+        ('len', "Iterable[α] -> int")
+        , ('abs', "Number -> Number")
+        , ('print', "Ω -> NoneType")
+        , ('min', "Number * Number -> Number")
+        , ('max', "Number * Number -> Number")
+        # , ('range', "int * int -> Iterable[int]")  # range is an expression now
+        , ('int', "Ω -> int")
+        , ('float', "Ω -> float")
+        , ('str', "Ω -> str")
+        , ('ord', "str -> int")
+        , ('chr', "int -> str")
+        , ('round', "Number -> int")
+        , ('.append', "list[α] * α -> NoneType")
+        # images   ... TODO: the type system is not precise enough (for now)
+        , ('draw_line', "float * float * float * float * Ω -> Image")
+        , ('overlay', "Image * Image * Ω -> Image")
+        , ('underlay', "Image * Image * Ω -> Image")
+        , ('fill_triangle', "float * float * float * float * float * float * Ω -> Image")
+        , ('draw_triangle', "float * float * float * float * float * float * Ω -> Image")
+        , ('draw_ellipse', "float * float * float * float * Ω -> Image")
+        , ('fill_ellipse', "float * float * float * float * Ω -> Image")
+        , ('show_image', "Image -> NoneType")
+        # fichiers
+        , ('open', "str * str -> FILE")
+        , ('.readlines', "FILE -> list[str]")
+        , ('.read', "FILE -> str")
+        , ('.write', "FILE * str -> NoneType")
+        # ensembles
+        , ('set', " -> emptyset")
+        , ('.add', "set[α] * α -> NoneType")
+        , ('.remove', "set[α] * α -> NoneType")
+        # dictionnaires
+        , ('dict', " -> emptydict")
+        , ('.items', " dict[α:β] -> Iterable[tuple[α,β]]")
+        , ('.keys', " dict[α:β] -> Set[α]]")
+        # iterables
+        , ('zip', " Iterable[α] * Iterable[β] -> Iterable[tuple[α,β]]")
+    ]
+
+    , 'math' : [
+        ('math.sqrt', "Number -> float")
+        , ('math.floor', "Number -> int")
+        , ('math.ceil', "Number -> int")
+    ]
+
+    , 'random' : [
+        ('random.random', "-> float")
+        , ('random.seed', "int -> NoneType")
+    ]
+}
+
+def signatures_version():
+    """The version of the signatures: a hash of the signature strings
+    (and of the table format)."""
+    h = hashlib.sha1(str(TABLE_FORMAT_VERSION).encode())
+    for module_name in sorted(BUILTIN_SIGNATURES.keys()):
+        h.update(repr((module_name, BUILTIN_SIGNATURES[module_name])).encode('utf-8'))
+    return h.hexdigest()
+
+def parse_signatures(module_name):
+    """Parses the signatures of a module (the slow path, when the table is outdated)."""
+    if __name__ == "__main__":
+        from typechecking.type_parser import function_type_parser
+    else:
+        from .type_parser import function_type_parser
+
+    return { fun_name : function_type_parser(signature).content
+             for (fun_name, signature) in BUILTIN_SIGNATURES[module_name] }
+
+def type_source(type_ast):
+    """The Python source code (constructor calls) building a type."""
+    tname = type_ast.__class__.__name__
+    if tname == 'FunctionType':
+        ret_type = type_ast.ret_type.elem_type if type_ast.partial else type_ast.ret_type
+        return "FunctionType([{}], {}{})".format(", ".join(type_source(param_type) for param_type in type_ast.param_types)
+                                                 , type_source(ret_type)
+                                                 , ", partial=True" if type_ast.partial else "")
+    elif tname == 'TypeVariable':
+        return "TypeVariable({!r})".format(type_ast.var_name)
+    elif tname == 'TypeAlias':
+        return "TypeAlias({!r})".format(type_ast.alias_name)
+    elif tname == 'TupleType':
+        return "TupleType([{}])".format(", ".join(type_source(elem_type) for elem_type in type_ast.elem_types))
+    elif tname == 'DictType':
+        if type_ast.key_type is None:
+            return "DictType()"
+        return "DictType({}, {})".format(type_source(type_ast.key_type), type_source(type_ast.val_type))
+    elif tname in { 'ListType', 'SetType' }:
+        if type_ast.elem_type is None:
+            return "{}()".format(tname)
+        return "{}({})".format(tname, type_source(type_ast.elem_type))
+    elif tname in { 'IterableType', 'SequenceType', 'OptionType' }:
+        return "{}({})".format(tname, type_source(type_ast.elem_type))
+    elif tname in { 'Anything', 'FileType', 'BoolType', 'IntType', 'FloatType', 'NumberType'
+                    , 'NoneTypeType', 'ImageType', 'StrType' }:
+        return "{}()".format(tname)
+    else:
+        raise ValueError("Cannot generate the source of type: {!r}".format(type_ast))
+
+def loader_name(module_name):
+    return "load_{}_signatures".format(module_name if module_name else "builtin")
+
+def generate_table(filename):
+    lines = [ "# Generated by builtin_signatures.py from the signature strings: do not edit."
+              , "# (regenerate with: python3 mrpython/typechecking/builtin_signatures.py)"
+              , ""
+              , "try:"
+              , "    from .type_ast import *"
+              , "except ImportError:"
+              , "    from type_ast import *"
+              , ""
+              , "TABLE_VERSION = {!r}".format(signatures_version()) ]
+
+    for module_name in BUILTIN_SIGNATURES:
+        lines.append("")
+        lines.append("def {}():".format(loader_name(module_name)))
+        lines.append("    return {")
+        sep = ""
+        for (fun_name, fun_type) in parse_signatures(module_name).items():
+            lines.append("        {}{!r} : {}".format(sep, fun_name, type_source(fun_type)))
+            sep = ", "
+        lines.append("    }")
+
+    lines.append("")
+    lines.append("LOADERS = {")
+    sep = ""
+    for module_name in BUILTIN_SIGNATURES:
+        lines.append("    {}{!r} : {}".format(sep, module_name, loader_name(module_name)))
+        sep = ", "
+    lines.append("}")
+
+    with open(filename, 'w', encoding='utf-8') as f:
+        f.write("\n".join(lines) + "\n")
+
+if __name__ == "__main__":
+    main_path = os.path.join(os.path.dirname(os.path.realpath(__file__)), os.pardir)
+    if main_path not in sys.path:
+        sys.path.append(main_path)
+
+    table_filename = os.path.join(os.path.dirname(os.path.realpath(__file__)), "builtin_table.py")
+    generate_table(table_filename)
+    print("Generated: {}".format(table_filename))
@@ -0,0 +1,63 @@
+# Generated by builtin_signatures.py from the signature strings: do not edit.
+# (regenerate with: python3 mrpython/typechecking/builtin_signatures.py)
+
+try:
+    from .type_ast import *
+except ImportError:
+    from type_ast import *
+
+TABLE_VERSION = '3f86ba488c4bf36ac2519a36ccb10c0cd69efa42'
+
+def load_builtin_signatures():
+    return {
+        'len' : FunctionType([IterableType(TypeVariable('α'))], IntType())
+        , 'abs' : FunctionType([NumberType()], NumberType())
+        , 'print' : FunctionType([Anything()], NoneTypeType())
+        , 'min' : FunctionType([NumberType(), NumberType()], NumberType())
+        , 'max' : FunctionType([NumberType(), NumberType()], NumberType())
+        , 'int' : FunctionType([Anything()], IntType())
+        , 'float' : FunctionType([Anything()], FloatType())
+        , 'str' : FunctionType([Anything()], StrType())
+        , 'ord' : FunctionType([StrType()], IntType())
+        , 'chr' : FunctionType([IntType()], StrType())
+        , 'round' : FunctionType([NumberType()], IntType())
+        , '.append' : FunctionType([ListType(TypeVariable('α')), TypeVariable('α')], NoneTypeType())
+        , 'draw_line' : FunctionType([FloatType(), FloatType(), FloatType(), FloatType(), Anything()], ImageType())
+        , 'overlay' : FunctionType([ImageType(), ImageType(), Anything()], ImageType())
+        , 'underlay' : FunctionType([ImageType(), ImageType(), Anything()], ImageType())
+        , 'fill_triangle' : FunctionType([FloatType(), FloatType(), FloatType(), FloatType(), FloatType(), FloatType(), Anything()], ImageType())
+        , 'draw_triangle' : FunctionType([FloatType(), FloatType(), FloatType(), FloatType(), FloatType(), FloatType(), Anything()], ImageType())
+        , 'draw_ellipse' : FunctionType([FloatType(), FloatType(), FloatType(), FloatType(), Anything()], ImageType())
+        , 'fill_ellipse' : FunctionType([FloatType(), FloatType(), FloatType(), FloatType(), Anything()], ImageType())
+        , 'show_image' : FunctionType([ImageType()], NoneTypeType())
+        , 'open' : FunctionType([StrType(), StrType()], FileType())
+        , '.readlines' : FunctionType([FileType()], ListType(StrType()))
+        , '.read' : FunctionType([FileType()], StrType())
+        , '.write' : FunctionType([FileType(), StrType()], NoneTypeType())
+        , 'set' : FunctionType([], SetType())
+        , '.add' : FunctionType([SetType(TypeVariable('α')), TypeVariable('α')], NoneTypeType())
+        , '.remove' : FunctionType([SetType(TypeVariable('α')), TypeVariable('α')], NoneTypeType())
+        , 'dict' : FunctionType([], DictType())
+        , '.items' : FunctionType([DictType(TypeVariable('α'), TypeVariable('β'))], IterableType(TupleType([TypeVariable('α'), TypeVariable('β')])))
+        , '.keys' : FunctionType([DictType(TypeVariable('α'), TypeVariable('β'))], SetType(TypeVariable('α')))
+        , 'zip' : FunctionType([IterableType(TypeVariable('α')), IterableType(TypeVariable('β'))], IterableType(TupleType([TypeVariable('α'), TypeVariable('β')])))
+    }
+
+def load_math_signatures():
+    return {
+        'math.sqrt' : FunctionType([NumberType()], FloatType())
+        , 'math.floor' : FunctionType([NumberType()], IntType())
+        , 'math.ceil' : FunctionType([NumberType()], IntType())
+    }
+
+def load_random_signatures():
+    return {
+        'random.random' : FunctionType([], FloatType())
+        , 'random.seed' : FunctionType([IntType()], NoneTypeType())
+    }
+
+LOADERS = {
+    '' : load_builtin_signatures
+    , 'math' : load_math_signatures
+    , 'random' : load_random_signatures
+}
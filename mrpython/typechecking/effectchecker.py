@@ -138,7 +138,6 @@ def implicit_nonetype_return_check_FunctionDef(fun_def, ctx):
                 ctx.add_type_error(ImplicitNoneTypeReturnError(fun_def.body[-1]))
 
     reset_handled_flag(fun_cfg)
-    to_dot_format(fun_cfg, 0, name = fun_def.name)
 
 
 
@@ -272,8 +271,6 @@ def set_of_basicBlocks(bb, bb_set = set()):
 def aggregate_basicBlocks(bb, bb_set = set()):
     retr = bb_set
     #print("Handling "+ str(bb))
-    with open('out.txt', 'a') as f:
-        f.write(str(bb))
     if not bb.successors:
         return bb
     elif (len(bb.successors) == 1 and bb.btype != 'return' and
@@ -302,14 +299,12 @@ def aggregate_basicBlocks(bb, bb_set = set()):
 
         # looking for a fixpoint
         if successors_copy != bb.successors:
-            print("aggregate_basicBlocks")
             aggregate_basicBlocks(bb)
     # Node can't be aggregated, and it stands alone
     else:
         bb.is_handled = True
 
     for succ in bb.successors:
-        print(succ)
         if not succ.is_handled:
             aggregate_basicBlocks(succ)
 
@@ -0,0 +1,196 @@
+"""Incremental type-checking.
+
+When a student edits one function and re-runs, most of the program is
+unchanged.  The incremental checker remembers, for each (recently checked)
+file, the type errors of each function, of the global variables and of each
+test case, together with a fingerprint of what they depend on:
+
+  - the source text of the definition and its position (errors are located),
+  - the signatures of the (global) names it refers to,
+  - the type definitions and the imports of the program.
+
+Only the parts whose fingerprint changed are type-checked again, the errors
+of the other parts are reused as they are.
+"""
+
+import ast
+import hashlib
+from collections import OrderedDict
+
+from .prog_ast import Program
+from .typechecker import TypingContext, prepare_program_context, type_check_function, type_check_global_vars
+from .scoped_env import ScopedEnv
+
+class _CheckedProgram:
+    def __init__(self, env_key):
+        self.env_key = env_key
+        # dict[str:(str, list[TypeError])]
+        self.functions = dict()
+        # (fingerprint, errors, local environment after the globals)
+        self.global_vars = None
+        # dict[str:list[TypeError]]
+        self.test_cases = dict()
+
+
+def referenced_names(node):
+    """The names a definition (possibly) refers to in the global environment,
+    including methods (e.g. '.append') and module members (e.g. 'math.sqrt')."""
+    names = set()
+    for sub_node in ast.walk(node):
+        if isinstance(sub_node, ast.Name):
+            names.add(sub_node.id)
+        elif isinstance(sub_node, ast.Attribute):
+            names.add("." + sub_node.attr)
+            if isinstance(sub_node.value, ast.Name):
+                names.add(sub_node.value.id + "." + sub_node.attr)
+    return names
+
+def source_segments(prog):
+    """Maps each top-level node (by id) to its first line and source text.
+    A segment also includes the lines (comments) before the node,
+    since variable declarations are written there."""
+    if prog.source_lines is None:
+        prog.source_lines = prog.source.split('\n')
+    segments = dict()
+    prev_end = 0
+    nodes = prog.ast.body
+    for (i, node) in enumerate(nodes):
+        end = getattr(node, 'end_lineno', None)
+        if end is None:
+            # (before python 3.8) the last line of a sub-node, followed by the
+            # continuation lines (e.g. the closing parenthesis of a call)
+            end = max((getattr(sub_node, 'lineno', 0) for sub_node in ast.walk(node)), default=0)
+            next_start = nodes[i + 1].lineno if i + 1 < len(nodes) else len(prog.source_lines) + 1
+            while end + 1 < next_start and prog.source_lines[end].strip() \
+                  and not prog.source_lines[end].lstrip().startswith('#'):
+                end += 1
+        end = max(end, prev_end + 1)
+        segments[id(node)] = (prev_end + 1, "\n".join(prog.source_lines[prev_end:end]))
+        prev_end = end
+    return segments
+
+def _fingerprint(*parts):
+    h = hashlib.sha1()
+    for part in parts:
+        h.update(repr(part).encode('utf-8', 'surrogatepass'))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+class IncrementalTypeChecker:
+    def __init__(self, max_programs=16):
+        # the last checked programs, by filename (least recently used first)
+        self.programs = OrderedDict()
+        self.max_programs = max_programs
+        # statistics: number of (functions/globals/tests) parts checked and reused
+        self.nb_checked = 0
+        self.nb_reused = 0
+
+    def dependencies(self, ctx, nodes, extra_names=()):
+        names = set(extra_names)
+        for node in nodes:
+            names.update(referenced_names(node))
+        return [(name, str(ctx.global_env[name])) for name in sorted(names) if name in ctx.global_env]
+
+    def forget(self, filename):
+        if filename in self.programs:
+            del self.programs[filename]
+
+    def _reuse(self, ctx, errors):
+        self.nb_reused += 1
+        for error in errors:
+            ctx.add_type_error(error)
+
+    def type_check(self, prog, collect_all=False):
+        """Type-checks the program (like type_check_Program)
+        reusing what can be from the previous check of the same file."""
+        ctx = TypingContext(prog, collect_all)
+
+        if not prepare_program_context(prog, ctx):
+            self.forget(prog.filename)
+            return ctx
+
+        env_key = _fingerprint(collect_all
+                               , sorted(ctx.poisoned_types)
+                               , sorted(ctx.poisoned_functions)
+                               , sorted((name, str(type_def)) for (name, type_def) in ctx.type_defs.items())
+                               , sorted(prog.imports.keys())
+                               , sorted(ctx.local_env.keys()))
+        previous = self.programs.pop(prog.filename, None)
+        if previous is not None and previous.env_key != env_key:
+            previous = None
+        checked = _CheckedProgram(env_key)
+        self.programs[prog.filename] = checked
+        while len(self.programs) > self.max_programs:
+            self.programs.popitem(last=False)
+
+        segments = source_segments(prog)
+
+        # the functions
+        for (fun_name, fun_def) in ctx.functions.items():
+            fingerprint = _fingerprint(segments[id(fun_def.ast)]
+                                       , self.dependencies(ctx, [fun_def.ast], [fun_name]))
+            if previous is not None and fun_name in previous.functions \
+               and previous.functions[fun_name][0] == fingerprint:
+                errors = previous.functions[fun_name][1]
+                self._reuse(ctx, errors)
+            else:
+                self.nb_checked += 1
+                nb_errors = len(ctx.type_errors)
+                type_check_function(fun_def, ctx)
+                errors = ctx.type_errors[nb_errors:]
+            checked.functions[fun_name] = (fingerprint, errors)
+            if ctx.must_stop():
+                return ctx
+
+        # the global variables (checked as a whole, since they are sequential)
+        global_asts = [global_var.ast for global_var in prog.global_vars]
+        globals_fingerprint = _fingerprint([segments[id(node)] for node in global_asts]
+                                           , self.dependencies(ctx, global_asts))
+        if previous is not None and previous.global_vars is not None \
+           and previous.global_vars[0] == globals_fingerprint:
+            (_, errors, local_env) = previous.global_vars
+            self._reuse(ctx, errors)
+            ctx.local_env = ScopedEnv(local_env)
+        else:
+            self.nb_checked += 1
+            nb_errors = len(ctx.type_errors)
+            type_check_global_vars(prog, ctx)
+            errors = ctx.type_errors[nb_errors:]
+            local_env = dict(ctx.local_env)
+        checked.global_vars = (globals_fingerprint, errors, local_env)
+        if ctx.must_stop():
+            return ctx
+
+        # the test cases
+        for test_case in prog.test_cases:
+            fingerprint = _fingerprint(globals_fingerprint
+                                       , segments[id(test_case.ast)]
+                                       , self.dependencies(ctx, [test_case.ast]))
+            if previous is not None and fingerprint in previous.test_cases:
+                errors = previous.test_cases[fingerprint]
+                self._reuse(ctx, errors)
+            else:
+                self.nb_checked += 1
+                nb_errors = len(ctx.type_errors)
+                test_case.type_check(ctx)
+                errors = ctx.type_errors[nb_errors:]
+            checked.test_cases[fingerprint] = errors
+            if ctx.must_stop():
+                return ctx
+
+        return ctx
+
+    def typecheck_from_ast(self, ast, filename=None, source=None, collect_all=False):
+        prog = Program()
+        prog.build_from_ast(ast, filename, source)
+        return self.type_check(prog, collect_all)
+
+
+_DEFAULT_CHECKER = None
+
+def default_checker():
+    global _DEFAULT_CHECKER
+    if _DEFAULT_CHECKER is None:
+        _DEFAULT_CHECKER = IncrementalTypeChecker()
+    return _DEFAULT_CHECKER
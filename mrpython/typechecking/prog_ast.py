@@ -46,6 +46,23 @@ class Program:
         self.source_lines = None
         self.ast = None
 
+        # dict[int:str]
+        # the (full-line) comments by line number, built with the program
+        self.comment_lines = None
+
+        # dict[int:tuple]
+        # the parsed variable declarations by line number (filled by the type checker)
+        self.declarations = dict()
+
+    def index_comments(self):
+        """Splits the source in lines and indexes the comment lines, in one pass."""
+        self.source_lines = self.source.split('\n')
+        self.comment_lines = dict()
+        for (i, line) in enumerate(self.source_lines):
+            sline = line.lstrip()
+            if sline and sline[0] == '#':
+                self.comment_lines[i+1] = line
+
     def get_source_line(self, linum):
         if self.source is None:
             raise ValueError("Source is empty")
@@ -94,6 +111,9 @@ class Program:
                 #print("Unsupported instruction: " + node)
                 self.other_top_defs.append(UnsupportedNode(node))
 
+        if self.source is not None:
+            self.index_comments()
+
 class UnsupportedNode:
     def __init__(self, node):
         self.ast = node
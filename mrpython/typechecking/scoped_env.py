@@ -0,0 +1,156 @@
+"""Scoped environments for the type-checker.
+
+Entering a nested construction (if, while, for, comprehension...) or a
+function must not copy the whole environment: the environments record an
+undo trail of their updates instead.  A scope is opened with mark() and
+closed with undo(), which reverts the updates made since the mark.  Both
+operations are O(1), undoing is proportional to the number of updates.
+
+The updates made while no scope is open (e.g. the global variables)
+are not recorded.
+"""
+
+# the previous value of a key that was not bound
+_MISSING = object()
+
+class ScopedEnv(dict):
+    """A dictionary with an undo trail."""
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # (key, previous value) updates
+        self.trail = []
+        # the trail length at each open scope
+        self.marks = []
+
+    def __setitem__(self, key, value):
+        if self.marks:
+            self.trail.append((key, super().get(key, _MISSING)))
+        super().__setitem__(key, value)
+
+    def __delitem__(self, key):
+        if self.marks:
+            self.trail.append((key, super().__getitem__(key)))
+        super().__delitem__(key)
+
+    # the other dict updates go through __setitem__ and __delitem__ (or
+    # record their changes), so that they are undone too (the other ones,
+    # e.g. |=, are not recorded)
+
+    def update(self, *args, **kwargs):
+        for (key, value) in dict(*args, **kwargs).items():
+            self[key] = value
+
+    def setdefault(self, key, default=None):
+        if key in self:
+            return self[key]
+        self[key] = default
+        return default
+
+    def pop(self, key, *default):
+        if key in self:
+            value = self[key]
+            del self[key]
+            return value
+        if default:
+            return default[0]
+        raise KeyError(key)
+
+    def popitem(self):
+        (key, value) = super().popitem()
+        if self.marks:
+            self.trail.append((key, value))
+        return (key, value)
+
+    def clear(self):
+        for key in list(self):
+            del self[key]
+
+    def mark(self):
+        """Opens a scope and returns its level (to undo it)."""
+        self.marks.append(len(self.trail))
+        return len(self.marks) - 1
+
+    def undo(self, level):
+        """Closes the scope at the level (and all the scopes opened after),
+        reverting the updates made since then."""
+        position = self.marks[level]
+        while len(self.trail) > position:
+            (key, value) = self.trail.pop()
+            if value is _MISSING:
+                super().__delitem__(key)
+            else:
+                super().__setitem__(key, value)
+        del self.marks[level:]
+
+    def bound_since(self, level):
+        """The keys newly bound since the scope at the level was opened."""
+        return { key for (key, value) in self.trail[self.marks[level]:] if value is _MISSING }
+
+    def copy(self):
+        return ScopedEnv(self)
+
+
+class ScopedSet(set):
+    """A set with an undo trail (cf. ScopedEnv)."""
+    def __init__(self, *args):
+        super().__init__(*args)
+        # (element, was present) updates
+        self.trail = []
+        self.marks = []
+
+    def add(self, elem):
+        if self.marks:
+            self.trail.append((elem, elem in self))
+        super().add(elem)
+
+    def discard(self, elem):
+        if self.marks:
+            self.trail.append((elem, elem in self))
+        super().discard(elem)
+
+    def remove(self, elem):
+        if elem not in self:
+            raise KeyError(elem)
+        self.discard(elem)
+
+    # the updates (e.g. the dead variables of a scope) go through add and
+    # discard (or record their changes); the other ones, e.g. -=, are not
+    # recorded
+
+    def update(self, *others):
+        for other in others:
+            for elem in other:
+                self.add(elem)
+
+    def __ior__(self, other):
+        if not isinstance(other, (set, frozenset)):
+            return NotImplemented
+        self.update(other)
+        return self
+
+    def pop(self):
+        elem = super().pop()
+        if self.marks:
+            self.trail.append((elem, True))
+        return elem
+
+    def clear(self):
+        for elem in list(self):
+            self.discard(elem)
+
+    def mark(self):
+        self.marks.append(len(self.trail))
+        return len(self.marks) - 1
+
+    def undo(self, level):
+        position = self.marks[level]
+        while len(self.trail) > position:
+            (elem, present) = self.trail.pop()
+            if present:
+                super().add(elem)
+            else:
+                super().discard(elem)
+        del self.marks[level:]
+
+    def copy(self):
+        return ScopedSet(self)
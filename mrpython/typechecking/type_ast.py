@@ -1,14 +1,50 @@
-
-"""The abstract syntax tree of type expressions."""
-
-
-class TypeAST:
-    def __init__(self, annotation):
-        if annotation:
-            self.annotated=True
-            self.annotation=annotation
-        else:
-            self.annotated=False
+"""The abstract syntax tree of type expressions.
+
+The type nodes are hash-consed: structurally equal types are built only
+once, hence they are the same object.  As a consequence equality is
+identity, the hash is cached, and the types must never be modified.
+The (structural) properties is_hashable and fetch_unhashable are
+computed once, at construction, and the substitution, renaming and
+unaliasing of a type without type variables (resp. aliases) is O(1).
+"""
+
+import weakref
+
+# (class, arguments) -> type node
+# (weak: the types no longer used, e.g. instances of fresh type variables,
+# are released, so the table does not grow in long-lived processes)
+INTERNED_TYPES = weakref.WeakValueDictionary()
+
+class TypeFactory(type):
+    """The metaclass of type nodes, returning the existing node if it
+    has already been built with the same arguments."""
+    def __call__(cls, *args, **kwargs):
+        args = cls.intern_args(*args, **kwargs)
+        key = (cls, args)
+        type_ast = INTERNED_TYPES.get(key)
+        if type_ast is None:
+            type_ast = super().__call__(*args)
+            type_ast._args = args
+            type_ast._hash = hash(key)
+            INTERNED_TYPES[key] = type_ast
+        return type_ast
+
+class TypeAST(metaclass=TypeFactory):
+    __slots__ = ('_args', '_hash', '_hashable', '_unhashable', '_has_vars', '_has_aliases', '__weakref__')
+
+    @staticmethod
+    def intern_args():
+        return ()
+
+    def __init__(self, *sub_types):
+        self._has_vars = False
+        self._has_aliases = False
+        for sub_type in sub_types:
+            if sub_type is not None:
+                self._has_vars = self._has_vars or sub_type._has_vars
+                self._has_aliases = self._has_aliases or sub_type._has_aliases
+        self._hashable = self.compute_hashable()
+        self._unhashable = self.compute_unhashable()
 
     def rename_type_variables(self, rmap):
         raise NotImplementedError("Type variable renaming not implemented for this node type (please report)\n  ==> {}".format(self))
@@ -16,23 +52,40 @@ class TypeAST:
     def subst(self, type_env):
         raise NotImplementedError("Substitution not implemented for this node type (please report)\n  ==> {}".format(self))
 
-    def __eq__(self, other):
-        raise NotImplementedError("Equality not implemented for this node type (please report)\n  ==> {}".format(self))
+    def compute_hashable(self):
+        raise NotImplementedError("Method compute_hashable is abstract")
+
+    def compute_unhashable(self):
+        return None
 
     def is_hashable(self):
-        raise NotImplementedError("Method is_hashable is abstract")
+        return self._hashable
 
     def fetch_unhashable(self):
-        return None
+        return self._unhashable
+
+    def has_type_variables(self):
+        return self._has_vars
 
     def unalias(self, type_defs):
         raise NotImplementedError("Method unalias is abstract")
-    
+
+    # equality is identity (inherited from object)
+
+    def __hash__(self):
+        return self._hash
+
+    def __reduce__(self):
+        # copies (and unpickled types) are interned too
+        return (self.__class__, self._args)
+
 class Anything(TypeAST):
-    def __init__(self, annotation=None):
-        super().__init__(annotation)
+    __slots__ = ()
 
-    def is_hashable(self):
+    def __init__(self):
+        super().__init__()
+
+    def compute_hashable(self):
         return False
 
     def rename_type_variables(self, rmap):
@@ -43,9 +96,6 @@ class Anything(TypeAST):
 
     def unalias(self, type_defs):
         return (self, None)
-    
-    def __eq__(self, other):
-        return isinstance(other, Anything)
 
     def __str__(self):
         return "any"
@@ -54,11 +104,18 @@ class Anything(TypeAST):
         return "Anything()"
 
 class TypeAlias(TypeAST):
-    def __init__(self, alias_name, annotation=None):
-        super().__init__(annotation)
+    __slots__ = ('alias_name',)
+
+    @staticmethod
+    def intern_args(alias_name):
+        return (alias_name,)
+
+    def __init__(self, alias_name):
         self.alias_name = alias_name
+        super().__init__()
+        self._has_aliases = True
 
-    def is_hashable(self):
+    def compute_hashable(self):
         return True
 
     def rename_type_variables(self, rmap):
@@ -74,24 +131,22 @@ class TypeAlias(TypeAST):
         unaliased_type, unknown_alias = type_defs[self.alias_name].unalias(type_defs)
         if unaliased_type is None:
             return (None, unknown_alias)
-        unaliased_type.alias_name = self.alias_name
 
         return (unaliased_type, None)
-    
-    def __eq__(self, other):
-        return isinstance(other, BoolType)
 
     def __str__(self):
         return self.alias_name
 
     def __repr__(self):
         return "TypeAlias({})".format(self.alias_name)
-    
+
 class FileType(TypeAST):
-    def __init__(self, annotation=None):
-        super().__init__(annotation)
+    __slots__ = ()
 
-    def is_hashable(self):
+    def __init__(self):
+        super().__init__()
+
+    def compute_hashable(self):
         return True
 
     def rename_type_variables(self, rmap):
@@ -102,22 +157,20 @@ class FileType(TypeAST):
 
     def unalias(self, type_defs):
         return (self, None)
-    
-    def __eq__(self, other):
-        return isinstance(other, FileType)
 
     def __str__(self):
         return "FILE"
 
     def __repr__(self):
         return "FileType()"
-    
 
 class BoolType(TypeAST):
-    def __init__(self, annotation=None):
-        super().__init__(annotation)
+    __slots__ = ()
 
-    def is_hashable(self):
+    def __init__(self):
+        super().__init__()
+
+    def compute_hashable(self):
         return True
 
     def rename_type_variables(self, rmap):
@@ -128,9 +181,6 @@ class BoolType(TypeAST):
 
     def unalias(self, type_defs):
         return (self, None)
-    
-    def __eq__(self, other):
-        return isinstance(other, BoolType)
 
     def __str__(self):
         return "bool"
@@ -139,10 +189,12 @@ class BoolType(TypeAST):
         return "BoolType()"
 
 class IntType(TypeAST):
-    def __init__(self, annotation=None):
-        super().__init__(annotation)
+    __slots__ = ()
 
-    def is_hashable(self):
+    def __init__(self):
+        super().__init__()
+
+    def compute_hashable(self):
         return True
 
     def rename_type_variables(self, rmap):
@@ -154,9 +206,6 @@ class IntType(TypeAST):
     def unalias(self, type_defs):
         return (self, None)
 
-    def __eq__(self, other):
-        return isinstance(other, IntType)
-
     def __str__(self):
         return "int"
 
@@ -164,10 +213,12 @@ class IntType(TypeAST):
         return "IntType()"
 
 class FloatType(TypeAST):
-    def __init__(self, annotation=None):
-        super().__init__(annotation)
+    __slots__ = ()
 
-    def is_hashable(self):
+    def __init__(self):
+        super().__init__()
+
+    def compute_hashable(self):
         return True
 
     def rename_type_variables(self, rmap):
@@ -179,21 +230,19 @@ class FloatType(TypeAST):
     def unalias(self, type_defs):
         return (self, None)
 
-    def __eq__(self, other):
-        return isinstance(other, FloatType)
-
     def __str__(self):
         return "float"
 
     def __repr__(self):
         return "FloatType()"
 
-
 class NumberType(TypeAST):
-    def __init__(self, annotation=None):
-        super().__init__(annotation)
+    __slots__ = ()
 
-    def is_hashable(self):
+    def __init__(self):
+        super().__init__()
+
+    def compute_hashable(self):
         return True
 
     def rename_type_variables(self, rmap):
@@ -205,21 +254,19 @@ class NumberType(TypeAST):
     def unalias(self, type_defs):
         return (self, None)
 
-    def __eq__(self, other):
-        return isinstance(other, NumberType)
-
     def __str__(self):
         return "Number"
 
     def __repr__(self):
         return "NumberType()"
 
-
 class NoneTypeType(TypeAST):
-    def __init__(self, annotation=None):
-        super().__init__(annotation)
+    __slots__ = ()
 
-    def is_hashable(self):
+    def __init__(self):
+        super().__init__()
+
+    def compute_hashable(self):
         return True
 
     def rename_type_variables(self, rmap):
@@ -231,9 +278,6 @@ class NoneTypeType(TypeAST):
     def unalias(self, type_defs):
         return (self, None)
 
-    def __eq__(self, other):
-        return isinstance(other, NoneTypeType)
-
     def __str__(self):
         return "NoneType"
 
@@ -241,10 +285,12 @@ class NoneTypeType(TypeAST):
         return "NoneType()"
 
 class ImageType(TypeAST):
-    def __init__(self, annotation=None):
-        super().__init__(annotation)
+    __slots__ = ()
 
-    def is_hashable(self):
+    def __init__(self):
+        super().__init__()
+
+    def compute_hashable(self):
         return True
 
     def rename_type_variables(self, rmap):
@@ -256,23 +302,20 @@ class ImageType(TypeAST):
     def unalias(self, type_defs):
         return (self, None)
 
-    def __eq__(self, other):
-        return isinstance(other, ImageType)
-
     def __str__(self):
         return "Image"
 
     def __repr__(self):
         return "ImageType()"
 
-    
 class StrType(TypeAST):
-    def __init__(self, annotation=None):
-        super().__init__(annotation)
-        #self.elem_type = StrType() # how strange !
+    __slots__ = ()
 
-    def __eq__(self, other):
-        return isinstance(other, StrType)
+    def __init__(self):
+        super().__init__()
+
+    def compute_hashable(self):
+        return True
 
     def rename_type_variables(self, rmap):
         return self
@@ -280,9 +323,6 @@ class StrType(TypeAST):
     def subst(self, type_env):
         return self
 
-    def is_hashable(self):
-        return True
-
     def unalias(self, type_defs):
         return (self, None)
 
@@ -292,22 +332,25 @@ class StrType(TypeAST):
     def __repr__(self):
         return "StrType()"
 
-
 class TypeVariable(TypeAST):
-    def __init__(self, var_name, annotation=None):
-        super().__init__(annotation)
+    __slots__ = ('var_name',)
+
+    @staticmethod
+    def intern_args(var_name):
+        return (var_name,)
+
+    def __init__(self, var_name):
         if not isinstance(var_name, type("")):
             raise ValueError("Type variable name is not a string: {}".format(var_name))
         self.var_name = var_name
-
-    def __eq__(self, other):
-        return isinstance(other, TypeVariable) and other.var_name == self.var_name
+        super().__init__()
+        self._has_vars = True
 
     def rename_type_variables(self, rmap):
         if self.var_name in rmap:
             return rmap[self.var_name]
         else:
-            nvar = TypeVariable('_{}'.format(len(rmap)+1), self.annotation)
+            nvar = TypeVariable('_{}'.format(len(rmap)+1))
             rmap[self.var_name] = nvar
             return nvar
 
@@ -317,7 +360,7 @@ class TypeVariable(TypeAST):
         else:
             return self
 
-    def is_hashable(self):
+    def compute_hashable(self):
         return True
 
     def is_call_variable(self):
@@ -328,7 +371,7 @@ class TypeVariable(TypeAST):
 
     def unalias(self, type_defs):
         return (self, None)
-    
+
     def __str__(self):
         return '_' if self.var_name.startswith('_') else self.var_name
 
@@ -336,55 +379,62 @@ class TypeVariable(TypeAST):
         return 'TypeVariable({})'.format(self.var_name)
 
 class TupleType(TypeAST):
-    def __init__(self, elem_types, annotation=None):
-        super().__init__(annotation)
+    __slots__ = ('elem_types',)
+
+    @staticmethod
+    def intern_args(elem_types):
+        return (tuple(elem_types),)
+
+    def __init__(self, elem_types):
         if len(elem_types) == 0:
             raise ValueError("Empty tuple type not allowed in Python101")
         for elem_type in elem_types:
             if not isinstance(elem_type, TypeAST):
                 raise ValueError("Element type is not a TypeAST: {}".format(elem_type))
-        self.elem_types = elem_types
+        # (a tuple: the caller's list must not be shared by the interned type)
+        self.elem_types = tuple(elem_types)
+        super().__init__(*elem_types)
 
     def rename_type_variables(self, rmap):
-        nelem_types = []
-        for elem_type in self.elem_types:
-            nelem_types.append(elem_type.rename_type_variables(rmap))
-        return TupleType(nelem_types, self.annotation if self.annotated else None)
+        if not self._has_vars:
+            return self
+        return TupleType([elem_type.rename_type_variables(rmap) for elem_type in self.elem_types])
 
     def subst(self, type_env):
-        nelem_types = []
-        for elem_type in self.elem_types:
-            nelem_types.append(elem_type.subst(type_env))
-        return TupleType(nelem_types, self.annotation if self.annotated else None)
+        if not self._has_vars:
+            return self
+        return TupleType([elem_type.subst(type_env) for elem_type in self.elem_types])
 
-    def is_hashable(self):
+    def compute_hashable(self):
         for elem_type in self.elem_types:
             if not elem_type.is_hashable():
                 return False
         return True
 
-    def fetch_unhashable(self):
+    def compute_unhashable(self):
         for elem_type in self.elem_types:
             result = elem_type.fetch_unhashable()
             if result is not None:
                 return result
 
         return None
-    
+
     def size(self):
         return len(self.elem_types)
 
     def unalias(self, type_defs):
+        if not self._has_aliases:
+            return (self, None)
+
         nelem_types = []
         for elem_type in self.elem_types:
             uelem_type, unknown_alias = elem_type.unalias(type_defs)
             if uelem_type is None:
                 return (None, unknown_alias)
-            
+
             nelem_types.append(uelem_type)
-            
-        return (TupleType(nelem_types, self.annotation if self.annotated else None)
-                , None)
+
+        return (TupleType(nelem_types), None)
 
     def __str__(self):
         return "tuple[{}]".format(",".join((str(et) for et in self.elem_types)))
@@ -393,46 +443,46 @@ class TupleType(TypeAST):
         return "TupleType([{}])".format(",".join((repr(et) for et in self.elem_types)))
 
 class ListType(TypeAST):
-    def __init__(self, elem_type=None, annotation=None):
-        super().__init__(annotation)
+    __slots__ = ('elem_type',)
+
+    @staticmethod
+    def intern_args(elem_type=None):
+        return (elem_type,)
+
+    def __init__(self, elem_type=None):
         if elem_type is not None and not isinstance(elem_type, TypeAST):
             raise ValueError("Element type is not a TypeAST: {}".format(elem_type))
         self.elem_type = elem_type
+        super().__init__(elem_type)
 
     def rename_type_variables(self, rmap):
-        if self.elem_type is None:
+        if not self._has_vars:
             return self
-
-        nelem_type = self.elem_type.rename_type_variables(rmap)
-        return ListType(nelem_type, self.annotation)
+        return ListType(self.elem_type.rename_type_variables(rmap))
 
     def subst(self, type_env):
-        if self.elem_type is None:
+        if not self._has_vars:
             return self
-        return ListType(self.elem_type.subst(type_env), self.annotation if self.annotated else None)
+        return ListType(self.elem_type.subst(type_env))
 
     def unalias(self, type_defs):
+        if not self._has_aliases:
+            return (self, None)
+
         uelem_type, unknown_alias = self.elem_type.unalias(type_defs)
         if uelem_type is None:
-                return (None, unknown_alias)
-        return (ListType(uelem_type, self.annotation if self.annotated else None)
-                , None)
-
-    def __eq__(self, other):
-        return isinstance(other, ListType) and other.elem_type == self.elem_type
+            return (None, unknown_alias)
+        return (ListType(uelem_type), None)
 
-    def is_hashable(self):
+    def compute_hashable(self):
         return False
 
-    def fetch_unhashable(self):
+    def compute_unhashable(self):
         if self.elem_type is None:
             return None
-        result = self.elem_type.fetch_unhashable()
-        if result is not None:
-            return result
+        return self.elem_type.fetch_unhashable()
+
 
-        return None
-    
     def is_emptylist(self):
         return self.elem_type is None
 
@@ -446,37 +496,44 @@ class ListType(TypeAST):
         return "ListType({})".format(repr(self.elem_type)) if self.elem_type else "ListType()"
 
 class SetType(TypeAST):
-    def __init__(self, elem_type=None, annotation=None):
-        super().__init__(annotation)
+    __slots__ = ('elem_type',)
+
+    @staticmethod
+    def intern_args(elem_type=None):
+        return (elem_type,)
+
+    def __init__(self, elem_type=None):
         if elem_type is not None and not isinstance(elem_type, TypeAST):
             raise ValueError("Element type is not a TypeAST: {}".format(elem_type))
         self.elem_type = elem_type
-
-    def __eq__(self, other):
-        return isinstance(other, SetType) and other.elem_type == self.elem_type
+        super().__init__(elem_type)
 
     def rename_type_variables(self, rmap):
-        if self.elem_type is None:
+        if not self._has_vars:
             return self
-
-        nelem_type = self.elem_type.rename_type_variables(rmap)
-        return SetType(nelem_type, self.annotation)
+        return SetType(self.elem_type.rename_type_variables(rmap))
 
     def subst(self, type_env):
-        if self.elem_type is None:
+        if not self._has_vars:
             return self
-        return SetType(self.elem_type.subst(type_env), self.annotation if self.annotated else None)
+        return SetType(self.elem_type.subst(type_env))
 
-    def is_emptyset(self):
-        return self.elem_type is None
+    def unalias(self, type_defs):
+        if not self._has_aliases:
+            return (self, None)
 
-    def is_hashable(self):
+        uelem_type, unknown_alias = self.elem_type.unalias(type_defs)
+        if uelem_type is None:
+            return (None, unknown_alias)
+        return (SetType(uelem_type), None)
+
+    def compute_hashable(self):
         return False
 
-    def fetch_unhashable(self):
+    def compute_unhashable(self):
         if self.elem_type is None:
             return None  # has no unhashable
-        
+
         result = self.elem_type.fetch_unhashable()
         if result is not None:
             return result
@@ -485,13 +542,10 @@ class SetType(TypeAST):
             return self # found a non-hashable set
 
         return None
-    
-    def unalias(self, type_defs):
-        uelem_type, unknown_alias = self.elem_type.unalias(type_defs)
-        if uelem_type is None:
-                return (None, unknown_alias)
-        return (SetType(uelem_type, self.annotation if self.annotated else None)
-                , None)
+
+
+    def is_emptyset(self):
+        return self.elem_type is None
 
     def __str__(self):
         if self.elem_type:
@@ -501,10 +555,15 @@ class SetType(TypeAST):
 
     def __repr__(self):
         return "SetType({})".format(repr(self.elem_type))
-    
+
 class DictType(TypeAST):
-    def __init__(self, key_type=None, val_type=None, annotation=None):
-        super().__init__(annotation)
+    __slots__ = ('key_type', 'val_type')
+
+    @staticmethod
+    def intern_args(key_type=None, val_type=None):
+        return (key_type, val_type)
+
+    def __init__(self, key_type=None, val_type=None):
         if key_type is not None and not isinstance(key_type, TypeAST):
             raise ValueError("Key type is not a TypeAST: {}".format(key_type))
         self.key_type = key_type
@@ -513,30 +572,30 @@ class DictType(TypeAST):
         if val_type is not None and not isinstance(val_type, TypeAST):
             raise ValueError("Value type is not a TypeAST: {}".format(val_type))
         self.val_type = val_type
+        super().__init__(key_type, val_type)
 
     def rename_type_variables(self, rmap):
-        if self.key_type is None:
+        if not self._has_vars:
             return self
-        
+
         nkey_type = self.key_type.rename_type_variables(rmap)
         nval_type = self.val_type.rename_type_variables(rmap)
-        return DictType(nkey_type, nval_type, self.annotation)
+        return DictType(nkey_type, nval_type)
 
     def subst(self, type_env):
-        if self.key_type is None:
+        if not self._has_vars:
             return self
-        
+
         return DictType(self.key_type.subst(type_env)
-                        , self.val_type.subst(type_env)
-                        , self.annotation)
+                        , self.val_type.subst(type_env))
 
-    def is_hashable(self):
+    def compute_hashable(self):
         return False
-    
-    def fetch_unhashable(self):
+
+    def compute_unhashable(self):
         if self.key_type is None:
             return None # no unhashable in an empty dictionary
-        
+
         result = self.key_type.fetch_unhashable()
         if result is not None:
             return result
@@ -547,13 +606,13 @@ class DictType(TypeAST):
 
         if not self.key_type.is_hashable():
             return self # dictionary has unhashable keys
-        
-        return None        
+
+        return None
 
     def unalias(self, type_defs):
-        if self.key_type is None:
+        if not self._has_aliases:
             return (self, None)
-        
+
         ukey_type, unknown_alias = self.key_type.unalias(type_defs)
         if ukey_type is None:
             return (None, unknown_alias)
@@ -561,14 +620,7 @@ class DictType(TypeAST):
         if uval_type is None:
             return (None, unknown_alias)
 
-        return (DictType(ukey_type, uval_type
-                         , self.annotation if self.annotated else None)
-                , None)
-
-    
-    def __eq__(self, other):
-        return isinstance(other, DictType) and other.key_type == self.key_type \
-            and other.val_type == self.val_type
+        return (DictType(ukey_type, uval_type), None)
 
     def is_emptydict(self):
         return self.key_type is None and self.val_type is None
@@ -583,38 +635,43 @@ class DictType(TypeAST):
         return "DictType({},{})".format(repr(self.key_type), repr(self.val_type))
 
 class IterableType(TypeAST):
-    def __init__(self, elem_type, annotation=None):
-        super().__init__(annotation)
+    __slots__ = ('elem_type',)
+
+    @staticmethod
+    def intern_args(elem_type):
+        return (elem_type,)
+
+    def __init__(self, elem_type):
         if not isinstance(elem_type, TypeAST):
             raise ValueError("Element type is not a TypeAST: {}".format(elem_type))
         self.elem_type = elem_type
+        super().__init__(elem_type)
 
     def rename_type_variables(self, rmap):
-        nelem_type = self.elem_type.rename_type_variables(rmap)
-        return IterableType(nelem_type, self.annotation)
+        if not self._has_vars:
+            return self
+        return IterableType(self.elem_type.rename_type_variables(rmap))
 
     def subst(self, type_env):
-        return IterableType(self.elem_type.subst(type_env), self.annotation)
+        if not self._has_vars:
+            return self
+        return IterableType(self.elem_type.subst(type_env))
 
     def unalias(self, type_defs):
+        if not self._has_aliases:
+            return (self, None)
+
         uelem_type, unknown_alias = self.elem_type.unalias(type_defs)
         if uelem_type is None:
             return (None, unknown_alias)
-        return (IterableType(uelem_type, self.annotation if self.annotated else None)
-                , None)
+        return (IterableType(uelem_type), None)
 
-    def is_hashable(self):
+    def compute_hashable(self):
         return False
 
-    def fetch_unhashable(self):
-        result = self.elem_type.fetch_unhashable()
-        if result is not None:
-            return result
-
-        return None
+    def compute_unhashable(self):
+        return self.elem_type.fetch_unhashable()
 
-    def __eq__(self, other):
-        return isinstance(other, IterableType) and other.elem_type == self.elem_type
 
     def __str__(self):
         return "Iterable[{}]".format(str(self.elem_type))
@@ -623,40 +680,43 @@ class IterableType(TypeAST):
         return "IterableType({})".format(repr(self.elem_type))
 
 class SequenceType(TypeAST):
-    def __init__(self, elem_type, annotation=None):
-        super().__init__(annotation)
+    __slots__ = ('elem_type',)
+
+    @staticmethod
+    def intern_args(elem_type):
+        return (elem_type,)
+
+    def __init__(self, elem_type):
         if not isinstance(elem_type, TypeAST):
             raise ValueError("Element type is not a TypeAST: {}".format(elem_type))
         self.elem_type = elem_type
+        super().__init__(elem_type)
 
     def rename_type_variables(self, rmap):
-        nelem_type = self.elem_type.rename_type_variables(rmap)
-        return SequenceType(nelem_type, self.annotation)
+        if not self._has_vars:
+            return self
+        return SequenceType(self.elem_type.rename_type_variables(rmap))
 
     def subst(self, type_env):
-        return SequenceType(self.elem_type.subst(type_env), self.annotation if self.annotated else None)
-
-    def is_hashable(self):
-        return False
-
-    def fetch_unhashable(self):
-        result = self.elem_type.fetch_unhashable()
-        if result is not None:
-            return result
-
-        return None
+        if not self._has_vars:
+            return self
+        return SequenceType(self.elem_type.subst(type_env))
 
     def unalias(self, type_defs):
+        if not self._has_aliases:
+            return (self, None)
+
         uelem_type, unknown_alias = self.elem_type.unalias(type_defs)
         if uelem_type is None:
-                return (None, unknown_alias)
+            return (None, unknown_alias)
+        return (SequenceType(uelem_type), None)
+
+    def compute_hashable(self):
+        return False
 
-        return (SequenceType(uelem_type, self.annotation if self.annotated else None)
-                , None)
+    def compute_unhashable(self):
+        return self.elem_type.fetch_unhashable()
 
-    
-    def __eq__(self, other):
-        return isinstance(other, SequenceType) and other.elem_type == self.elem_type
 
     def __str__(self):
         return "Sequence[{}]".format(str(self.elem_type))
@@ -665,39 +725,43 @@ class SequenceType(TypeAST):
         return "SequenceType({})".format(repr(self.elem_type))
 
 class OptionType(TypeAST):
-    def __init__(self, elem_type, annotation=None):
-        super().__init__(annotation)
+    __slots__ = ('elem_type',)
+
+    @staticmethod
+    def intern_args(elem_type):
+        return (elem_type,)
+
+    def __init__(self, elem_type):
         if not isinstance(elem_type, TypeAST):
             raise ValueError("Element type is not a TypeAST: {}".format(elem_type))
         self.elem_type = elem_type
+        super().__init__(elem_type)
 
     def rename_type_variables(self, rmap):
-        nelem_type = self.elem_type.rename_type_variables(rmap)
-        return OptionType(nelem_type, self.annotation if self.annotated else None)
+        if not self._has_vars:
+            return self
+        return OptionType(self.elem_type.rename_type_variables(rmap))
 
     def subst(self, type_env):
-        return OptionType(self.elem_type.subst(type_env), self.annotation if self.annotated else None)
+        if not self._has_vars:
+            return self
+        return OptionType(self.elem_type.subst(type_env))
 
     def unalias(self, type_defs):
+        if not self._has_aliases:
+            return (self, None)
+
         uelem_type, unknown_alias = self.elem_type.unalias(type_defs)
         if uelem_type is None:
-                return (None, unknown_alias)
+            return (None, unknown_alias)
+        return (OptionType(uelem_type), None)
 
-        return (OptionType(uelem_type, self.annotation if self.annotated else None)
-                , None)
-    
-    def is_hashable(self):
+    def compute_hashable(self):
         return self.elem_type.is_hashable()
 
-    def fetch_unhashable(self):
-        result = self.elem_type.fetch_unhashable()
-        if result is not None:
-            return result
+    def compute_unhashable(self):
+        return self.elem_type.fetch_unhashable()
 
-        return None
-    
-    def __eq__(self, other):
-        return isinstance(other, OptionType) and other.elem_type == self.elem_type
 
     def __str__(self):
         return "{} + NoneType".format(str(self.elem_type))
@@ -706,13 +770,9 @@ class OptionType(TypeAST):
         return "OptionType({})".format(repr(self.elem_type))
 
 class FunctionType:
-    def __init__(self, param_types, ret_type, partial=False, annotation=None):
-        if annotation:
-            self.annotated=True
-            self.annotation=annotation
-        else:
-            self.annotated=False
+    __slots__ = ('param_types', 'ret_type', 'partial')
 
+    def __init__(self, param_types, ret_type, partial=False):
         for param_type in param_types:
             if not isinstance(param_type, TypeAST):
                 raise ValueError("Parameter type is not a TypeAST: {}".format(param_type))
@@ -733,7 +793,7 @@ class FunctionType:
         for param_type in self.param_types:
             nparam_types.append(param_type.rename_type_variables(rmap))
         nret_type = self.ret_type.rename_type_variables(rmap)
-        nfntype = FunctionType(nparam_types, self.ret_type, self.partial, self.annotation if self.annotated else None)
+        nfntype = FunctionType(nparam_types, self.ret_type, self.partial)
         nfntype.ret_type = nret_type
         return nfntype
 
@@ -764,11 +824,11 @@ class FunctionType:
         nret_type, unknown_alias = self.ret_type.unalias(type_defs)
         if nret_type is None:
             return (None, unknown_alias)
-        
-        nfntype = FunctionType(nparam_types, self.ret_type, self.partial, self.annotation if self.annotated else None)
+
+        nfntype = FunctionType(nparam_types, self.ret_type, self.partial)
         nfntype.ret_type = nret_type
         return (nfntype, None)
-    
+
     def __str__(self):
         return "{} -> {}".format(" * ".join((str(pt) for pt in self.param_types))
                                  , "{}{}".format(str(self.ret_type if not self.partial else self.ret_type.elem_type), " + NoneType" if self.partial else ""))
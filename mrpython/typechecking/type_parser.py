@@ -4,6 +4,7 @@
 import os.path, sys
 
 import re
+import functools
 
 pop_path = os.path.join(os.path.dirname(os.path.realpath(__file__)), os.pardir)
 #print("pop path=", pop_path)
@@ -13,6 +14,7 @@ sys.path.append(pop_path)
 from popparser import (Grammar, tokens, parsers, expr, ParseResult)
 from popparser.llparser import LLParsing
 from popparser.tokenizer import Tokenizer
+from popparser.frozen import frozen, sources_version
 
 try:
     from .type_ast import *
@@ -83,6 +85,109 @@ def type_tokenizer():
     
     return tokenizer
 
+# The transformations of the parse results are module-level functions
+# (and not closures) so that the grammars can be frozen (cf. TypeParser).
+
+def bool_xform_result(result):
+    result.content = BoolType()
+    return result
+
+
+def file_xform_result(result):
+    result.content = FileType()
+    return result
+
+
+def anything_xform_result(result):
+    result.content = Anything()
+    return result
+
+
+def int_xform_result(result):
+    result.content = IntType()
+    return result
+
+
+def float_xform_result(result):
+    result.content = FloatType()
+    return result
+
+
+def Number_xform_result(result):
+    result.content = NumberType()
+    return result
+
+
+def Image_xform_result(result):
+    result.content = ImageType()
+    return result
+
+
+def str_xform_result(result):
+    result.content = StrType()
+    return result
+
+
+def NoneType_xform_result(result):
+    result.content = NoneTypeType()
+    return result
+
+
+def typevar_xform_result(result):
+    result.content = TypeVariable(result.content.value)
+    return result
+
+
+def type_alias_xform_result(result):
+    result.content = TypeAlias(result.content.value)
+    return result
+
+
+def iterable_xform_result(result):
+    result.content = IterableType(result.content.content)
+    return result
+
+
+def sequence_xform_result(result):
+    result.content = SequenceType(result.content.content)
+    return result
+
+
+def list_xform_result(result):
+    result.content = ListType(result.content.content)
+    return result
+
+
+def set_xform_result(result):
+    elem_type = result.content.content
+    result.content = SetType(result.content.content)
+    return result
+
+
+def emptyset_xform_result(result):
+    result.content = SetType()
+    return result
+
+
+def dict_xform_result(result):
+    result.content = DictType(result.content[0].content, result.content[1].content)
+    return result
+
+
+def emptydict_xform_result(result):
+    result.content = DictType()
+    return result
+
+
+def tuple_xform_result(result):
+    elem_types = []
+    for elem_result in result.content.content:
+        elem_types.append(elem_result.content)
+
+    result.content = TupleType(elem_types)
+    return result
+
+
 def build_typeexpr_grammar(grammar=None):
     if grammar is None:
         grammar = Grammar()
@@ -102,81 +207,46 @@ def build_typeexpr_grammar(grammar=None):
     #               | <type-var> | <identifier>
 
     bool_parser = parsers.Token('bool_type')
-    def bool_xform_result(result):
-        result.content = BoolType(annotation=result)
-        return result
-
     bool_parser.xform_result = bool_xform_result
     grammar.register('bool_type', bool_parser)
 
     file_parser = parsers.Token('file_type')
-    def file_xform_result(result):
-        result.content = FileType(annotation=result)
-        return result
-
     file_parser.xform_result = file_xform_result
     grammar.register('file_type', file_parser)
 
     anything_parser = parsers.Token('Anything_type')
-    def anything_xform_result(result):
-        result.content = Anything(annotation=result)
-        return result
     anything_parser.xform_result = anything_xform_result
     grammar.register('Anything_type', anything_parser)
 
     int_parser = parsers.Token('int_type')
-    def int_xform_result(result):
-        result.content = IntType(annotation=result)
-        return result
     int_parser.xform_result = int_xform_result
     grammar.register('int_type', int_parser)
 
     float_parser = parsers.Token('float_type')
-    def float_xform_result(result):
-        result.content = FloatType(annotation=result)
-        return result
     float_parser.xform_result = float_xform_result
     grammar.register('float_type', float_parser)
 
     Number_parser = parsers.Token('Number_type')
-    def Number_xform_result(result):
-        result.content = NumberType(annotation=result)
-        return result
     Number_parser.xform_result = Number_xform_result
     grammar.register('Number_type', Number_parser)
 
     Image_parser = parsers.Token('Image_type')
-    def Image_xform_result(result):
-        result.content = ImageType(annotation=result)
-        return result
     Image_parser.xform_result = Image_xform_result
     grammar.register('Image_type', Image_parser)
 
     str_parser = parsers.Token('str_type')
-    def str_xform_result(result):
-        result.content = StrType(annotation=result)
-        return result
     str_parser.xform_result = str_xform_result
     grammar.register('str_type', str_parser)
 
     NoneType_parser = parsers.Token('NoneType_type')
-    def NoneType_xform_result(result):
-        result.content = NoneTypeType(annotation=result)
-        return result
     NoneType_parser.xform_result = NoneType_xform_result
     grammar.register('NoneType_type', NoneType_parser)
 
     typevar_parser = parsers.Token('type_var')
-    def typevar_xform_result(result):
-        result.content = TypeVariable(result.content.value, annotation=result)
-        return result
     typevar_parser.xform_result = typevar_xform_result
     grammar.register('type_var', typevar_parser)
 
     type_alias_parser = parsers.Token('identifier')
-    def type_alias_xform_result(result):
-        result.content = TypeAlias(result.content.value, annotation=result)
-        return result
     type_alias_parser.xform_result = type_alias_xform_result
     grammar.register('type_alias', type_alias_parser)
 
@@ -189,9 +259,6 @@ def build_typeexpr_grammar(grammar=None):
                       .forget(grammar.ref('spaces')) \
                       .skip(parsers.Token('close_bracket'))
 
-    def iterable_xform_result(result):
-        result.content = IterableType(result.content.content, annotation=result)
-        return result
     iterable_parser.xform_result = iterable_xform_result
     grammar.register('Iterable_type', iterable_parser)
 
@@ -204,9 +271,6 @@ def build_typeexpr_grammar(grammar=None):
                       .forget(grammar.ref('spaces')) \
                       .skip(parsers.Token('close_bracket'))
 
-    def sequence_xform_result(result):
-        result.content = SequenceType(result.content.content, annotation=result)
-        return result
     sequence_parser.xform_result = sequence_xform_result
     grammar.register('Sequence_type', sequence_parser)
 
@@ -219,9 +283,6 @@ def build_typeexpr_grammar(grammar=None):
                       .forget(grammar.ref('spaces')) \
                       .skip(parsers.Token('close_bracket'))
 
-    def list_xform_result(result):
-        result.content = ListType(result.content.content, annotation=result)
-        return result
     list_parser.xform_result = list_xform_result
     grammar.register('list_type', list_parser)
 
@@ -234,17 +295,10 @@ def build_typeexpr_grammar(grammar=None):
                       .forget(grammar.ref('spaces')) \
                       .skip(parsers.Token('close_bracket'))
 
-    def set_xform_result(result):
-        elem_type = result.content.content
-        result.content = SetType(result.content.content, annotation=result)
-        return result
     set_parser.xform_result = set_xform_result
     grammar.register('set_type', set_parser)
 
     emptyset_parser = parsers.Token("emptyset_type")
-    def emptyset_xform_result(result):
-        result.content = SetType()
-        return result
     emptyset_parser.xform_result = emptyset_xform_result
     grammar.register('emptyset_type', emptyset_parser)
 
@@ -261,16 +315,10 @@ def build_typeexpr_grammar(grammar=None):
                       .forget(grammar.ref('spaces')) \
                       .skip(parsers.Token('close_bracket'))
 
-    def dict_xform_result(result):
-        result.content = DictType(result.content[0].content, result.content[1].content, annotation=result)
-        return result
     dict_parser.xform_result = dict_xform_result
     grammar.register('dict_type', dict_parser)
     
     emptydict_parser = parsers.Token("emptydict_type")
-    def emptydict_xform_result(result):
-        result.content = DictType()
-        return result
     emptydict_parser.xform_result = emptydict_xform_result
     grammar.register('emptydict_type', emptydict_parser)
 
@@ -284,14 +332,6 @@ def build_typeexpr_grammar(grammar=None):
                         .forget(grammar.ref('spaces')) \
                         .skip(parsers.Token('close_bracket'))
                                  
-    def tuple_xform_result(result):
-        elem_types = []
-        for elem_result in result.content.content:
-            elem_types.append(elem_result.content)
-            
-        result.content = TupleType(elem_types, annotation=result)
-        return result
-    
     tuple_parser.xform_result = tuple_xform_result
     grammar.register('tuple_type', tuple_parser)
     
@@ -322,8 +362,20 @@ def build_typeexpr_grammar(grammar=None):
 
     grammar.entry = grammar.ref('typeexpr')
 
+    grammar.compile()
+
     return grammar
 
+def var_parser_xform_result(result):
+    base_type = result.content[0].content
+    if result.content[1].content is not None:
+        result.content = OptionType(base_type)
+    else:
+        result.content = base_type
+
+    return result
+
+
 def build_vartype_grammar(grammar):
     var_parser = parsers.Tuple() \
                           .element(grammar.ref('typeexpr')) \
@@ -333,24 +385,72 @@ def build_vartype_grammar(grammar):
                                                     .skip(grammar.ref('spaces')) \
                                                     .element(parsers.Token('NoneType_type'))))
 
-    def var_parser_xform_result(result):
-        base_type = result.content[0].content
-        if result.content[1].content is not None:
-            result.content = OptionType(base_type, annotation=result)
-        else:
-            result.content = base_type
-
-        return result
-
     var_parser.xform_result = var_parser_xform_result
 
     grammar.register('var_type', var_parser)
 
     grammar.entry = var_parser
 
+    grammar.compile()
+
     return grammar
     
 
+def dom_elem_xform_result(result):
+
+    type_result = result.content[0]
+    repeat_result = result.content[1]
+
+    if repeat_result.content is None:
+        result.content = type_result.content
+        return result
+    else:
+
+        nb_repeat = int(repeat_result.content[1].content.value)
+        new_content = [type_result.content for _ in range(nb_repeat)]
+        result.content = new_content
+        return result
+
+
+def domain_xform_result(result):
+    if result.content is None:
+        return result
+
+    domain_types = []
+    for elem in result.content:
+        if isinstance(elem.content, TypeAST):
+            domain_types.append(elem.content)
+        else:
+            domain_types.extend(elem.content)
+
+    result.content = domain_types
+    return result
+
+
+def functype_parser_xform_result(result):
+    #import pdb ; pdb.set_trace()
+    param_types = []
+    params_content = result.content[0]
+    if params_content.content:
+        for param_content in params_content.content:
+            param_types.append(param_content)
+
+    range_content = result.content[1].content
+    #print("range content=",range_content)
+    range_type = None
+    range_type = range_content[0].content
+    #print("range_type=",range_type)
+
+    if range_content[1].content is None:
+        partial_function = False
+    else:
+        partial_function = True
+
+    result.content = FunctionType(param_types, range_type, partial_function)
+
+    return result
+
+
 def build_functype_grammar(grammar):
     
     dom_elem_parser = parsers.Tuple() \
@@ -364,21 +464,6 @@ def build_functype_grammar(grammar):
                                                 .skip(grammar.ref('spaces')) \
                                                 .element(parsers.Token('natural'))))
 
-    def dom_elem_xform_result(result):
-
-        type_result = result.content[0]
-        repeat_result = result.content[1]
-
-        if repeat_result.content is None:
-            result.content = type_result.content
-            return result
-        else:
-
-            nb_repeat = int(repeat_result.content[1].content.value)
-            new_content = [type_result.content for _ in range(nb_repeat)]
-            result.content = new_content
-            return result
-        
     dom_elem_parser.xform_result = dom_elem_xform_result
     
     grammar.register('dom_elem', dom_elem_parser)
@@ -386,20 +471,6 @@ def build_functype_grammar(grammar):
     domain_parser = parsers.List(grammar.ref('dom_elem'), sep='mult') \
                            .forget(grammar.ref('spaces'))
 
-    def domain_xform_result(result):
-        if result.content is None:
-            return result
-        
-        domain_types = []
-        for elem in result.content:
-            if isinstance(elem.content, TypeAST):
-                domain_types.append(elem.content)
-            else:
-                domain_types.extend(elem.content)
-
-        result.content = domain_types
-        return result
-                
     domain_parser.xform_result = domain_xform_result
 
     grammar.register('domain_type', domain_parser)
@@ -422,71 +493,93 @@ def build_functype_grammar(grammar):
                       .skip(grammar.ref('spaces')) \
                       .element(grammar.ref('range_type'))
 
-    def functype_parser_xform_result(result):
-        #import pdb ; pdb.set_trace()
-        param_types = []
-        params_content = result.content[0]
-        if params_content.content:
-            for param_content in params_content.content:
-                param_types.append(param_content)
-
-        range_content = result.content[1].content
-        #print("range content=",range_content)
-        range_type = None
-        range_type = range_content[0].content
-        #print("range_type=",range_type)
-
-        if range_content[1].content is None:
-            partial_function = False
-        else:
-            partial_function = True
-
-        result.content = FunctionType(param_types, range_type, partial_function, annotation=result)
-
-        return result
-
     functype_parser.xform_result = functype_parser_xform_result
 
     grammar.entry = functype_parser
 
+    grammar.compile()
+
     return grammar
 
+def build_type_grammars():
+    """The (compiled) tokenizer and grammars of the type parser."""
+    tokenizer = type_tokenizer()
+    tokenizer.compile()
+    return (tokenizer
+            , build_typeexpr_grammar()
+            , build_vartype_grammar(build_typeexpr_grammar())
+            , build_functype_grammar(build_typeexpr_grammar()))
+
+# The grammars are frozen in a cache file named by their version, i.e. a
+# hash of this file and of the parser framework (the transformations are
+# frozen by name, whatever the name of this module).
+GRAMMAR_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.mrpython-config', 'grammar-cache')
+
+def grammar_cache_file(version):
+    return os.path.join(GRAMMAR_CACHE_DIR, "{}.pickle".format(version))
+
+def xform_functions():
+    return { name : value for (name, value) in globals().items() if name.endswith('_xform_result') }
+
 class TypeParser:
-    def __init__(self):
-        self.tokenizer = type_tokenizer()
-        self.typeexpr_grammar = build_typeexpr_grammar()
-        self.vartype_grammar = build_vartype_grammar(build_typeexpr_grammar())
-        self.functype_grammar = build_functype_grammar(build_typeexpr_grammar())
+    def __init__(self, cache_file=None):
+        version = sources_version(os.path.realpath(__file__))
+        if cache_file is None:
+            cache_file = grammar_cache_file(version)
+        grammars = frozen(cache_file, version, build_type_grammars, xform_functions())
+        (self.tokenizer, self.typeexpr_grammar, self.vartype_grammar, self.functype_grammar) = grammars
+
+    @property
+    def grammars(self):
+        return (self.typeexpr_grammar, self.vartype_grammar, self.functype_grammar)
 
     def parse_typeexpr_from_string(self, string):
-        parser = LLParsing(self.typeexpr_grammar)
+        parser = LLParsing(self.typeexpr_grammar, token_array=True)
         parser.tokenizer = self.tokenizer
         self.tokenizer.from_string(string)
         return parser.parse()
 
     def parse_vartype_from_string(self, string):
-        parser = LLParsing(self.vartype_grammar)
+        parser = LLParsing(self.vartype_grammar, token_array=True)
         parser.tokenizer = self.tokenizer
         self.tokenizer.from_string(string)
         return parser.parse()        
 
     def parse_functype_from_string(self, string):
-        parser = LLParsing(self.functype_grammar)
+        parser = LLParsing(self.functype_grammar, token_array=True)
         parser.tokenizer = self.tokenizer
         self.tokenizer.from_string(string)
         return parser.parse()
 
+# The parsing service below shares one parser (the grammars are built once)
+# and caches the parse results by string.  The results are shared
+# so they must not be modified.
+
+PARSE_CACHE_SIZE = 4096
+
+_SHARED_TYPE_PARSER = None
+
+def shared_type_parser():
+    global _SHARED_TYPE_PARSER
+    if _SHARED_TYPE_PARSER is None:
+        _SHARED_TYPE_PARSER = TypeParser()
+    return _SHARED_TYPE_PARSER
+
+@functools.lru_cache(maxsize=PARSE_CACHE_SIZE)
 def function_type_parser(string):
-    parser = TypeParser()
-    return parser.parse_functype_from_string(string)
+    return shared_type_parser().parse_functype_from_string(string)
 
+@functools.lru_cache(maxsize=PARSE_CACHE_SIZE)
 def type_expression_parser(string):
-    parser = TypeParser()
-    return parser.parse_typeexpr_from_string(string)
+    return shared_type_parser().parse_typeexpr_from_string(string)
 
+@functools.lru_cache(maxsize=PARSE_CACHE_SIZE)
 def var_type_parser(string):
-    parser = TypeParser()
-    return parser.parse_vartype_from_string(string)
+    return shared_type_parser().parse_vartype_from_string(string)
+
+def clear_parse_caches():
+    for parser_fun in (function_type_parser, type_expression_parser, var_type_parser):
+        parser_fun.cache_clear()
 
 TYPE_DEF_REGEXP = re.compile(r"\A#[ \t]*type[ \t]+([a-zA-Z][a-zA-Z_0-9]*)[ \t]*=[ \t]*(.*)$")
 
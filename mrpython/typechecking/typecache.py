@@ -0,0 +1,190 @@
+"""A persistent (on-disk) cache of type-checking results.
+
+The entries are content-addressed: the key is a hash of the program source,
+of the checker version (a hash of the checker and grammar sources, and of
+the Python version, whose ast the checker depends on) and of the language
+of the messages.  An entry stores the serialized list of
+diagnostics (cf. typechecker.type_errors_diagnostics).
+
+The cache is bounded in size, the least recently used entries being
+evicted first (the modification time of an entry is refreshed on each hit).
+"""
+
+import os.path
+import sys
+import glob
+import hashlib
+import json
+import tempfile
+
+from . import translate
+
+# bump this whenever the format of the entries changes
+CACHE_FORMAT_VERSION = 1
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.mrpython-config', 'typecheck-cache')
+DEFAULT_MAX_SIZE = 32 * 1024 * 1024
+
+# after an eviction the cache is shrunk down to this ratio of its max size
+EVICTION_RATIO = 0.8
+
+ENTRY_SUFFIX = '.json'
+
+_CHECKER_VERSION = None
+
+def checker_version():
+    """Returns a hash of the sources of the type-checker and of the parser
+    framework, so that editing the checker invalidates the cached results,
+    and of the Python version (the checked ast depends on it)."""
+    global _CHECKER_VERSION
+    if _CHECKER_VERSION is None:
+        checker_dir = os.path.dirname(os.path.realpath(__file__))
+        popparser_dir = os.path.join(checker_dir, os.pardir, 'popparser')
+        filenames = sorted(glob.glob(os.path.join(checker_dir, '*.py'))) \
+                    + sorted(glob.glob(os.path.join(popparser_dir, '**', '*.py'), recursive=True))
+        h = hashlib.sha256("{0}:{1}".format(CACHE_FORMAT_VERSION, sys.version_info[:2]).encode())
+        for filename in filenames:
+            h.update(os.path.basename(filename).encode())
+            with open(filename, 'rb') as f:
+                h.update(f.read())
+        _CHECKER_VERSION = h.hexdigest()
+    return _CHECKER_VERSION
+
+
+class TypeCheckCache:
+    def __init__(self, cache_dir=None, max_size=DEFAULT_MAX_SIZE):
+        self.cache_dir = cache_dir if cache_dir is not None else DEFAULT_CACHE_DIR
+        self.max_size = max_size
+        # total size of the entries, computed lazily
+        self.size = None
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, source, **options):
+        """The cache key for a program source.  Options (e.g. checking modes)
+        that change the result must be passed as keyword arguments."""
+        h = hashlib.sha256()
+        h.update(checker_version().encode())
+        h.update((translate.TRANSLATOR_LOCALE_KEY or 'fr').encode())
+        for (opt, val) in sorted(options.items()):
+            h.update("\0{}={!r}".format(opt, val).encode())
+        h.update(b"\0")
+        h.update(source.encode('utf-8', 'surrogatepass'))
+        return h.hexdigest()
+
+    def entry_path(self, key):
+        # two-level layout, to avoid huge directories
+        return os.path.join(self.cache_dir, key[:2], key + ENTRY_SUFFIX)
+
+    def get(self, source, **options):
+        """Returns the cached diagnostics for the source, or None."""
+        path = self.entry_path(self.key(source, **options))
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+            os.utime(path)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+
+        if entry.get('format') != CACHE_FORMAT_VERSION:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return entry['diagnostics']
+
+    def put(self, source, diagnostics, **options):
+        """Stores the diagnostics of the source.  Failing to write the cache
+        is not an error (the cache is only a cache)."""
+        path = self.entry_path(self.key(source, **options))
+        data = json.dumps({ 'format' : CACHE_FORMAT_VERSION
+                            , 'diagnostics' : diagnostics }, ensure_ascii=False).encode('utf-8')
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            try:
+                old_size = os.path.getsize(path)
+            except OSError:
+                old_size = 0
+            # write-then-rename so that concurrent readers never see partial entries
+            (fd, tmp_path) = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(data)
+                os.replace(tmp_path, path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+        except OSError:
+            return False
+
+        if self.size is None:
+            self.size = self.compute_size()
+        else:
+            self.size += len(data) - old_size
+
+        if self.size > self.max_size:
+            self.evict()
+
+        return True
+
+    def invalidate(self, source, **options):
+        """Removes the entry of the source (if any)."""
+        path = self.entry_path(self.key(source, **options))
+        try:
+            size = os.path.getsize(path)
+            os.unlink(path)
+        except OSError:
+            return False
+        if self.size is not None:
+            self.size -= size
+        return True
+
+    def clear(self):
+        """Removes all the entries."""
+        for (path, _, _) in self.entries():
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+        self.size = 0
+
+    def entries(self):
+        """Lists the entries as (path, size, last access time) triples."""
+        entries = []
+        for path in glob.glob(os.path.join(self.cache_dir, '*', '*' + ENTRY_SUFFIX)):
+            try:
+                st = os.stat(path)
+            except OSError: # removed concurrently
+                continue
+            entries.append((path, st.st_size, st.st_mtime))
+        return entries
+
+    def compute_size(self):
+        return sum(size for (_, size, _) in self.entries())
+
+    def evict(self):
+        """Removes the least recently used entries until the cache
+        is below its (eviction) size limit."""
+        entries = self.entries()
+        entries.sort(key=lambda entry: entry[2])
+        size = sum(size for (_, size, _) in entries)
+        target = self.max_size * EVICTION_RATIO
+        for (path, entry_size, _) in entries:
+            if size <= target:
+                break
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+            size -= entry_size
+        self.size = size
+
+
+_DEFAULT_CACHE = None
+
+def default_cache():
+    global _DEFAULT_CACHE
+    if _DEFAULT_CACHE is None:
+        _DEFAULT_CACHE = TypeCheckCache()
+    return _DEFAULT_CACHE
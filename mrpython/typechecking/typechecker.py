@@ -1,5 +1,6 @@
 import os.path, sys
 import ast
+import copy
 
 if __name__ == "__main__":
     main_path = os.path.join(os.path.dirname(os.path.realpath(__file__)), os.pardir)
@@ -14,23 +15,39 @@ if __name__ == "__main__":
     from prog_ast import *
     from type_ast import *
     from type_parser import (type_expression_parser, function_type_parser, var_type_parser, type_def_parser)
+    from scoped_env import ScopedEnv, ScopedSet
 
     from translate import tr
+
+    import builtin_table
+    from builtin_signatures import (BUILTIN_SIGNATURES, signatures_version, parse_signatures)
 else:
     from .prog_ast import *
     from .type_ast import *
     from .type_parser import (type_expression_parser, function_type_parser, var_type_parser, type_def_parser)
+    from .scoped_env import ScopedEnv, ScopedSet
 
     from .translate import tr
 
+    from . import builtin_table
+    from .builtin_signatures import (BUILTIN_SIGNATURES, signatures_version, parse_signatures)
+
 class TypeError:
     def is_fatal(self):
         raise NotImplementedError("is_fatal is an abstract method")
 
 
 class TypingContext:
-    def __init__(self, prog):
+    def __init__(self, prog, collect_all=False):
         self.prog = prog
+        # collect-all mode: do not stop at the first fatal error
+        self.collect_all = collect_all
+        # (collect-all mode) the type aliases and functions whose definition
+        # is erroneous, their uses are not reported as errors
+        self.poisoned_types = set()
+        self.poisoned_functions = set()
+        # (collect-all mode) the unsupported imports
+        self.poisoned_modules = set()
         self.type_errors = []
         self.type_defs = {}
         self.global_env = {}
@@ -40,17 +57,45 @@ class TypingContext:
         self.return_type = None
         self.function_def = None
         self.partial_function = None
-        self.dead_variables = set()
+        self.dead_variables = ScopedSet()
         self.parent_stack = None
-        self.local_env = None
         self.call_type_env = [] # stack of type environments when calling generic functions
-        self.local_env = {}  # will have global variables
+        self.local_env = ScopedEnv()  # will have global variables
+        self.function_scope = None
 
     def add_type_error(self, error):
         self.type_errors.append(error)
         if error.is_fatal():
             self.fatal_error = True
 
+    def must_stop(self):
+        return self.fatal_error and not self.collect_all
+
+    def is_poisoned_call(self, call):
+        """(collect-all mode) Is the called function erroneous, or (possibly)
+        from an unsupported import, e.g. `math.sqrt` after `import maths`?
+        The error is already reported."""
+        if call.full_fun_name in self.poisoned_functions:
+            return True
+        if not self.poisoned_modules or call.receiver is None or call.multi_receivers:
+            return False
+        module = call.full_fun_name.split('.')[0]
+        if module in self.prog.imports and module in REGISTERED_IMPORTS:
+            return False
+        # (not a method call on a variable)
+        return module not in self.local_env and not (self.param_env and module in self.param_env)
+
+    def poison_targets(self, instr):
+        """(collect-all mode) The variables initialized by a statement that
+        failed to type-check are bound without a type, so that their uses
+        fail silently instead of being reported as unknown variables."""
+        if not isinstance(instr, Assign):
+            return
+        for var in instr.target.variables():
+            if var.var_name != '_' and var.var_name not in self.local_env \
+               and not (self.param_env and var.var_name in self.param_env):
+                self.local_env[var.var_name] = (None, self.fetch_scope_mode())
+
     def register_import(self, import_map):
         for (fname, ftype) in import_map.items():
             self.global_env[fname] = ftype
@@ -73,28 +118,24 @@ class TypingContext:
         # for nested construction (while, for, if ...)
         self.parent_stack = []
         # remark: local (lexical) environment disallow shadowing
-        self.save_local_env = self.local_env.copy()
-        self.save_dead_variables = self.dead_variables.copy()
+        # (the environments are restored when leaving the function)
+        self.function_scope = (self.local_env.mark(), self.dead_variables.mark())
 
     def push_parent(self, parent_node):
-        parent_local_env = { var_name : var_info for (var_name, var_info) in self.local_env.items() }
         if not self.parent_stack:
             self.parent_stack = []
-        self.parent_stack.append((parent_node, parent_local_env))
+        self.parent_stack.append((parent_node, self.local_env.mark()))
 
     def pop_parent(self):
         if not self.parent_stack:
             raise ValueError("Cannot pop from empty parent stack (please report)")
 
         # all variables defined within the parent are now disallowed
-        _, parent_local_env = self.parent_stack.pop()
-        for var in self.local_env:
-            if var not in parent_local_env:
-                pass
-                # XXX: barendregt convention too strong ?
-                # self.dead_variables.add(var)
+        _, parent_scope = self.parent_stack.pop()
+        # XXX: barendregt convention too strong ?
+        # self.dead_variables.update(self.local_env.bound_since(parent_scope))
 
-        self.local_env = parent_local_env
+        self.local_env.undo(parent_scope)
 
     def fetch_nominal_type(self, base_type):
         # TODO : follow metavar instantiations
@@ -108,10 +149,10 @@ class TypingContext:
         self.partial_function = None
         self.parent_stack = None
         self.allow_declarations = None
-        self.local_env = self.save_local_env
-        self.save_local_env = None
-        self.dead_variables = self.save_dead_variables
-        self.save_dead_variables = None
+        (local_scope, dead_scope) = self.function_scope
+        self.local_env.undo(local_scope)
+        self.dead_variables.undo(dead_scope)
+        self.function_scope = None
 
     def fetch_scope_mode(self):
         # TODO : complete with parent stack
@@ -137,15 +178,47 @@ UnsupportedNode.type_check = type_check_UnsupportedNode
 
 # Takes a program, and returns a
 # (possibly empty) list of type errors
-def type_check_Program(prog):
+# (in collect-all mode, all the errors are reported)
+def type_check_Program(prog, collect_all=False):
+
+    ctx = TypingContext(prog, collect_all)
+
+    if not prepare_program_context(prog, ctx):
+        return ctx
+
+    # fourth step : type-check each function
+    for (fun_name, fun_def) in ctx.functions.items():
+        type_check_function(fun_def, ctx)
+        if ctx.must_stop():
+            return ctx
+
+    # fifth step: process each global variable definitions
+    # (should not be usable from functions so it comes after)
+    type_check_global_vars(prog, ctx)
+    if ctx.must_stop():
+        return ctx
+
+    # sixth step: type-check test assertions
+    for test_case in prog.test_cases:
+        test_case.type_check(ctx)
+        if ctx.must_stop():
+            return ctx
+
+    return ctx
+
+Program.type_check = type_check_Program
 
-    ctx = TypingContext(prog)
+# The first three steps of type-checking a program: the checks of the
+# top-level definitions, and the filling of the global environment
+# (type definitions, imports and function signatures).
+# Returns False if type-checking cannot go further.
+def prepare_program_context(prog, ctx):
 
     # we do not type check a program with unsupported top-level nodes
     for top_def in prog.other_top_defs:
         if isinstance(top_def.ast, ast.FunctionDef):
             ctx.add_type_error(WrongFunctionDefError(top_def))
-            return ctx
+            return False
         else:
             # HACK : (some) top-level commands are allowed (but not checked)
             # TODO : more proper type checking of top-level forms
@@ -159,27 +232,32 @@ def type_check_Program(prog):
                 pass # do nothing
             else:
                 ctx.add_type_error(UnsupportedTopLevelNodeError(top_def))
-                return ctx
+                return False
 
     # type checking begins here
 
     # first step : parse all type definitions
-    if prog.source_lines is None: # Hackish ...
-        prog.source_lines = prog.source.split('\n')
+    # (they are comments, so only the comment lines are considered)
+    if prog.comment_lines is None: # Hackish ...
+        prog.index_comments()
 
-    for i in range(len(prog.source_lines)):
-        source_line = prog.source_lines[i]
+    for (lineno, source_line) in sorted(prog.comment_lines.items()):
         type_name, parse_result = type_def_parser(source_line)
         if type_name is not None:
             if parse_result.iserror:
-                ctx.add_type_error(TypeDefParseError(i+1, type_name))
+                ctx.add_type_error(TypeDefParseError(lineno, type_name))
+                if ctx.collect_all:
+                    ctx.poisoned_types.add(type_name)
             elif type_name in ctx.type_defs:
-                ctx.add_type_error(DuplicateTypeDefError(i+1, type_name))
+                ctx.add_type_error(DuplicateTypeDefError(lineno, type_name))
             else:
                 type_def, unknown_alias = parse_result.content.unalias(ctx.type_defs)
                 if type_def is None:
-                    ctx.add_type_error(UnknownTypeAliasError(parse_result.content, unknown_alias, i+1, parse_result.start_pos.char_pos))
-                    return ctx
+                    if unknown_alias not in ctx.poisoned_types:
+                        ctx.add_type_error(UnknownTypeAliasError(parse_result.content, unknown_alias, lineno, parse_result.start_pos.char_pos))
+                    if not ctx.collect_all:
+                        return False
+                    ctx.poisoned_types.add(type_name)
                 else:
                     ctx.type_defs[type_name] = type_def
 
@@ -194,10 +272,12 @@ def type_check_Program(prog):
             ctx.register_import(REGISTERED_IMPORTS[import_name])
             # HACK : import the math.pi constant  (the only constant)
             if import_name == "math":
-                ctx.local_env['math.pi'] = (type_expression_parser('float').content, "global")
-                ctx.local_env['math.e'] = (type_expression_parser('float').content, "global")
+                ctx.local_env['math.pi'] = (FloatType(), "global")
+                ctx.local_env['math.e'] = (FloatType(), "global")
         else:
             ctx.add_type_error(UnsupportedImportError(import_name, prog.imports[import_name]))
+            if ctx.collect_all:
+                ctx.poisoned_modules.add(import_name)
 
     # third step : process each function to fill the global environment
     for (fun_name, fun_def) in prog.functions.items():
@@ -207,6 +287,8 @@ def type_check_Program(prog):
         #print(repr(signature))
         if signature.iserror:
             ctx.add_type_error(SignatureParseError(fun_name, fun_def, signature))
+            if ctx.collect_all:
+                ctx.poisoned_functions.add(fun_name)
         else: # HACK: trailing non-whistespace characters at the end of the signature
             #parsed = fun_def.docstring[0:signature.end_pos.offset:]
             #print("parsed = '{}'".format(parsed))
@@ -215,40 +297,49 @@ def type_check_Program(prog):
             if not fun_def.docstring[signature.end_pos.offset-1].isspace() and remaining and not remaining[0].isspace():
                 ctx.add_type_error(SignatureTrailingError(fun_name, fun_def, remaining))
                 # XXX: Not fatal ?
+                if ctx.collect_all:
+                    ctx.poisoned_functions.add(fun_name)
             else:
                 fun_type, unknown_alias = signature.content.unalias(ctx.type_defs)
                 if fun_type is None:
-                    # position is a little bit ad-hoc
-                    ctx.add_type_error(UnknownTypeAliasError(signature.content, unknown_alias, fun_def.ast.lineno+ 1, fun_def.ast.col_offset + 7))
-                    return ctx
+                    if unknown_alias not in ctx.poisoned_types:
+                        # position is a little bit ad-hoc
+                        ctx.add_type_error(UnknownTypeAliasError(signature.content, unknown_alias, fun_def.ast.lineno+ 1, fun_def.ast.col_offset + 7))
+                    if not ctx.collect_all:
+                        return False
+                    ctx.poisoned_functions.add(fun_name)
                 else:
                     ctx.register_function(fun_name, fun_type, fun_def)
+                    if ctx.collect_all and len(fun_def.parameters) != len(fun_type.param_types):
+                        # (the FunctionArityError is reported with the definition)
+                        ctx.poisoned_functions.add(fun_name)
 
-    # fourth step : type-check each function
-    for (fun_name, fun_def) in ctx.functions.items():
-        fun_def.type_check(ctx)
-        # Implicit NoneType return checking for functions goes here
-        fun_def.implicit_nonetype_return_check(ctx)
+    return True
 
-        if ctx.fatal_error:
-            return ctx
+def type_check_function(fun_def, ctx):
+    fun_def.type_check(ctx)
+    # Implicit NoneType return checking for functions goes here
+    fun_def.implicit_nonetype_return_check(ctx)
 
-    # fifth step: process each global variable definitions
-    # (should not be usable from functions so it comes after)
+def type_check_global_vars(prog, ctx):
     for global_var in prog.global_vars:
-        global_var.type_check(ctx, global_scope=True)
-        if ctx.fatal_error:
-            return ctx
-
-    # sixth step: type-check test assertions
-    for test_case in prog.test_cases:
-        test_case.type_check(ctx)
-        if ctx.fatal_error:
-            return ctx
-
-    return ctx
+        if not global_var.type_check(ctx, global_scope=True) and ctx.collect_all:
+            ctx.poison_targets(global_var)
+        if ctx.must_stop():
+            return
 
-Program.type_check = type_check_Program
+# Type-checks the statements of a (nested) block.  By default this stops
+# at the first statement that does not type-check, in collect-all mode
+# the remaining statements are checked (returns False if one failed).
+def type_check_body(body, ctx):
+    ok = True
+    for instr in body:
+        if not instr.type_check(ctx):
+            if not ctx.collect_all:
+                return False
+            ctx.poison_targets(instr)
+            ok = False
+    return ok
 
 def type_check_FunctionDef(func_def, ctx):
     signature = ctx.global_env[func_def.name]
@@ -278,14 +369,17 @@ def type_check_FunctionDef(func_def, ctx):
     for instr in func_def.body:
         if isinstance(instr, UnsupportedNode):
             ctx.add_type_error(UnsupportedNodeError(instr))
+            if ctx.collect_all:
+                continue
             # we abort the type-checking of this function
             ctx.nb_returns = 0
             ctx.unregister_function_def()
             return
 
         #print(repr(instr))
-        instr.type_check(ctx)
-        if ctx.fatal_error:
+        if not instr.type_check(ctx) and ctx.collect_all:
+            ctx.poison_targets(instr)
+        if ctx.must_stop():
             ctx.nb_returns = 0
             ctx.unregister_function_def()
             return
@@ -319,7 +413,22 @@ def parse_declaration_type(ctx, lineno):
     """parse a declared type: returns a pair (v, T) with v the declared
 variable name and T its type, or (None, msg, err_cat) with an informational message if the parsing fails."""
 
-    decl_line = ctx.prog.get_source_line(lineno).strip()
+    prog = ctx.prog
+    if prog.comment_lines is None:
+        prog.index_comments()
+
+    # the declarations are parsed once, and non-comment lines are not declarations
+    if lineno in prog.declarations:
+        return prog.declarations[lineno]
+    if 0 < lineno <= len(prog.source_lines) and lineno not in prog.comment_lines:
+        return (None, tr("Missing variable declaration"), 'header-char')
+
+    declaration = parse_declaration_line(prog.get_source_line(lineno))
+    prog.declarations[lineno] = declaration
+    return declaration
+
+def parse_declaration_line(decl_line):
+    decl_line = decl_line.strip()
 
     if (not decl_line) or decl_line[0] != '#':
         return (None, tr("Missing variable declaration"), 'header-char')
@@ -377,7 +486,8 @@ def fetch_assign_declaration_types(ctx, assign_target, strict=False):
             req_vars.remove(var_name)
             udecl_type, unknown_alias = decl_type.unalias(ctx.type_defs)
             if udecl_type is None:
-                ctx.add_type_error(UnknownTypeAliasError(decl_type, unknown_alias, lineno, assign_target.ast.col_offset))
+                if unknown_alias not in ctx.poisoned_types:
+                    ctx.add_type_error(UnknownTypeAliasError(decl_type, unknown_alias, lineno, assign_target.ast.col_offset))
                 return None
             else:
                 declared_types[var_name] = udecl_type
@@ -539,9 +649,13 @@ def type_check_For(for_node, ctx):
        or isinstance(iter_type, StrType) \
        or isinstance(iter_type, DictType):
 
-        if isinstance(iter_type, DictType):
-            # XXX: it's a hack but it is worth it ...
-            iter_type.elem_type = iter_type.key_type
+        # (the type must not be modified, it can be shared)
+        if isinstance(iter_type, StrType):
+            iter_elem_type = StrType()
+        elif isinstance(iter_type, DictType):
+            iter_elem_type = iter_type.key_type
+        else:
+            iter_elem_type = iter_type.elem_type
 
         ctx.push_parent(for_node)
 
@@ -556,7 +670,7 @@ def type_check_For(for_node, ctx):
                 return False
 
             # compare inferred type wrt. declared type
-            if not declared_types[var.var_name].type_compare(ctx, for_node.iter, iter_type.elem_type if not isinstance(iter_type, StrType) else StrType()):
+            if not declared_types[var.var_name].type_compare(ctx, for_node.iter, iter_elem_type):
                 ctx.pop_parent()
                 return False
 
@@ -565,7 +679,7 @@ def type_check_For(for_node, ctx):
 
         else:
             # here we have a destructured initialization
-            expr_type = iter_type.elem_type if not isinstance(iter_type, StrType) else StrType()
+            expr_type = iter_elem_type
 
             if not isinstance(expr_type, TupleType):
                 ctx.add_type_error(TypeExpectationError(ctx.function_def, for_node.iter, expr_type,
@@ -596,10 +710,9 @@ def type_check_For(for_node, ctx):
 
         # and now type check the body in the constructed local env
 
-        for instr in for_node.body:
-            if not instr.type_check(ctx):
-                ctx.pop_parent()
-                return False
+        if not type_check_body(for_node.body, ctx):
+            ctx.pop_parent()
+            return False
 
         ctx.pop_parent()
         return True
@@ -662,23 +775,22 @@ def type_check_If(ifnode, ctx):
         return False
 
     # 2. check type of body
-    for instr in ifnode.body:
-        if not instr.type_check(ctx):
-            ctx.pop_parent()
-            return False
+    ok = type_check_body(ifnode.body, ctx)
+    if not ok and not ctx.collect_all:
+        ctx.pop_parent()
+        return False
 
     # pop the parent and repush
     ctx.pop_parent()
     ctx.push_parent(ifnode)
 
     # 3. check type of orelse block
-    for instr in ifnode.orelse:
-        if not instr.type_check(ctx):
-            ctx.pop_parent()
-            return False
+    if not type_check_body(ifnode.orelse, ctx):
+        ctx.pop_parent()
+        return False
 
     ctx.pop_parent()
-    return True
+    return ok
 
 If.type_check = type_check_If
 
@@ -693,10 +805,9 @@ def type_check_While(wnode, ctx):
         return False
 
     # 2. check type of body
-    for instr in wnode.body:
-        if not instr.type_check(ctx):
-            ctx.pop_parent()
-            return False
+    if not type_check_body(wnode.body, ctx):
+        ctx.pop_parent()
+        return False
 
     # pop the parent and repush
     ctx.pop_parent()
@@ -778,10 +889,9 @@ def type_check_With(ewith, ctx):
     ctx.local_env[ewith.var_name] = (wtype, ctx.fetch_scope_mode())
 
     # 2. check type of body
-    for instr in ewith.body:
-        if not instr.type_check(ctx):
-            ctx.pop_parent()
-            return False
+    if not type_check_body(ewith.body, ctx):
+        ctx.pop_parent()
+        return False
 
     # pop the parent and repush
     ctx.pop_parent()
@@ -1140,6 +1250,7 @@ def type_infer_EVar(var, ctx):
     # or else lookup in the local environment
     if var.name in ctx.local_env:
         var_type, _ = ctx.local_env[var.name]
+        # (the type of a poisoned variable is None, its definition is already reported)
         return var_type
     # or the variable is unknown
     ctx.add_type_error(UnknownVariableError(ctx.function_def, var))
@@ -1199,7 +1310,10 @@ ENone.type_infer = type_infer_ENone
 
 def type_infer_ECall(call, ctx):
     # step 1 : fetch the signature of the called function
-    if call.full_fun_name in ctx.global_env:
+    if ctx.collect_all and ctx.is_poisoned_call(call):
+        # the erroneous definition (or import) is already reported
+        return None
+    elif call.full_fun_name in ctx.global_env:
         method_call = False
         signature = ctx.global_env[call.full_fun_name]
         arguments = call.arguments
@@ -1315,27 +1429,19 @@ ECompare.type_infer = type_infer_ECompare
 def type_check_Condition(cond, ctx, compare):
 
     if isinstance(cond, (CEq, CNotEq, CLt, CLtE, CGt, CGtE)):
-        left_right_ok = False
         left_type = cond.left.type_infer(ctx)
 
         if left_type is None:
             return False
 
-        # HACK : will see if a warning is raised
-        nb_errors = len(ctx.type_errors)
-
-        if type_expect(ctx, cond.right, left_type, raise_error=False) is not None:
-            left_right_ok = True
-
+        # (each side is inferred once: inferring again would report its errors twice)
         right_type = cond.right.type_infer(ctx)
         if right_type is None:
             return False
 
-        if left_right_ok:
+        if left_type.type_compare(ctx, cond.right, right_type, raise_error=False):
             return True
-        elif ((type_expect(ctx, cond.left, right_type, raise_error=False) is None)
-              #and (type_expect(ctx, cond.right, left_type, raise_error=False) is None)
-        ):
+        elif not right_type.type_compare(ctx, cond.left, left_type, raise_error=False):
             ctx.add_type_error(CompareConditionError(compare, cond, left_type, right_type))
             return False
 
@@ -2037,66 +2143,116 @@ def type_compare_DictType(expected_type, ctx, expr, expr_type, raise_error=True)
 
 DictType.type_compare = type_compare_DictType
 
+class _ComparisonRecorder:
+    """A stand-in typing context recording the errors of a comparison,
+    not yet attached to an expression (nor to a function)."""
+    def __init__(self):
+        self.function_def = None
+        self.call_type_env = []
+        self.type_errors = []
+
+    def add_type_error(self, error):
+        self.type_errors.append(error)
+
+# maximum number of memoized comparisons (the cache is emptied when full)
+TYPE_COMPARE_CACHE_SIZE = 8192
+
+class TypeCompareCache:
+    """Memoizes the comparisons of ground types (without type variables).
+
+    Since types are interned, a (expected type, expression type, raise_error)
+    triple identifies a comparison, whose result only depends on the types.
+    The cache stores the verdict together with the errors and warnings of
+    the comparison, which are replayed (on the actual expression) on a hit.
+    """
+    def __init__(self, max_size=TYPE_COMPARE_CACHE_SIZE):
+        self.max_size = max_size
+        # (expected_type, expr_type, raise_error) -> (verdict, list[TypeError])
+        self.comparisons = dict()
+        self.hits = 0
+        self.misses = 0
+
+    def compare(self, compare_fn, expected_type, ctx, expr, expr_type, raise_error):
+        if not isinstance(expr_type, TypeAST) \
+           or expected_type.has_type_variables() or expr_type.has_type_variables():
+            # the comparison may depend on (and bind) the type variables of a call
+            return compare_fn(expected_type, ctx, expr, expr_type, raise_error)
+
+        key = (expected_type, expr_type, raise_error)
+        entry = self.comparisons.get(key)
+        if entry is None:
+            self.misses += 1
+            recorder = _ComparisonRecorder()
+            verdict = compare_fn(expected_type, recorder, None, expr_type, raise_error)
+            entry = (verdict, recorder.type_errors)
+            if len(self.comparisons) >= self.max_size:
+                self.comparisons.clear()
+            self.comparisons[key] = entry
+        else:
+            self.hits += 1
+
+        (verdict, errors) = entry
+        for error in errors:
+            error = copy.copy(error)
+            error.expr = expr
+            if hasattr(error, 'in_function'):
+                error.in_function = ctx.function_def
+            ctx.add_type_error(error)
+        return verdict
+
+    def clear(self):
+        self.comparisons.clear()
+
+TYPE_COMPARE_CACHE = TypeCompareCache()
+
+def memoize_type_compare(type_class):
+    compare_fn = type_class.type_compare
+    def type_compare(expected_type, ctx, expr, expr_type, raise_error=True):
+        return TYPE_COMPARE_CACHE.compare(compare_fn, expected_type, ctx, expr, expr_type, raise_error)
+    type_class.type_compare = type_compare
+
+for type_class in (NumberType, IntType, FloatType, BoolType, FileType, ImageType, StrType
+                   , ListType, SetType, IterableType, SequenceType, NoneTypeType
+                   , OptionType, TupleType, DictType):
+    memoize_type_compare(type_class)
+
 ######################################
 # Standard imports                   #
 ######################################
 
-BUILTINS_IMPORTS = {
-    'len' : function_type_parser("Iterable[α] -> int").content
-    ,'abs' : function_type_parser("Number -> Number").content
-    ,'print' : function_type_parser("Ω -> NoneType").content
-    ,'min' : function_type_parser("Number * Number -> Number").content
-    ,'max' : function_type_parser("Number * Number -> Number").content
-    # ,'range' : function_type_parser("int * int -> Iterable[int]").content  # range is an expression now
-    , 'int' : function_type_parser("Ω -> int").content
-    , 'float' : function_type_parser("Ω -> float").content
-    , 'str' : function_type_parser("Ω -> str").content
-    , 'ord' : function_type_parser("str -> int").content
-    , 'chr' : function_type_parser("int -> str").content
-    , 'round' : function_type_parser("Number -> int").content
-    , '.append' : function_type_parser("list[α] * α -> NoneType").content
-    # images   ... TODO: the type system is not precise enough (for now)
-    , 'draw_line' : function_type_parser("float * float * float * float * Ω -> Image").content
-    , 'overlay' : function_type_parser("Image * Image * Ω -> Image").content
-    , 'underlay' : function_type_parser("Image * Image * Ω -> Image").content
-    , 'fill_triangle' : function_type_parser("float * float * float * float * float * float * Ω -> Image").content
-    , 'draw_triangle' : function_type_parser("float * float * float * float * float * float * Ω -> Image").content
-    , 'draw_ellipse' : function_type_parser("float * float * float * float * Ω -> Image").content
-    , 'fill_ellipse' : function_type_parser("float * float * float * float * Ω -> Image").content
-    , 'show_image' : function_type_parser("Image -> NoneType").content
-    # fichiers
-    , 'open' : function_type_parser("str * str -> FILE").content
-    , '.readlines' : function_type_parser("FILE -> list[str]").content
-    , '.read' : function_type_parser("FILE -> str").content
-    , '.write' : function_type_parser("FILE * str -> NoneType").content
-    # ensembles
-    , 'set' : function_type_parser(" -> emptyset").content
-    , '.add' : function_type_parser("set[α] * α -> NoneType").content
-    , '.remove' : function_type_parser("set[α] * α -> NoneType").content
-    # dictionnaires
-    , 'dict' : function_type_parser(" -> emptydict").content
-    , '.items' : function_type_parser(" dict[α:β] -> Iterable[tuple[α,β]]").content
-    , '.keys' : function_type_parser(" dict[α:β] -> Set[α]]").content
-    # iterables
-    , 'zip' : function_type_parser(" Iterable[α] * Iterable[β] -> Iterable[tuple[α,β]]").content
-}
-
-MATH_IMPORTS = {
-    'math.sqrt' : function_type_parser("Number -> float").content
-    , 'math.floor' : function_type_parser("Number -> int").content
-    , 'math.ceil' : function_type_parser("Number -> int").content
-}
-
-RANDOM_IMPORTS = {
-    'random.random' : function_type_parser("-> float").content
-    , 'random.seed' : function_type_parser("int -> NoneType").content
-}
-
-REGISTERED_IMPORTS = {
-    '' : BUILTINS_IMPORTS
-    , 'math' : MATH_IMPORTS
-    , 'random' : RANDOM_IMPORTS
-}
+class SignatureRegistry:
+    """The signatures of the builtins (module '') and of the supported
+    modules.  The signatures of a module are only materialized when a
+    program imports it (the builtins when the first program is checked)."""
+    def __init__(self):
+        self.loaders = dict()
+        self.signatures = dict()
+
+    def register(self, module_name, loader):
+        self.loaders[module_name] = loader
+        self.signatures.pop(module_name, None)
+
+    def __contains__(self, module_name):
+        return module_name in self.loaders
+
+    def __getitem__(self, module_name):
+        signatures = self.signatures.get(module_name)
+        if signatures is None:
+            signatures = self.loaders[module_name]()
+            self.signatures[module_name] = signatures
+        return signatures
+
+def _build_registered_imports():
+    registry = SignatureRegistry()
+    if builtin_table.TABLE_VERSION == signatures_version():
+        for (module_name, loader) in builtin_table.LOADERS.items():
+            registry.register(module_name, loader)
+    else: # outdated table: parse the signatures
+        for module_name in BUILTIN_SIGNATURES:
+            registry.register(module_name, lambda module_name=module_name: parse_signatures(module_name))
+    return registry
+
+REGISTERED_IMPORTS = _build_registered_imports()
 
 
 ## All the possible kinds of error follow
@@ -2805,18 +2961,69 @@ class ERangeArgumentError(TypeError):
         report.add_convention_error('error', tr("Range problem"), self.erange.ast.lineno, self.erange.ast.col_offset
                                     , tr("the arguments of `range` are incorrect."))
 
-def typecheck_from_ast(ast, filename=None, source=None):
+def typecheck_from_ast(ast, filename=None, source=None, collect_all=False):
     prog = Program()
     prog.build_from_ast(ast, filename, source)
-    ctx = prog.type_check()
+    ctx = prog.type_check(collect_all)
     return ctx
 
-def typecheck_from_file(filename):
+def typecheck_from_file(filename, collect_all=False):
     prog = Program()
     prog.build_from_file(filename)
-    ctx = prog.type_check()
+    ctx = prog.type_check(collect_all)
     return ctx
 
+class DiagnosticCollector:
+    """A minimal report sink recording what TypeError.report() emits,
+    used to turn type errors into plain (picklable) data."""
+    def __init__(self):
+        self.entries = []
+
+    def add_convention_error(self, severity, err_type, line=None, offset=None, details=""):
+        self.entries.append((severity, err_type, line, offset, details))
+
+def type_error_diagnostic(type_error):
+    """Returns the type error as a dictionary with keys fail_string, fatal,
+    reported, severity, type, line, column and details.
+    The checker crashes (e.g. in is_fatal) are not caught here."""
+    fatal = type_error.is_fatal()
+    # some errors cannot rebuild their location (e.g. missing ast),
+    # they are still reported (without location)
+    try:
+        fail_string = type_error.fail_string()
+    except Exception:
+        fail_string = type_error.__class__.__name__
+    diag = { 'fail_string' : fail_string
+             , 'fatal' : fatal
+             , 'reported' : True
+             , 'severity' : 'error' if fatal else 'warning'
+             , 'type' : type_error.__class__.__name__
+             , 'line' : None
+             , 'column' : None
+             , 'details' : "" }
+
+    collector = DiagnosticCollector()
+    try:
+        type_error.report(collector)
+    except Exception:
+        collector.entries = []
+    if collector.entries:
+        severity, err_type, line, offset, details = collector.entries[0]
+        diag.update(severity=severity, type=err_type, line=line, column=offset, details=details)
+    else:
+        diag.update(type=tr("Type error"), details=str(diag['fail_string']))
+
+    return diag
+
+def report_diagnostic(diag, report):
+    """Replays a diagnostic (see type_error_diagnostic) into a run report."""
+    if diag['reported']:
+        report.add_convention_error(diag['severity'], diag['type'], diag['line'], diag['column'], diag['details'])
+
+def type_errors_diagnostics(ctx):
+    """Returns the type errors of a checked context as a list of diagnostics."""
+    return [type_error_diagnostic(type_error) for type_error in ctx.type_errors]
+
 class IteratorTypeError(TypeError):
     def __init__(self, for_node, iter_type):
         self.for_node = for_node
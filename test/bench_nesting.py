@@ -0,0 +1,67 @@
+"""Benchmark: type-checking deeply nested generated programs.
+
+Each program has a function with many local variables and deeply nested
+if/while/for constructions, which stresses the handling of the (nested)
+environments: entering or leaving a construction should not depend on the
+number of variables.
+
+Usage: python3 bench_nesting.py [depth ...]   (Python limits the depth to 99)
+"""
+
+import os.path, sys
+import time
+import ast
+
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), os.pardir, "mrpython"))
+
+from typechecking.prog_ast import Program
+from typechecking.typechecker import TypingContext, prepare_program_context
+
+NB_LOCALS = 2000
+
+def generate_program(depth, nb_locals=NB_LOCALS):
+    lines = []
+    lines.append("def nested(n):")
+    lines.append('    """int -> int"""')
+    for i in range(nb_locals):
+        lines.append("    # v{} : int".format(i))
+        lines.append("    v{} = {}".format(i, i))
+    lines.append("    # r : int")
+    lines.append("    r = 0")
+    indent = "    "
+    for d in range(depth):
+        construct = d % 3
+        if construct == 0:
+            lines.append("{}if n > {}:".format(indent, d))
+        elif construct == 1:
+            lines.append("{}while r < {}:".format(indent, d))
+        else:
+            lines.append("{}# i{} : int".format(indent, d))
+            lines.append("{}for i{} in range({}):".format(indent, d, d))
+        indent += "    "
+        lines.append("{}r = r + v{}".format(indent, d % nb_locals))
+    lines.append("    return r")
+    lines.append("")
+    lines.append("assert nested(1) >= 0")
+    return "\n".join(lines) + "\n"
+
+def bench(depth):
+    source = generate_program(depth)
+    prog = Program()
+    prog.build_from_ast(ast.parse(source), "nested_{}.py".format(depth), source)
+    ctx = TypingContext(prog)
+    if not prepare_program_context(prog, ctx):
+        print("depth {:4d}: cannot check ({} type errors)".format(depth, len(ctx.type_errors)))
+        return
+    # only the type-checking of the function body is timed
+    # (the effect checker is not concerned by the environments)
+    start_time = time.perf_counter()
+    for fun_def in ctx.functions.values():
+        fun_def.type_check(ctx)
+    elapsed = time.perf_counter() - start_time
+    print("depth {:4d}: {:.3f}s ({} type errors)".format(depth, elapsed, len(ctx.type_errors)))
+
+if __name__ == "__main__":
+    depths = [int(arg) for arg in sys.argv[1:]] or [10, 20, 40, 80]
+    for depth in depths:
+        bench(depth)
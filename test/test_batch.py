@@ -0,0 +1,85 @@
+"""Tests of the batch type-checking (typechecking.batch).
+
+Usage: python3 test_batch.py
+"""
+
+import os.path, sys
+import json
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), os.pardir, "mrpython"))
+
+from typechecking import batch
+from typechecking.prog_ast import Program
+
+TESTPROG_PATH = os.path.join(os.path.dirname(os.path.realpath(__file__)), "progs")
+
+def prog_path(name):
+    return os.path.join(TESTPROG_PATH, name)
+
+def expected_error(filename):
+    with open(filename, 'r') as f:
+        return f.readline()[len("##!FAIL:"):].strip()
+
+class CrashingProgram(Program):
+    """ A program whose checking crashes (for the files named crash.py) """
+    def type_check(self, *args):
+        if os.path.basename(self.filename) == "crash.py":
+            raise RuntimeError("checker crash")
+        return super().type_check(*args)
+
+class BatchTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.crash_file = os.path.join(self.tmp_dir.name, "crash.py")
+        with open(self.crash_file, 'w') as f:
+            f.write("x = 1\n")
+        self.syntax_file = os.path.join(self.tmp_dir.name, "syntax.py")
+        with open(self.syntax_file, 'w') as f:
+            f.write("def f(:\n")
+        self.files = [ prog_path("01_aire_OK_00.py")
+                       , prog_path("01_aire_KO_01.py")
+                       , self.crash_file
+                       , self.syntax_file
+                       , prog_path("10_unsupported_KO.py") ]
+        # (the workers are forked: they check with the crashing program too)
+        patcher = mock.patch.object(batch, 'Program', CrashingProgram)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def check_results(self, results):
+        self.assertEqual([ result['file'] for result in results ], self.files)
+        statuses = [ result['status'] for result in results ]
+        self.assertEqual(statuses, ['ok', 'errors', 'crash', 'syntax-error', 'errors'])
+        self.assertIn("checker crash", results[2]['crash'])
+        for i in (1, 4):
+            self.assertEqual(results[i]['errors'][0]['fail_string'], expected_error(self.files[i]))
+
+    def test_check_files(self):
+        self.check_results(list(batch.check_files(self.files, jobs=1)))
+
+    def test_check_files_in_pool(self):
+        self.check_results(list(batch.check_files(self.files, jobs=2, ordered=True)))
+
+    def test_unordered(self):
+        results = batch.check_files(self.files, jobs=2)
+        self.assertEqual(sorted(result['file'] for result in results), sorted(self.files))
+
+    def test_json_output(self):
+        output = os.path.join(self.tmp_dir.name, "results.json")
+        with mock.patch('sys.stderr'):
+            status = batch.main(['--no-cache', '--ordered', '-j', '2', '-o', output] + self.files)
+        # (a crash makes the run fail)
+        self.assertEqual(status, 1)
+        with open(output, encoding='utf-8') as f:
+            results = [ json.loads(line) for line in f ]
+        self.check_results(results)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,63 @@
+"""Tests of the collect-all mode of the type-checker (all the type errors
+are reported, without cascades).
+
+Usage: python3 test_collect_all.py
+"""
+
+import os.path, sys
+import contextlib
+import glob
+import io
+import unittest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), os.pardir, "mrpython"))
+
+from typechecking.typechecker import typecheck_from_file, type_errors_diagnostics
+
+TESTPROG_PATH = os.path.join(os.path.dirname(os.path.realpath(__file__)), "progs")
+
+# (the checking of 16_noiter_KO.py does not terminate, in both modes)
+SKIPPED_PROGS = { "16_noiter_KO.py" }
+
+def check_all(filename, collect_all=True):
+    # the checker (sometimes) prints debugging informations
+    with contextlib.redirect_stdout(io.StringIO()):
+        ctx = typecheck_from_file(filename, collect_all=collect_all)
+        return type_errors_diagnostics(ctx)
+
+def fail_strings(filename, collect_all=True):
+    return [diag['fail_string'] for diag in check_all(filename, collect_all)]
+
+def prog_files():
+    return [filename for filename in sorted(glob.glob(os.path.join(TESTPROG_PATH, "*.py")))
+            if os.path.basename(filename) not in SKIPPED_PROGS]
+
+class CollectAllTest(unittest.TestCase):
+    def test_first_error(self):
+        # the first error is the one of the default mode
+        for filename in prog_files():
+            with self.subTest(prog=os.path.basename(filename)):
+                self.assertEqual(fail_strings(filename)[:1], fail_strings(filename, False)[:1])
+
+    def test_no_duplicates(self):
+        for filename in prog_files():
+            with self.subTest(prog=os.path.basename(filename)):
+                errors = [(diag['fail_string'], diag['line'], diag['column']) for diag in check_all(filename)]
+                self.assertEqual(len(errors), len(set(errors)))
+
+    def test_no_cascades(self):
+        for (prog, error) in (("01_aire_KO_01.py", "UnsupportedImportError[maths]@3:0")
+                              , ("01_aire_KO_04.py", "FunctionArityError[aire_triangle,3/2]@5:0")
+                              , ("11_string_KO.py", "SignatureTrailingError[f/ing]@6:0")):
+            with self.subTest(prog=prog):
+                self.assertEqual(fail_strings(os.path.join(TESTPROG_PATH, prog)), [error])
+
+    def test_all_errors(self):
+        # the errors of a function, and of a test
+        self.assertEqual(fail_strings(os.path.join(TESTPROG_PATH, "06_distance_KO_01.py"))
+                         , ["DeclarationError[var-name]@12:4"
+                            , "TypeComparisonError[tuple[Number,Number]/tuple[int,int,int]]@22:26"])
+
+
+if __name__ == "__main__":
+    unittest.main()
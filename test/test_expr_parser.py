@@ -0,0 +1,155 @@
+"""Tests of the expression parser (popparser.expr): the prefix and infix
+dispatch, the skipped tokens and the binding powers, on type expressions.
+
+Usage: python3 test_expr_parser.py
+"""
+
+import os.path, sys
+import unittest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), os.pardir, "mrpython"))
+
+from popparser import Grammar, ParseResult, parsers, tokens
+from popparser import expr
+from popparser.llparser import LLParsing
+from popparser.tokenizer import Tokenizer
+
+class TypeAtom(expr.Atom):
+    def on_atom(self, token):
+        return ParseResult(token.value, token.start_pos, token.end_pos)
+
+class TypeOperator(expr.Infix):
+    def on_infix(self, left, token, right):
+        return ParseResult((token.value, left.content, right.content), left.start_pos, right.end_pos)
+
+class TypeModifier(expr.Prefix):
+    def on_prefix(self, token, argument):
+        return ParseResult((token.value, argument.content), token.start_pos, argument.end_pos)
+
+class TypeUnion(expr.Mixfix):
+    def on_prefix(self, token, argument):
+        return ParseResult((token.value, argument.content), token.start_pos, argument.end_pos)
+
+    def on_infix(self, left, token, right):
+        return ParseResult((token.value, left.content, right.content), left.start_pos, right.end_pos)
+
+class TypeIndex(expr.Infix):
+    """ An infix expression that parses its operand itself: t[u] """
+    def parse_infix(self, pop_parser, left, token):
+        index = pop_parser.pop_parse(rbp=0)
+        if index.iserror:
+            return index
+        err = pop_parser.consume_token('close_bracket')
+        if err is not None:
+            return err
+        return ParseResult(('[]', left.content, index.content), left.start_pos, index.end_pos)
+
+def type_tokenizer():
+    tokenizer = Tokenizer()
+    tokenizer.add_rule(tokens.Literal('arrow', '->'))
+    tokenizer.add_rule(tokens.Char('star', '*'))
+    tokenizer.add_rule(tokens.Char('union', '|'))
+    tokenizer.add_rule(tokens.Char('optional', '?'))
+    tokenizer.add_rule(tokens.Char('open_paren', '('))
+    tokenizer.add_rule(tokens.Char('close_paren', ')'))
+    tokenizer.add_rule(tokens.Char('open_bracket', '['))
+    tokenizer.add_rule(tokens.Char('close_bracket', ']'))
+    tokenizer.add_rule(tokens.CharSet('space', ' ', '\t'))
+    tokenizer.add_rule(tokens.Regexp('identifier', "[a-zA-Z_][a-zA-Z_0-9]*"))
+    return tokenizer
+
+def type_grammar():
+    type_expr = expr.ExprParser()
+    type_expr.register('identifier', TypeAtom())
+    type_expr.register('open_paren', expr.Bracket('open_paren', 'close_paren'))
+    type_expr.register('optional', TypeModifier(30))
+    type_expr.register('union', TypeUnion(30, 'LEFT', 15))
+    type_expr.register('star', TypeOperator('LEFT', 20))
+    type_expr.register('arrow', TypeOperator('RIGHT', 10))
+    type_expr.register('open_bracket', TypeIndex('LEFT', 40))
+    type_expr.skip_token('space')
+
+    grammar = Grammar()
+    grammar.register('type_expr', type_expr)
+    grammar.entry = parsers.Tuple().element(type_expr).element(parsers.EOF())
+    grammar.entry.xform_content = lambda result: result.content[0].content
+    grammar.compile()
+    return grammar
+
+class ExprParserTest(unittest.TestCase):
+    def setUp(self):
+        self.grammar = type_grammar()
+
+    def parse(self, string, **modes):
+        tokenizer = type_tokenizer()
+        tokenizer.from_string(string)
+        parser = LLParsing(self.grammar, **modes)
+        parser.tokenizer = tokenizer
+        return parser.parse()
+
+    def check_parse(self, string, expected):
+        for modes in ({}, { 'token_array' : True }, { 'packrat' : True }):
+            with self.subTest(string=string, modes=modes):
+                result = self.parse(string, **modes)
+                self.assertFalse(result.iserror, str(result))
+                self.assertEqual(result.content, expected)
+
+    def check_error(self, string, message):
+        result = self.parse(string)
+        self.assertTrue(result.iserror)
+        self.assertIn(message, str(result))
+
+    def test_atoms(self):
+        self.check_parse("int", 'int')
+        self.check_parse("(int)", 'int')
+
+    def test_prefix_dispatch(self):
+        self.check_parse("? int", ('?', 'int'))
+        # (the same token in prefix and in infix position)
+        self.check_parse("| int | bool", ('|', ('|', 'int'), 'bool'))
+
+    def test_infix_dispatch(self):
+        self.check_parse("int * bool", ('*', 'int', 'bool'))
+        self.check_parse("list[int] * bool", ('*', ('[]', 'list', 'int'), 'bool'))
+        self.check_parse("dict[str[int]]", ('[]', 'dict', ('[]', 'str', 'int')))
+
+    def test_skip_mask(self):
+        self.check_parse("  int\t*   bool  ->int", ('->', ('*', 'int', 'bool'), 'int'))
+        self.check_parse("int*bool", ('*', 'int', 'bool'))
+
+    def test_left_associative_chain(self):
+        self.check_parse("int * int * int -> bool"
+                         , ('->', ('*', ('*', 'int', 'int'), 'int'), 'bool'))
+        chain = " * ".join("t{}".format(i) for i in range(2000))
+        content = self.parse(chain, token_array=True).content
+        for i in reversed(range(1, 2000)):
+            self.assertEqual(content[:1] + content[2:], ('*', "t{}".format(i)))
+            content = content[1]
+        self.assertEqual(content, 't0')
+
+    def test_right_associative_chain(self):
+        self.check_parse("int -> int -> bool", ('->', 'int', ('->', 'int', 'bool')))
+
+    def test_precedence(self):
+        self.check_parse("int -> int * bool | str", ('->', 'int', ('|', ('*', 'int', 'bool'), 'str')))
+        self.check_parse("(int -> int) * bool", ('*', ('->', 'int', 'int'), 'bool'))
+        # a prefix operator binds more than the first infix operator
+        # (this was parsed as ? (int * bool))
+        self.check_parse("? int * bool", ('*', ('?', 'int'), 'bool'))
+        self.check_parse("| int * bool", ('*', ('|', 'int'), 'bool'))
+
+    def test_errors(self):
+        self.check_error("* int", "No left operand")
+        self.check_error("int * ]", "Unexpected token type: close_bracket")
+        self.check_error("int *", "Unexpected end of file")
+        self.check_error("int[bool", "Expecting 'close_bracket'")
+
+    def test_recompiled_after_registration(self):
+        type_expr = self.grammar.fetch('type_expr')
+        self.check_parse("int * bool", ('*', 'int', 'bool'))
+        type_expr.register('star', TypeOperator('RIGHT', 20))
+        self.check_parse("int * int * bool", ('*', 'int', ('*', 'int', 'bool')))
+
+
+if __name__ == "__main__":
+    unittest.main()
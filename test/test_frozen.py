@@ -0,0 +1,75 @@
+"""Tests of the frozen grammars (popparser.frozen) of the type parser.
+
+Usage: python3 test_frozen.py
+"""
+
+import os.path, sys
+import io
+import os
+import pickle
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), os.pardir, "mrpython"))
+
+from popparser import frozen
+from typechecking import type_parser
+from typechecking.type_parser import TypeParser
+
+class FrozenGrammarsTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.cache_dir = os.path.join(self.tmp_dir.name, "grammar-cache")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def cache_files(self):
+        return os.listdir(self.cache_dir)
+
+    def check_parser(self, parser):
+        self.assertEqual(str(parser.parse_functype_from_string("int * int * int -> bool").content)
+                         , "int * int * int -> bool")
+
+    def test_cache_file(self):
+        # (the cache directory is the one at the creation of the parser)
+        with mock.patch.object(type_parser, 'GRAMMAR_CACHE_DIR', self.cache_dir):
+            self.check_parser(TypeParser())
+            self.check_parser(TypeParser())
+        version = frozen.sources_version(os.path.realpath(type_parser.__file__))
+        self.assertEqual(self.cache_files(), [version + ".pickle"])
+
+    def test_functions_by_name(self):
+        # the frozen grammars do not refer to the module of the type parser
+        cache_file = os.path.join(self.cache_dir, "grammars.pickle")
+        TypeParser(cache_file)
+        with open(cache_file, 'rb') as f:
+            data = f.read()
+        self.assertNotIn(b"typechecking", data)
+        with mock.patch.object(frozen, 'save_frozen') as save_frozen:
+            self.check_parser(TypeParser(cache_file))
+        self.assertFalse(save_frozen.called)
+
+    @unittest.skipUnless(hasattr(os, 'getuid'), "POSIX only")
+    def test_untrusted_file(self):
+        cache_file = os.path.join(self.cache_dir, "grammars.pickle")
+        TypeParser(cache_file)
+        os.chmod(cache_file, 0o666)
+        version = frozen.sources_version(os.path.realpath(type_parser.__file__))
+        self.assertIsNone(frozen.load_frozen(cache_file, version, type_parser.xform_functions()))
+        # (the grammars are built again, and the file rewritten)
+        self.check_parser(TypeParser(cache_file))
+        self.assertEqual(os.stat(cache_file).st_mode & 0o077, 0)
+
+    def test_forbidden_global(self):
+        cache_file = os.path.join(self.tmp_dir.name, "evil.pickle")
+        with open(cache_file, 'wb') as f:
+            pickle.dump(("v", os.system), f)
+        self.assertIsNone(frozen.load_frozen(cache_file, "v"))
+        with self.assertRaises(pickle.UnpicklingError):
+            frozen.FrozenUnpickler(io.BytesIO(pickle.dumps(os.system)), {}).load()
+
+
+if __name__ == "__main__":
+    unittest.main()
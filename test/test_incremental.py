@@ -0,0 +1,71 @@
+"""Tests of the incremental type-checking (typechecking.incremental).
+
+Usage: python3 test_incremental.py
+"""
+
+import os.path, sys
+import ast
+import unittest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), os.pardir, "mrpython"))
+
+from typechecking.incremental import IncrementalTypeChecker, source_segments
+from typechecking.prog_ast import Program
+
+PROGRAM = '''
+def double(n):
+    """int -> int"""
+    return 2 * n
+
+def triple(n):
+    """int -> int"""
+    return {}
+
+assert double(2) == 4
+assert triple(2) == 6
+'''
+
+def fail_strings(ctx):
+    return [error.fail_string() for error in ctx.type_errors]
+
+class IncrementalTypeCheckerTest(unittest.TestCase):
+    def check(self, checker, source):
+        return checker.typecheck_from_ast(ast.parse(source), "prog.py", source)
+
+    def test_only_changed_functions(self):
+        checker = IncrementalTypeChecker()
+        self.check(checker, PROGRAM.format("3 * n"))
+        # the two functions, the global variables and the two tests
+        self.assertEqual((checker.nb_checked, checker.nb_reused), (5, 0))
+
+        # only triple is changed (with a type error)
+        source = PROGRAM.format("3 * n * 'x'")
+        ctx = self.check(checker, source)
+        self.assertEqual((checker.nb_checked, checker.nb_reused), (6, 4))
+        self.assertEqual(fail_strings(ctx), fail_strings(self.check(IncrementalTypeChecker(), source)))
+        self.assertTrue(ctx.type_errors)
+
+        # back to the correct version, nothing else changed
+        ctx = self.check(checker, PROGRAM.format("3 * n"))
+        self.assertEqual((checker.nb_checked, checker.nb_reused), (7, 8))
+        self.assertEqual(ctx.type_errors, [])
+
+    def test_signature_changed(self):
+        checker = IncrementalTypeChecker()
+        self.check(checker, PROGRAM.format("3 * n"))
+        # double and its test (which depends on its signature) are checked again
+        self.check(checker, PROGRAM.format("3 * n").replace('"""int -> int"""', '"""int -> float"""', 1))
+        self.assertEqual((checker.nb_checked, checker.nb_reused), (7, 3))
+
+    def test_multiline_segment(self):
+        source = "x = max(1,\n        2\n       )\n\ny = 3\n"
+        prog = Program()
+        prog.build_from_ast(ast.parse(source), "prog.py", source)
+        segments = source_segments(prog)
+        # (the closing parenthesis is part of the first statement)
+        self.assertEqual(segments[id(prog.ast.body[0])], (1, "x = max(1,\n        2\n       )"))
+        self.assertEqual(segments[id(prog.ast.body[1])], (4, "\ny = 3"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,213 @@
+"""Tests of the protocol between the IDE and the interpreter processes
+(PyInterpreter): the pool of interpreters, the streamed output with its
+acknowledgement window, and the commands received during a run.
+Everything runs without display (the tk roots are replaced by HeadlessRoot).
+
+Usage: python3 test_interpreter_protocol.py
+"""
+
+import os.path, sys
+import multiprocessing as mp
+import tempfile
+import threading
+import time
+import unittest
+from collections import deque
+
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), os.pardir, "mrpython"))
+
+from typechecking import typecache
+from typechecking.incremental import default_checker
+from PyInterpreter import (InterpreterPool, InterpreterProxy, StreamedOutput, WarmInterpreter
+                           , serve_commands, OUTPUT_CHUNK_SIZE, OUTPUT_WINDOW)
+
+class HeadlessRoot:
+    """ A tk root without display: its timers run when it is pumped """
+    def __init__(self):
+        # (no file handlers: the pipes are polled)
+        self.tk = None
+        self.timers = {}
+        self.nb_timers = 0
+
+    def after(self, delay, callback):
+        self.nb_timers += 1
+        self.timers[self.nb_timers] = (time.perf_counter() + delay / 1000, callback)
+        return self.nb_timers
+
+    def after_idle(self, callback):
+        return self.after(0, callback)
+
+    def after_cancel(self, timer):
+        self.timers.pop(timer, None)
+
+    def pump(self, done, timeout=10):
+        """ Runs the timers until done() """
+        deadline = time.perf_counter() + timeout
+        while not done():
+            if time.perf_counter() > deadline:
+                raise AssertionError("timeout")
+            now = time.perf_counter()
+            for (timer, (when, callback)) in sorted(self.timers.items()):
+                if when <= now and self.timers.pop(timer, None) is not None:
+                    callback()
+            time.sleep(0.005)
+
+    # the interpreter side
+    def update(self):
+        pass
+
+    def nametowidget(self, name):
+        return self
+
+    def destroy(self):
+        pass
+
+def headless_process(comm):
+    serve_commands(comm, HeadlessRoot(), time.perf_counter())
+
+class HeadlessPool(InterpreterPool):
+    def spawn(self):
+        self.nb_spawned += 1
+        return WarmInterpreter(self.ready_times, target=headless_process)
+
+
+class StreamedOutputTest(unittest.TestCase):
+    def setUp(self):
+        (self.ide, self.interp) = mp.Pipe()
+        self.deferred = deque()
+        self.output = StreamedOutput(self.interp, self.deferred)
+
+    def tearDown(self):
+        self.ide.close()
+        self.interp.close()
+
+    def receive_output(self):
+        self.assertTrue(self.ide.poll(5))
+        (kind, text) = self.ide.recv()
+        self.assertEqual(kind, 'output')
+        return text
+
+    def test_window(self):
+        chunk = "x" * OUTPUT_CHUNK_SIZE
+        writer = threading.Thread(target=lambda: [self.output.write(chunk) for i in range(OUTPUT_WINDOW + 2)])
+        writer.start()
+        received = [self.receive_output() for i in range(OUTPUT_WINDOW)]
+        # the window is full: the next chunk waits, and the writer with it
+        self.assertFalse(self.ide.poll(0.2))
+        self.assertTrue(writer.is_alive())
+        for i in range(2):
+            self.ide.send('ack')
+            received.append(self.receive_output())
+        writer.join(5)
+        self.assertFalse(writer.is_alive())
+        self.output.stop()
+        self.assertEqual("".join(received), chunk * (OUTPUT_WINDOW + 2))
+        self.assertEqual(self.output.getvalue(), chunk * (OUTPUT_WINDOW + 2))
+
+    def test_deferred_commands(self):
+        chunk = "x" * OUTPUT_CHUNK_SIZE
+        for i in range(OUTPUT_WINDOW):
+            self.output.write(chunk)
+            self.receive_output()
+        self.output.write("end")
+        # commands sent while the interpreter waits for an acknowledgement
+        self.ide.send('eval')
+        self.ide.send('1 + 1')
+        self.ide.send('ack')
+        self.output.stop()
+        self.assertEqual(self.receive_output(), "end")
+        self.assertEqual(list(self.deferred), ['eval', '1 + 1'])
+
+    def test_flush_and_stop(self):
+        self.output.write("hello\n")
+        self.output.flush()
+        self.assertEqual(self.receive_output(), "hello\n")
+        self.output.write("world\n")
+        self.output.stop()
+        self.assertEqual(self.receive_output(), "world\n")
+
+    def test_disconnected(self):
+        self.ide.close()
+        chunk = "x" * OUTPUT_CHUNK_SIZE
+        # (the writes do not block once the IDE is gone)
+        for i in range(OUTPUT_WINDOW + 2):
+            self.output.write(chunk)
+        self.output.stop()
+        self.assertTrue(self.output.disconnected)
+
+
+class InterpreterProcessTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.root = HeadlessRoot()
+        self.pool = HeadlessPool(self.root)
+        self.pool.fill()
+
+    def tearDown(self):
+        self.pool.shutdown()
+        self.tmp_dir.cleanup()
+
+    def proxy(self, source, mode='full'):
+        filename = os.path.join(self.tmp_dir.name, "prog.py")
+        with open(filename, 'w') as f:
+            f.write(source)
+        return InterpreterProxy(self.root, mode, filename, self.pool)
+
+    def test_pool(self):
+        self.root.pump(lambda: all(interp.check_ready() for interp in self.pool.interpreters))
+        interp = self.pool.take()
+        self.assertTrue(interp.is_alive())
+        self.assertEqual((self.pool.nb_taken_ready, self.pool.nb_taken_cold), (1, 0))
+        # the pool is refilled in the background
+        self.root.pump(lambda: len(self.pool.interpreters) == self.pool.size)
+        self.assertNotIn(interp, self.pool.interpreters)
+        self.assertEqual(self.pool.nb_spawned, 2)
+        interp.kill()
+
+    def test_execute_and_evaluate(self):
+        proxy = self.proxy("for i in range(2000):\n    print('line', i)\nx = 42\n")
+        results = []
+        outputs = []
+        proxy.execute(lambda ok, report: results.append((ok, report)), outputs.append)
+        self.root.pump(lambda: results)
+        self.assertTrue(results[0][0])
+        self.assertEqual("".join(outputs), "".join("line {}\n".format(i) for i in range(2000)))
+        proxy.run_evaluation("x + 1", lambda ok, report: results.append((ok, report)))
+        self.root.pump(lambda: len(results) == 2)
+        self.assertEqual(results[1][1].result, 43)
+        proxy.kill()
+
+    def test_type_checking_in_ide(self):
+        # (an empty cache, so that the programs are checked)
+        saved_cache = typecache._DEFAULT_CACHE
+        typecache._DEFAULT_CACHE = typecache.TypeCheckCache(os.path.join(self.tmp_dir.name, "cache"))
+        self.addCleanup(setattr, typecache, '_DEFAULT_CACHE', saved_cache)
+        checker = default_checker()
+        program = 'def double(n):\n    """int -> int"""\n    return {}\n\nassert double(2) == 4\n'
+        results = []
+        for body in ("2 * n", "n + n"):
+            (nb_checked, nb_reused) = (checker.nb_checked, checker.nb_reused)
+            proxy = self.proxy(program.format(body), 'student')
+            proxy.execute(lambda ok, report: results.append(ok))
+            self.root.pump(lambda: results)
+            self.assertEqual(results.pop(), True)
+            # (each run has its own interpreter process)
+            proxy.kill()
+        # the second run only checks the changed function again (in this process)
+        self.assertEqual((checker.nb_checked - nb_checked, checker.nb_reused - nb_reused), (1, 2))
+
+    def test_kill_drops_output(self):
+        proxy = self.proxy("while True:\n    print('again')\n")
+        outputs = []
+        proxy.execute(lambda ok, report: None, outputs.append)
+        self.root.pump(lambda: outputs)
+        self.assertTrue(proxy.kill())
+        nb_outputs = len(outputs)
+        end = time.perf_counter() + 0.3
+        self.root.pump(lambda: time.perf_counter() > end)
+        self.assertEqual(len(outputs), nb_outputs)
+        self.assertFalse(proxy.process.is_alive())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,100 @@
+"""Tests of the in-memory capture of the outputs (OutputCapture).
+
+Usage: python3 test_output_capture.py
+"""
+
+import os.path, sys
+import unittest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), os.pardir, "mrpython"))
+
+from OutputCapture import RingBuffer, capture_stream, report_overflow, RING_CHUNK_SIZE
+from RunReport import RunReport
+
+def utf8_size(text):
+    return len(text.encode('utf-8'))
+
+class RingBufferTest(unittest.TestCase):
+    def test_no_overflow(self):
+        buffer = RingBuffer(100)
+        buffer.write("hello\n")
+        buffer.write("world\n")
+        self.assertEqual(buffer.getvalue(), "hello\nworld\n")
+        self.assertFalse(buffer.has_overflow())
+
+    def test_overflow_counts(self):
+        buffer = RingBuffer(100)
+        written = "".join("line {}\n".format(i) for i in range(50))
+        for line in written.splitlines(keepends=True):
+            buffer.write(line)
+        kept = buffer.getvalue()
+        self.assertTrue(written.endswith(kept))
+        self.assertLessEqual(utf8_size(kept), 100)
+        self.assertEqual(buffer.bytes_dropped, utf8_size(written) - utf8_size(kept))
+        dropped = written[:len(written) - len(kept)]
+        self.assertEqual(buffer.lines_dropped, dropped.count('\n'))
+
+    def test_large_writes(self):
+        # (the writes are gathered in chunks, dropped as a whole or in part)
+        buffer = RingBuffer(3 * RING_CHUNK_SIZE)
+        written = ""
+        for i in range(10):
+            text = str(i) * RING_CHUNK_SIZE + "\n"
+            buffer.write(text)
+            written += text
+        kept = buffer.getvalue()
+        self.assertEqual(utf8_size(kept), 3 * RING_CHUNK_SIZE)
+        self.assertEqual(kept, written[-len(kept):])
+        self.assertEqual(buffer.bytes_dropped + utf8_size(kept), utf8_size(written))
+        self.assertEqual(buffer.lines_dropped, written[:-len(kept)].count('\n'))
+
+    def test_cut_character(self):
+        # 'é' is two bytes: keeping the last 3 bytes would cut the first one,
+        # which is dropped as a whole
+        buffer = RingBuffer(3)
+        buffer.write("éé")
+        self.assertEqual(buffer.getvalue(), "é")
+        self.assertEqual(buffer.bytes_dropped, 2)
+        buffer.write("aé")
+        self.assertEqual(buffer.getvalue(), "aé")
+        self.assertEqual(buffer.bytes_dropped + utf8_size(buffer.getvalue()), utf8_size("ééaé"))
+
+    def test_cut_character_in_chunk(self):
+        buffer = RingBuffer(2 * RING_CHUNK_SIZE + 1)
+        for i in range(3):
+            buffer.write("é" * RING_CHUNK_SIZE)
+        # (the odd capacity cuts the last char of the second chunk)
+        self.assertEqual(buffer.getvalue(), "é" * RING_CHUNK_SIZE)
+        self.assertEqual(buffer.bytes_dropped, 4 * RING_CHUNK_SIZE)
+
+    def test_seek_read_after_drop(self):
+        buffer = RingBuffer(10)
+        buffer.write("abcdef")
+        buffer.seek(0)
+        self.assertEqual(buffer.read(4), "abcd")
+        buffer.write("ghijkl")
+        # "ab" is dropped: the read position moves back with the text
+        self.assertEqual(buffer.tell(), 2)
+        self.assertEqual(buffer.read(), "efghijkl")
+        buffer.seek(0)
+        self.assertEqual(buffer.read(), "cdefghijkl")
+        self.assertEqual((buffer.bytes_dropped, buffer.lines_dropped), (2, 0))
+
+    def test_capture_stream(self):
+        original = sys.stderr
+        with capture_stream('stderr', 1000) as buffer:
+            print("captured", file=sys.stderr)
+            self.assertIs(sys.stderr, buffer)
+        self.assertIs(sys.stderr, original)
+        self.assertEqual(buffer.getvalue(), "captured\n")
+
+    def test_report_overflow(self):
+        buffer = RingBuffer(5)
+        buffer.write("a\nb\nc\nd\n")
+        report = RunReport()
+        report_overflow(report, buffer)
+        self.assertEqual((report.output_bytes_dropped, report.output_lines_dropped), (3, 1))
+
+
+if __name__ == "__main__":
+    unittest.main()
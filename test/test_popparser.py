@@ -0,0 +1,348 @@
+"""Tests of the parsing framework (popparser): the LL(1) compilation of
+the grammars, the master regexps of the tokenizer, the token array and
+packrat modes, the lazy positions and the memory-mapped file backend.
+
+The type grammars are parsed in each mode, and compared with the default
+mode (grammars without LL(1) tables, token rules tried one at a time,
+tokens read from the tokenizer).
+
+Usage: python3 test_popparser.py
+"""
+
+import os.path, sys
+import ast
+import glob
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), os.pardir, "mrpython"))
+
+from popparser import Grammar, parsers, tokens
+from popparser.grammar import GrammarError
+from popparser.llparser import LLParsing, ParsePosition
+from popparser.tokenizer import Tokenizer, TokenArray, FileTokenizer, EOF_TOKEN_TYPE
+from typechecking.type_parser import type_tokenizer, build_typeexpr_grammar, build_vartype_grammar, build_functype_grammar
+from typechecking.builtin_signatures import BUILTIN_SIGNATURES
+
+TESTPROG_PATH = os.path.join(os.path.dirname(os.path.realpath(__file__)), "progs")
+
+def type_strings():
+    """ The (function and expression) type strings of the test programs,
+    of the builtin signatures, and some erroneous ones """
+    functypes = []
+    typeexprs = ["int", "  int  ", "list[tuple[int, str]]", "dict[int:set[str]]", "int + NoneType"
+                 , "tuple[int,", "list[", "α", "Iterable[α] * β", "]]", "", "x : int", "Point", "tuple[]"]
+    for filename in sorted(glob.glob(os.path.join(TESTPROG_PATH, "*.py"))):
+        with open(filename, 'r') as f:
+            source = f.read()
+        try:
+            tree = ast.parse(source)
+        except SyntaxError:
+            continue
+        for node in ast.walk(tree):
+            if isinstance(node, ast.FunctionDef):
+                docstring = ast.get_docstring(node, clean=False)
+                if docstring:
+                    functypes.append(docstring)
+        typeexprs.extend(line.strip()[1:] for line in source.split('\n') if line.strip().startswith('#'))
+    for signatures in BUILTIN_SIGNATURES.values():
+        functypes.extend(signature for (_, signature) in signatures)
+    return (functypes, typeexprs)
+
+def position(pos):
+    return (pos.offset, pos.line_pos, pos.char_pos)
+
+def uncompiled(tokenizer):
+    """ The token rules of the tokenizer are tried one at a time """
+    tokenizer.compile()
+    tokenizer._Tokenizer__scanners = {}
+    tokenizer._Tokenizer__none_scanner = None
+    return tokenizer
+
+def type_grammars():
+    return { 'typeexpr' : build_typeexpr_grammar()
+             , 'vartype' : build_vartype_grammar(build_typeexpr_grammar())
+             , 'functype' : build_functype_grammar(build_typeexpr_grammar()) }
+
+def token_list(tokenizer):
+    result = []
+    while True:
+        token = tokenizer.next()
+        result.append((token.token_type, token.value, position(token.start_pos), position(token.end_pos)))
+        if token.iseof or token.iserror:
+            return result
+
+
+class TypeGrammarsTest(unittest.TestCase):
+    """ The results (and positions) of the type parser in each mode """
+    @classmethod
+    def setUpClass(cls):
+        (functypes, typeexprs) = type_strings()
+        cls.strings = { 'typeexpr' : typeexprs, 'vartype' : typeexprs, 'functype' : functypes }
+        # the default mode
+        with mock.patch.object(Grammar, 'compile'):
+            grammars = type_grammars()
+        cls.expected = cls.parse_all(grammars, uncompiled(type_tokenizer()))
+
+    @classmethod
+    def parse_all(cls, grammars, tokenizer, **modes):
+        results = {}
+        for (name, grammar) in grammars.items():
+            for string in cls.strings[name]:
+                parser = LLParsing(grammar, **modes)
+                parser.tokenizer = tokenizer
+                tokenizer.from_string(string)
+                try:
+                    result = parser.parse()
+                except Exception as err:
+                    # (e.g. tuple[] in every mode)
+                    results[(name, string)] = ('exception', type(err).__name__)
+                    continue
+                results[(name, string)] = (result.iserror
+                                           , str(result.content) if result.iserror else repr(result.content)
+                                           , position(result.start_pos), position(result.end_pos))
+        return results
+
+    def check_mode(self, tokenizer, **modes):
+        results = self.parse_all(type_grammars(), tokenizer, **modes)
+        for (key, result) in results.items():
+            with self.subTest(key=key):
+                self.assertEqual(result, self.expected[key])
+
+    def test_corpus(self):
+        self.assertGreater(len(self.strings['functype']), 50)
+        nb_errors = sum(1 for result in self.expected.values() if result[0])
+        self.assertTrue(0 < nb_errors < len(self.expected))
+
+    def test_ll1_tables(self):
+        self.check_mode(uncompiled(type_tokenizer()))
+
+    def test_master_regexp(self):
+        self.check_mode(type_tokenizer())
+
+    def test_token_array(self):
+        self.check_mode(type_tokenizer(), token_array=True)
+
+    def test_packrat(self):
+        self.check_mode(type_tokenizer(), packrat=True)
+
+    def test_packrat_flushes(self):
+        self.check_mode(type_tokenizer(), packrat=True, memo_size=4)
+
+
+class GrammarAnalysisTest(unittest.TestCase):
+    def test_type_grammars(self):
+        for (name, grammar) in type_grammars().items():
+            with self.subTest(grammar=name):
+                self.assertEqual(grammar.compile().errors, [])
+
+    def test_first_conflict(self):
+        grammar = Grammar()
+        grammar.register('ab', parsers.Tuple().element(parsers.Optional(parsers.Token('a'))).element(parsers.Token('b')))
+        grammar.entry = parsers.Choice().either(grammar.ref('ab')).orelse(parsers.Token('b'))
+        with self.assertRaises(GrammarError) as context:
+            grammar.compile()
+        self.assertIn("both start with 'b'", str(context.exception))
+
+    def test_nullable_conflict(self):
+        grammar = Grammar()
+        grammar.entry = parsers.Choice().either(parsers.Optional(parsers.Token('a'))) \
+                                        .orelse(parsers.Optional(parsers.Token('b')))
+        with self.assertRaises(GrammarError) as context:
+            grammar.compile()
+        self.assertIn("both accept no input", str(context.exception))
+
+    def test_follow_conflict(self):
+        grammar = Grammar()
+        grammar.register('opt', parsers.Choice().either(parsers.Optional(parsers.Token('a'))).orelse(parsers.Token('b')))
+        grammar.entry = parsers.Tuple().element(grammar.ref('opt')).element(parsers.Token('b'))
+        with self.assertRaises(GrammarError) as context:
+            grammar.compile()
+        self.assertIn("'b' may start branch", str(context.exception))
+
+    def test_greedy_warning(self):
+        grammar = Grammar()
+        grammar.entry = parsers.Tuple().element(parsers.Optional(parsers.Token('a'))).element(parsers.Token('a'))
+        analysis = grammar.compile()
+        self.assertEqual(analysis.errors, [])
+        self.assertEqual(len(analysis.warnings), 1)
+        self.assertIn("greedy on 'a'", analysis.warnings[0])
+
+    def test_optional_lookahead(self):
+        grammar = Grammar()
+        optional = parsers.Optional(parsers.Tuple().element(parsers.Token('a')).element(parsers.Token('b')))
+        grammar.entry = parsers.Tuple().element(optional).element(parsers.Token('c'))
+        grammar.compile()
+        self.assertEqual(optional.lookahead, { 'a' })
+
+
+class MasterRegexpTest(unittest.TestCase):
+    def check_tokens(self, tokenizer, string):
+        tokenizer.from_string(string)
+        compiled = token_list(tokenizer)
+        uncompiled(tokenizer).from_string(string)
+        self.assertEqual(compiled, token_list(tokenizer))
+        return compiled
+
+    def test_type_tokens(self):
+        for string in ("int * list[α] -> dict[str:β]", "boolean bool  Iterable[\t]\n ->", "int ! bool"):
+            with self.subTest(string=string):
+                self.check_tokens(type_tokenizer(), string)
+
+    def test_first_rule_wins(self):
+        tokenizer = Tokenizer()
+        tokenizer.add_rule(tokens.Literal('arrow', '->'))
+        tokenizer.add_rule(tokens.Char('minus', '-'))
+        tokenizer.add_rule(tokens.LiteralSet('keyword', 'if', 'in'))
+        tokenizer.add_rule(tokens.Regexp('identifier', "[a-z]+"))
+        tokenizer.add_rule(tokens.Char('space', ' '))
+        found = self.check_tokens(tokenizer, "-> - ifx in")
+        self.assertEqual([(token_type, value) for (token_type, value, _, _) in found]
+                         , [('arrow', '->'), ('space', ' '), ('minus', '-'), ('space', ' ')
+                            , ('keyword', 'if'), ('identifier', 'x'), ('space', ' '), ('keyword', 'in')
+                            , (EOF_TOKEN_TYPE, '<<EOF>>')])
+
+    def test_uncompilable_rules(self):
+        word = tokens.Regexp('word', r"[a-z]+\b")
+        self.assertIsNone(word.pattern)
+        self.assertIsNone(tokens.compile_rules([tokens.Char('space', ' '), word]))
+        newline = tokens.Literal('newlines', "\n\n")
+        self.assertIsNone(tokens.compile_rules([newline]))
+        tokenizer = Tokenizer()
+        tokenizer.add_rule(word)
+        tokenizer.add_rule(newline)
+        tokenizer.add_rule(tokens.Char('newline', '\n'))
+        tokenizer.add_rule(tokens.Char('space', ' '))
+        found = self.check_tokens(tokenizer, "ab cd\n\n\nef")
+        self.assertEqual([token_type for (token_type, _, _, _) in found]
+                         , ['word', 'space', 'word', 'newlines', 'newline', 'word', EOF_TOKEN_TYPE])
+
+    def test_error_token(self):
+        found = self.check_tokens(type_tokenizer(), "int $")
+        self.assertEqual(found[-1][0], '<<ERROR>>')
+        self.assertEqual(found[-1][2], (4, 1, 5))
+
+
+class LazyPositionTest(unittest.TestCase):
+    def test_resolve(self):
+        text = "ab\n\ncd\nefg"
+        line_starts = [0, 3, 4, 7]
+        (line, char) = (1, 1)
+        for offset in range(len(text) + 1):
+            pos = ParsePosition(offset, line_starts=line_starts)
+            self.assertEqual((pos.line_pos, pos.char_pos), (line, char))
+            self.assertEqual(pos, ParsePosition(offset, line, char))
+            if offset < len(text) and text[offset] == '\n':
+                (line, char) = (line + 1, 1)
+            else:
+                char += 1
+
+    def test_token_array_positions(self):
+        tokenizer = type_tokenizer()
+        tokenizer.from_string("int *\n  bool")
+        array = TokenArray(tokenizer)
+        array.fill(10)
+        self.assertTrue(array.complete)
+        # the positions (and tokens) are only built when requested
+        self.assertEqual(array.positions.count(None), len(array.positions))
+        token = array.token(3)
+        self.assertEqual((token.token_type, position(token.start_pos), position(token.end_pos))
+                         , ('newline', (5, 1, 6), (6, 2, 1)))
+        self.assertEqual([index for (index, pos) in enumerate(array.positions) if pos is not None], [3, 4])
+        self.assertIs(array.token(3), token)
+        self.assertEqual(position(array.token(len(array) - 1).start_pos), (12, 2, 7))
+
+
+class FileTokenizerTest(unittest.TestCase):
+    TEXT = "int -> α\n\nlist[β] * é\n\n\nγγγγ\nbool\n"
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def write(self, text):
+        filename = os.path.join(self.tmp_dir.name, "input.txt")
+        with open(filename, 'w', encoding='utf-8') as f:
+            f.write(text)
+        return filename
+
+    def tokenizer(self):
+        tokenizer = Tokenizer()
+        # (a literal spanning two lines, hence two chunks)
+        tokenizer.add_rule(tokens.Literal('newlines', "\n\n"))
+        tokenizer.add_rule(tokens.Char('newline', '\n'))
+        tokenizer.add_rule(tokens.Char('space', ' '))
+        tokenizer.add_rule(tokens.Literal('arrow', '->'))
+        tokenizer.add_rule(tokens.CharSet('punctuation', '[', ']', '*'))
+        tokenizer.add_rule(tokens.Regexp('word', r"\w+"))
+        return tokenizer
+
+    def check_file(self, text):
+        filename = self.write(text)
+        tokenizer = self.tokenizer()
+        tokenizer.from_string(text)
+        expected = token_list(tokenizer)
+        for chunk_size in (1, 2, 3, 5, 8, 64 * 1024):
+            with self.subTest(chunk_size=chunk_size):
+                with tokenizer.from_file(filename, chunk_size) as backend:
+                    self.assertEqual(backend.length, len(text))
+                    self.assertEqual(token_list(tokenizer), expected)
+                    self.assertEqual(backend.substring(0, len(text) + 10), text)
+                    self.assertEqual(backend.line_starts
+                                     , [0] + [i + 1 for (i, char) in enumerate(text) if char == '\n'])
+        return expected
+
+    def test_chunks(self):
+        found = self.check_file(self.TEXT)
+        self.assertIn('newlines', [token_type for (token_type, _, _, _) in found])
+
+    def test_no_final_newline(self):
+        self.check_file(self.TEXT.rstrip('\n'))
+
+    def test_empty_file(self):
+        self.assertEqual(self.check_file(""), [(EOF_TOKEN_TYPE, '<<EOF>>', (0, 1, 1), (0, 1, 1))])
+
+    def test_multibyte_chars(self):
+        # (2, 3 and 4 bytes chars, the chunk sizes end inside them)
+        text = "é\n€€\n𝔸\nα β\n"
+        filename = self.write(text)
+        for chunk_size in range(1, 8):
+            with self.subTest(chunk_size=chunk_size):
+                tokenizer = Tokenizer()
+                with FileTokenizer(tokenizer, filename, chunk_size) as backend:
+                    tokenizer.backend = backend
+                    self.assertEqual(backend.length, len(text))
+                    chars = []
+                    while not tokenizer.at_eof:
+                        chars.append(tokenizer.next_char())
+                    self.assertEqual("".join(chars), text)
+                    self.assertTrue(backend.startswith("€\n𝔸", 3))
+                    self.assertEqual(backend.substring(2, 7), "€€\n𝔸\n")
+
+    def test_cached_chunks(self):
+        text = "".join("t{}\n".format(i) for i in range(100))
+        filename = self.write(text)
+        tokenizer = Tokenizer()
+        with FileTokenizer(tokenizer, filename, chunk_size=4, nb_cached_chunks=2) as backend:
+            tokenizer.backend = backend
+            # (backwards: the chunks are decoded again)
+            self.assertEqual(backend.substring(len(text) - 4, len(text)), "t99\n")
+            self.assertEqual(len(backend.chunks), 2)
+            for i in reversed(range(100)):
+                self.assertEqual(backend.substring(text.index("t{}\n".format(i)), text.index("t{}\n".format(i)) + 2)
+                                 , "t{}".format(i)[:2])
+            self.assertLessEqual(len(backend.chunks), 2)
+
+    def test_backend_switch_closes_file(self):
+        filename = self.write(self.TEXT)
+        tokenizer = self.tokenizer()
+        backend = tokenizer.from_file(filename)
+        tokenizer.from_string("int")
+        self.assertTrue(backend.file.closed)
+
+
+if __name__ == "__main__":
+    unittest.main()
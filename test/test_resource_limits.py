@@ -0,0 +1,77 @@
+"""Tests of the resource limits of the runs (ResourceLimits), without display.
+
+Usage: python3 test_resource_limits.py
+"""
+
+import os.path, sys
+import signal
+import tempfile
+import unittest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), os.pardir, "mrpython"))
+
+from PyInterpreter import PyInterpreter
+from ResourceLimits import ResourceLimits
+
+class FakeRoot:
+    """ The (only) use of the tk root by the runners """
+    def nametowidget(self, name):
+        return self
+
+# (no CPU limit: the hard RLIMIT_CPU of the test process cannot be raised again)
+def limits(wall_time=None, recursion_depth=None):
+    return ResourceLimits(cpu_time=None, wall_time=wall_time, memory=None, recursion_depth=recursion_depth)
+
+class ResourceLimitsTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def run_program(self, mode, source, limits):
+        filename = os.path.join(self.tmp_dir.name, "prog.py")
+        with open(filename, 'w') as f:
+            f.write(source)
+        return PyInterpreter(FakeRoot(), mode, filename, limits=limits).execute()
+
+    def check_limit_error(self, report, limit, line, details):
+        self.assertEqual(report.limit_exceeded, limit)
+        self.assertEqual(report.compilation_errors, [])
+        self.assertEqual(len(report.execution_errors), 1)
+        error = report.execution_errors[0]
+        self.assertEqual((error.line, error.details), (line, details))
+
+    def test_wall_time(self):
+        (ok, report) = self.run_program('full', "i = 0\nwhile True:\n    i += 1\n", limits(wall_time=1))
+        self.assertFalse(ok)
+        self.check_limit_error(report, 'wall', 3, "1 s")
+
+    def test_wall_time_caught(self):
+        source = "try:\n    while True:\n        pass\nexcept:\n    pass\nwhile True:\n    pass\n"
+        (ok, report) = self.run_program('full', source, limits(wall_time=1))
+        self.assertFalse(ok)
+        # (the first breach is reported)
+        self.check_limit_error(report, 'wall', 3, "1 s")
+
+    def test_wall_time_student(self):
+        source = "def boucle(n : int) -> int:\n    \"\"\"Ne termine pas.\"\"\"\n    i : int = n\n" \
+                 "    while True:\n        i = i + 1\n    return i\n\nx : int = boucle(0)\n"
+        (ok, report) = self.run_program('student', source, limits(wall_time=1))
+        self.assertFalse(ok)
+        self.check_limit_error(report, 'wall', 5, "1 s")
+
+    def test_recursion(self):
+        recursion_limit = sys.getrecursionlimit()
+        sigint_handler = signal.getsignal(signal.SIGINT)
+        (ok, report) = self.run_program('full', "def f(n):\n    return f(n + 1)\n\nf(0)\n"
+                                        , limits(wall_time=10, recursion_depth=200))
+        self.assertFalse(ok)
+        self.check_limit_error(report, 'recursion', 2, "200")
+        # the limits are restored after the run
+        self.assertEqual(sys.getrecursionlimit(), recursion_limit)
+        self.assertIs(signal.getsignal(signal.SIGINT), sigint_handler)
+
+
+if __name__ == "__main__":
+    unittest.main()
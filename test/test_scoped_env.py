@@ -0,0 +1,119 @@
+"""Tests of the scoped environments of the type-checker (typechecking.scoped_env).
+
+Usage: python3 test_scoped_env.py
+"""
+
+import os.path, sys
+import unittest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), os.pardir, "mrpython"))
+
+from typechecking.scoped_env import ScopedEnv, ScopedSet
+
+class ScopedEnvTest(unittest.TestCase):
+    def setUp(self):
+        self.env = ScopedEnv({ 'a' : 1, 'b' : 2 })
+        self.level = self.env.mark()
+
+    def check_undone(self):
+        self.env.undo(self.level)
+        self.assertEqual(self.env, { 'a' : 1, 'b' : 2 })
+        self.assertEqual((self.env.trail, self.env.marks), ([], []))
+
+    def test_setitem(self):
+        self.env['a'] = 10
+        self.env['c'] = 3
+        self.assertEqual(self.env.bound_since(self.level), { 'c' })
+        self.check_undone()
+
+    def test_delitem(self):
+        del self.env['a']
+        self.check_undone()
+
+    def test_update(self):
+        self.env.update({ 'a' : 10, 'c' : 3 }, d=4)
+        self.assertEqual(self.env.bound_since(self.level), { 'c', 'd' })
+        self.check_undone()
+
+    def test_setdefault(self):
+        self.assertEqual(self.env.setdefault('a', 10), 1)
+        self.assertEqual(self.env.setdefault('c', 3), 3)
+        self.assertEqual(self.env.bound_since(self.level), { 'c' })
+        self.check_undone()
+
+    def test_pop(self):
+        self.assertEqual(self.env.pop('a'), 1)
+        self.assertEqual(self.env.pop('x', None), None)
+        with self.assertRaises(KeyError):
+            self.env.pop('x')
+        self.check_undone()
+
+    def test_popitem(self):
+        self.env.popitem()
+        self.check_undone()
+
+    def test_clear(self):
+        self.env.clear()
+        self.check_undone()
+
+    def test_nested_scopes(self):
+        self.env['c'] = 3
+        level = self.env.mark()
+        self.env['d'] = 4
+        self.env.undo(level)
+        self.assertEqual(self.env, { 'a' : 1, 'b' : 2, 'c' : 3 })
+        self.check_undone()
+
+    def test_not_recorded_outside_scopes(self):
+        self.env.undo(self.level)
+        self.env['c'] = 3
+        self.assertEqual(self.env.trail, [])
+
+
+class ScopedSetTest(unittest.TestCase):
+    def setUp(self):
+        self.elems = ScopedSet({ 1, 2, 3 })
+        self.level = self.elems.mark()
+
+    def check_undone(self):
+        self.elems.undo(self.level)
+        self.assertEqual(self.elems, { 1, 2, 3 })
+        self.assertEqual((self.elems.trail, self.elems.marks), ([], []))
+
+    def test_add(self):
+        self.elems.add(1)
+        self.elems.add(4)
+        self.check_undone()
+
+    def test_discard(self):
+        self.elems.discard(1)
+        self.elems.discard(4)
+        self.check_undone()
+
+    def test_remove(self):
+        self.elems.remove(1)
+        with self.assertRaises(KeyError):
+            self.elems.remove(4)
+        self.check_undone()
+
+    def test_update(self):
+        self.elems.update([3, 4], { 5 })
+        self.check_undone()
+
+    def test_ior(self):
+        elems = self.elems
+        elems |= { 4 }
+        self.assertIs(elems, self.elems)
+        self.check_undone()
+
+    def test_pop(self):
+        self.elems.pop()
+        self.check_undone()
+
+    def test_clear(self):
+        self.elems.clear()
+        self.check_undone()
+
+
+if __name__ == "__main__":
+    unittest.main()
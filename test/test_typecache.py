@@ -0,0 +1,90 @@
+"""Tests of the on-disk cache of type-checking results (typechecking.typecache).
+
+Usage: python3 test_typecache.py
+"""
+
+import os.path, sys
+import json
+import tempfile
+import types
+import unittest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), os.pardir, "mrpython"))
+
+from typechecking import typecache
+from typechecking.typecache import TypeCheckCache
+
+DIAGNOSTICS = [{ 'fail_string' : "UnknownVariableError[x]@2:4"
+                 , 'fatal' : True
+                 , 'reported' : True
+                 , 'severity' : 'error'
+                 , 'type' : "Type error"
+                 , 'line' : 2
+                 , 'column' : 4
+                 , 'details' : "unknown variable x" }]
+
+class TypeCheckCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.cache = TypeCheckCache(self.tmp_dir.name)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_get_put(self):
+        self.assertIsNone(self.cache.get("x = 1\n"))
+        self.assertTrue(self.cache.put("x = 1\n", DIAGNOSTICS))
+        self.assertEqual(self.cache.get("x = 1\n"), DIAGNOSTICS)
+        self.assertIsNone(self.cache.get("x = 2\n"))
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 2))
+
+    def test_options(self):
+        self.cache.put("x = 1\n", DIAGNOSTICS, collect_all=True)
+        self.assertIsNone(self.cache.get("x = 1\n", collect_all=False))
+        self.assertEqual(self.cache.get("x = 1\n", collect_all=True), DIAGNOSTICS)
+
+    def test_invalidate(self):
+        self.cache.put("x = 1\n", DIAGNOSTICS)
+        self.assertTrue(self.cache.invalidate("x = 1\n"))
+        self.assertIsNone(self.cache.get("x = 1\n"))
+        self.assertFalse(self.cache.invalidate("x = 1\n"))
+        self.assertEqual(self.cache.size, 0)
+
+    def test_format_mismatch(self):
+        path = self.cache.entry_path(self.cache.key("x = 1\n"))
+        os.makedirs(os.path.dirname(path))
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({ 'format' : typecache.CACHE_FORMAT_VERSION - 1, 'diagnostics' : DIAGNOSTICS }, f)
+        self.assertIsNone(self.cache.get("x = 1\n"))
+
+    def test_evict_least_recently_used(self):
+        sources = [ "x = {}\n".format(i) for i in range(4) ]
+        for (i, source) in enumerate(sources[:3]):
+            self.cache.put(source, DIAGNOSTICS)
+            path = self.cache.entry_path(self.cache.key(source))
+            os.utime(path, (1000 + i, 1000 + i))
+        entry_size = self.cache.compute_size() // 3
+        # the first entry is used again: the second one is now the oldest
+        self.assertIsNotNone(self.cache.get(sources[0]))
+        self.cache.max_size = int(entry_size * 3.5)
+        self.cache.put(sources[3], DIAGNOSTICS)
+        self.assertLessEqual(self.cache.size, self.cache.max_size * typecache.EVICTION_RATIO)
+        self.assertIsNone(self.cache.get(sources[1]))
+        self.assertIsNotNone(self.cache.get(sources[0]))
+        self.assertIsNotNone(self.cache.get(sources[3]))
+        self.assertEqual(self.cache.size, self.cache.compute_size())
+
+    def test_python_version(self):
+        saved = (typecache.sys, typecache._CHECKER_VERSION)
+        try:
+            typecache._CHECKER_VERSION = None
+            version = typecache.checker_version()
+            typecache.sys = types.SimpleNamespace(version_info=(2, 7, 0))
+            typecache._CHECKER_VERSION = None
+            self.assertNotEqual(typecache.checker_version(), version)
+        finally:
+            (typecache.sys, typecache._CHECKER_VERSION) = saved
+
+
+if __name__ == "__main__":
+    unittest.main()